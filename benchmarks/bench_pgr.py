@@ -0,0 +1,252 @@
+# benchmarks/bench_pgr.py
+"""
+Benchmark de ponta a ponta do PGR sem acessar sistemas reais.
+
+Sobe os substitutos locais de benchmarks/fakes.py (Zabbix, SSH e Oracle),
+prepara uma área de trabalho por cliente fictício e executa o pipeline real
+(app_graphics, formatter, ultima_consulta, formatter_sqlserver e mergepdf)
+para lotes de 1, 10 e 100 clientes. Para cada lote informa latência por
+relatório (p50/p95/máx), vazão, pico de memória e o p50/p95 de cada etapa
+medida por metricas.cronometrar.
+
+Exemplos (a partir da raiz do projeto):
+    python -m benchmarks.bench_pgr
+    python -m benchmarks.bench_pgr --fluxo sqlserver --clientes 1 10 --workers 8
+    python -m benchmarks.bench_pgr --graficos arquivo --latencia-ms 20 --saida bench.json
+
+Com --graficos zabbix (padrão) o app_graphics real gera os gráficos a partir
+das tendências do Zabbix falso (ou os baixa do chart.php com
+GRAPH_CAPTURE_MODE=http, ou pelo Playwright com GRAPH_CAPTURE_MODE=navegador);
+com --graficos arquivo a etapa apenas grava PNGs prontos.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import ZabbixFake, SSHFake, OracleFake, png_solido
+
+FLUXOS = ("oracle", "sqlserver")
+
+# Itens do Zabbix falso: textos (consultas do SQL Server) e numéricos (CPU/memória)
+ITENS_ZABBIX = {
+    1001: "Microsoft SQL Server 2019 (RTM) - 15.0.2000.5 (X64)",
+    1002: json.dumps([{"owner": "dbo", "table_name": f"TABELA_{i:02d}", "size_gb": f"{50 / (i + 1):.2f}"}
+                      for i in range(20)]),
+    1003: json.dumps([{"query_hash": f"0x{i:08X}", "execution_count": 100 * (i + 1),
+                       "query_text": f"SELECT * FROM dbo.TABELA_{i:02d} WHERE ID = @p1"} for i in range(10)]),
+    1004: json.dumps([{"StartTime": f"2025-01-{d + 1:02d} 01:00:00", "EndTime": f"2025-01-{d + 1:02d} 01:30:00",
+                       "TotalOutputMBytes": 1024 * (d + 1), "BackupStatus": "COMPLETED", "BackupType": "FULL",
+                       "DayOfWeek": "Monday", "ElapsedSeconds": 1800} for d in range(7)]),
+    2001: "srv-bench",
+    2002: "Windows Server 2019 Standard",
+    2003: "16 GB",
+    3001: 42.0,
+    3002: 63.0,
+}
+
+def percentil(valores, p):
+    """Percentil por interpolação linear (valores em qualquer ordem)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p
+    baixo = int(posicao)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+
+def contexto_cliente(indice, fluxo, zabbix, ssh):
+    """ContextoCliente fictício equivalente ao que metadata.fetch_client_context devolveria."""
+    from src.apps.metadata import ContextoCliente
+
+    host, port = ssh.endereco
+    nome = f"Cliente Bench {indice:03d}"
+    urlzbx = {
+        "nome": nome,
+        "urlcpu": f"{zabbix.url}/history.php?action=showgraph&itemids[]=3001",
+        "urlmemoria": f"{zabbix.url}/history.php?action=showgraph&itemids[]=3002",
+    }
+    if fluxo == "oracle":
+        cliente = {
+            "idcliente": indice, "nome": nome, "ip": host, "portassh": port, "tpbanco": "oracle",
+            "nomebanco": f"BENCH{indice:03d}", "portabanco": 1521, "idhostzbx": 10001,
+            "userssh": "bench", "senhassh": "bench",
+        }
+        return ContextoCliente(cliente, None, urlzbx)
+    cliente = {"nome": nome, "tpbanco": "SQL Server", "info_db": 1001, "biggest_tables": 1002, "top_queries": 1003, "backups": 1004}
+    servidor = {"nome": nome, "hostname": 2001, "sistema_operacional": 2002, "memoria": 2003}
+    return ContextoCliente(cliente, servidor, urlzbx)
+
+@contextmanager
+def oracle_local(latencia):
+    """Direciona as conexões do oracle_driver para o OracleFake durante o bloco."""
+    from src.apps import oracle_driver
+
+    original = oracle_driver.sessao
+
+    class SessaoFake:
+        def __init__(self, servico):
+            self.servico = servico
+
+        @contextmanager
+        def conexao(self):
+            yield OracleFake(self.servico, latencia=latencia)
+
+    @contextmanager
+    def sessao(host, porta, servico, usuario, senha):
+        yield SessaoFake(servico)
+
+    oracle_driver.sessao = sessao
+    try:
+        yield
+    finally:
+        oracle_driver.sessao = original
+
+@contextmanager
+def graficos_em_arquivo():
+    """Troca a captura via navegador pela gravação direta de PNGs prontos."""
+    from src.apps import app_graphics
+
+    original = app_graphics.capture_pages
+    png = png_solido(800, 300)
+
+    def capture_pages(workspace=None):
+        os.makedirs(workspace.graphics_dir, exist_ok=True)
+        for nome in ("full_page_cpu.png", "full_page_memoria.png",
+                     "CPU___utilizacao_plotly.png", "Uso_de_memoria_plotly.png"):
+            with open(os.path.join(workspace.graphics_dir, nome), "wb") as f:
+                f.write(png)
+
+    app_graphics.capture_pages = capture_pages
+    try:
+        yield
+    finally:
+        app_graphics.capture_pages = original
+
+def executar_relatorio(indice, fluxo, zabbix, ssh, raiz):
+    """Gera o relatório de um cliente fictício; retorna (sucesso, duração em s, medições)."""
+    from src.apps import metricas, pipeline, relatorio
+    from src.apps.workspace import Workspace
+
+    workspace = Workspace(tempfile.mkdtemp(prefix=f"bench_{indice:03d}_", dir=raiz))
+    os.makedirs(workspace.output_dir, exist_ok=True)
+    relatorio.preparar_workspace(contexto_cliente(indice, fluxo, zabbix, ssh), workspace, fluxo)
+
+    inicio = time.perf_counter()
+    with metricas.iniciar_execucao(f"bench-{indice}") as execucao:
+        try:
+            pipeline.executar(fluxo, workspace)
+            sucesso = os.path.exists(workspace.relatorio_pdf)
+        except Exception as e:
+            print(f"Relatório {indice} falhou: {e}", file=sys.stderr)
+            sucesso = False
+    return sucesso, time.perf_counter() - inicio, execucao.medicoes
+
+def executar_lote(quantidade, fluxo, workers, zabbix, ssh, raiz):
+    """Executa um lote de relatórios em paralelo e devolve o resumo das medições."""
+    tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, quantidade))) as executor:
+        resultados = list(executor.map(
+            lambda indice: executar_relatorio(indice, fluxo, zabbix, ssh, raiz), range(1, quantidade + 1)))
+    total = time.perf_counter() - inicio
+    _, pico_python = tracemalloc.get_traced_memory()
+
+    latencias = [duracao for _, duracao, _ in resultados]
+    por_etapa = {}
+    for _, _, medicoes in resultados:
+        for medicao in medicoes:
+            por_etapa.setdefault(medicao.etapa, []).append(medicao.duracao_ms)
+
+    return {
+        "fluxo": fluxo,
+        "clientes": quantidade,
+        "workers": workers,
+        "sucessos": sum(1 for sucesso, _, _ in resultados if sucesso),
+        "tempo_total_s": round(total, 3),
+        "relatorios_por_minuto": round(quantidade / total * 60, 2) if total else 0.0,
+        "latencia_p50_s": round(percentil(latencias, 0.5), 3),
+        "latencia_p95_s": round(percentil(latencias, 0.95), 3),
+        "latencia_max_s": round(max(latencias), 3),
+        "pico_memoria_python_mb": round(pico_python / 2 ** 20, 1),
+        # ru_maxrss é o pico do processo inteiro (KiB no Linux), acumulado desde o início
+        "pico_rss_processo_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "etapas": {
+            etapa: {
+                "medicoes": len(duracoes),
+                "p50_ms": round(percentil(duracoes, 0.5), 1),
+                "p95_ms": round(percentil(duracoes, 0.95), 1),
+            }
+            for etapa, duracoes in sorted(por_etapa.items())
+        },
+    }
+
+def imprimir_lote(resumo):
+    print(f"\n=== {resumo['fluxo']} | {resumo['clientes']} cliente(s) | {resumo['workers']} worker(s) ===")
+    print(f"Sucessos: {resumo['sucessos']}/{resumo['clientes']}   "
+          f"Tempo total: {resumo['tempo_total_s']:.2f} s   "
+          f"Vazão: {resumo['relatorios_por_minuto']:.1f} relatórios/min")
+    print(f"Latência por relatório: p50 {resumo['latencia_p50_s']:.2f} s | "
+          f"p95 {resumo['latencia_p95_s']:.2f} s | máx {resumo['latencia_max_s']:.2f} s")
+    print(f"Pico de memória: Python {resumo['pico_memoria_python_mb']:.1f} MB | "
+          f"processo {resumo['pico_rss_processo_mb']:.1f} MB")
+    print(f"{'etapa':<28}{'n':>6}{'p50 ms':>12}{'p95 ms':>12}")
+    for etapa, valores in resumo["etapas"].items():
+        print(f"{etapa:<28}{valores['medicoes']:>6}{valores['p50_ms']:>12.1f}{valores['p95_ms']:>12.1f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline do PGR com Zabbix, SSH e Oracle locais.")
+    parser.add_argument("--fluxo", nargs="+", choices=FLUXOS, default=list(FLUXOS), help="fluxos a medir")
+    parser.add_argument("--clientes", nargs="+", type=int, default=[1, 10, 100], help="tamanhos de lote")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PGR_WORKERS", "4")),
+                        help="relatórios simultâneos (padrão: PGR_WORKERS)")
+    parser.add_argument("--graficos", choices=("zabbix", "arquivo"), default="zabbix",
+                        help="captura real no Zabbix falso ou PNGs prontos")
+    parser.add_argument("--latencia-ms", type=float, default=0.0,
+                        help="latência artificial de cada chamada aos sistemas falsos")
+    parser.add_argument("--saida", help="grava os resumos em JSON neste arquivo")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    latencia = args.latencia_ms / 1000
+
+    with ZabbixFake(ITENS_ZABBIX, latencia=latencia) as zabbix, SSHFake(latencia=latencia) as ssh:
+        # Os módulos do PGR leem o Zabbix do ambiente ao serem importados
+        os.environ["URL_ZBX"] = zabbix.url
+        os.environ.setdefault("USER_ZBX", "bench")
+        os.environ.setdefault("PASS_ZBX", "bench")
+        os.environ.setdefault("USER_JDBC", "bench")
+        os.environ.setdefault("PASS_JDBC", "bench")
+
+        raiz = tempfile.mkdtemp(prefix="pgr_bench_")
+        print(f"Zabbix falso em {zabbix.url}, SSH falso em {ssh.endereco[0]}:{ssh.endereco[1]}, arquivos em {raiz}")
+
+        resumos = []
+        tracemalloc.start()
+        with oracle_local(latencia), (graficos_em_arquivo() if args.graficos == "arquivo" else nullcontext()):
+            for fluxo in args.fluxo:
+                for quantidade in args.clientes:
+                    resumo = executar_lote(quantidade, fluxo, args.workers, zabbix, ssh, raiz)
+                    resumo["chamadas_zabbix"] = dict(zabbix.chamadas)
+                    resumo["conexoes_ssh"] = ssh.conexoes
+                    zabbix.chamadas.clear()
+                    ssh.conexoes = 0
+                    imprimir_lote(resumo)
+                    resumos.append(resumo)
+        tracemalloc.stop()
+
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resumos, f, indent=2, ensure_ascii=False)
+        print(f"\nResumo gravado em {args.saida}")
+    return 0 if all(r["sucessos"] == r["clientes"] for r in resumos) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
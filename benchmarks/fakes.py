@@ -0,0 +1,408 @@
+# benchmarks/fakes.py
+"""
+Substitutos locais dos sistemas externos usados pelo PGR, para medir o
+desempenho sem tocar no Zabbix, nos bancos e nos servidores dos clientes.
+
+- ZabbixFake: servidor HTTP com a API JSON-RPC (api_jsonrpc.php), as telas
+  de login/histórico usadas pelo app_graphics e o chart.php.
+- SSHFake: servidor SSH (paramiko) que executa localmente os comandos
+  recebidos, como os de coleta_ssh.COMANDOS.
+- OracleFake: conexão DB-API que responde às consultas do formatter.py com
+  linhas geradas, no lugar do banco Oracle.
+
+Todos aceitam uma latência artificial para simular a rede.
+"""
+import json
+import queue
+import math
+import time
+import zlib
+import random
+import socket
+import struct
+import logging
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import paramiko
+
+def png_solido(largura=120, altura=40, cor=(38, 163, 116)):
+    """Gera um PNG válido de uma cor só (usado como gráfico falso)."""
+    linha = b"\x00" + bytes(cor) * largura
+    dados = zlib.compress(linha * altura)
+
+    def bloco(tipo, conteudo):
+        return (struct.pack(">I", len(conteudo)) + tipo + conteudo
+                + struct.pack(">I", zlib.crc32(tipo + conteudo) & 0xffffffff))
+
+    cabecalho = struct.pack(">IIBBBBB", largura, altura, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + bloco(b"IHDR", cabecalho) + bloco(b"IDAT", dados) + bloco(b"IEND", b"")
+
+# ---------------------------------------------------------------------------
+# Zabbix
+# ---------------------------------------------------------------------------
+
+PAGINA_LOGIN = """<html><body>
+<form method="post" action="index.php">
+  <input id="name" name="name"><input id="password" name="password" type="password">
+  <button id="enter" name="enter" value="Sign in" type="submit">Sign in</button>
+</form></body></html>"""
+
+PAGINA_HISTORICO = """<html><body>
+<input id="from" value="now-1h"><input id="to" value="now">
+<button id="apply" onclick="document.getElementById('historyGraph').src='chart.php?itemids[]={itemid}&from='+document.getElementById('from').value+'&t='+Date.now()">Apply</button>
+<img id="historyGraph" src="chart.php?itemids[]={itemid}">
+</body></html>"""
+
+class ZabbixFake:
+    """
+    Zabbix local. itens = {itemid: valor} (valor é o último dado do item);
+    itens numéricos (int/float) também respondem a history.get/trend.get
+    com uma série sintética.
+    """
+    def __init__(self, itens=None, latencia=0.0, host="127.0.0.1", port=0):
+        self.itens = {str(k): v for k, v in (itens or {}).items()}
+        self.latencia = latencia
+        self.chamadas = {}
+        self._lock = threading.Lock()
+        self._png = png_solido()
+        self.servidor = ThreadingHTTPServer((host, port), self._handler())
+        self.servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.servidor.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _contar(self, metodo):
+        with self._lock:
+            self.chamadas[metodo] = self.chamadas.get(metodo, 0) + 1
+
+    # -- JSON-RPC ------------------------------------------------------------
+    def _value_type(self, valor):
+        if isinstance(valor, float):
+            return 0
+        if isinstance(valor, int):
+            return 3
+        return 4
+
+    def _serie(self, itemid, time_from, time_till, passo):
+        """Série sintética e determinística para itens numéricos."""
+        base = float(self.itens[itemid])
+        gerador = random.Random(int(itemid))
+        inicio = (time_from // passo) * passo
+        for clock in range(inicio, time_till + 1, passo):
+            yield clock, max(0.0, base + 15 * math.sin(clock / 86400 * 2 * math.pi) + gerador.uniform(-5, 5))
+
+    def _itemids(self, params):
+        itemids = params.get("itemids")
+        if itemids is None:
+            return list(self.itens)
+        if not isinstance(itemids, list):
+            itemids = [itemids]
+        return [str(i) for i in itemids if str(i) in self.itens]
+
+    def rpc(self, metodo, params):
+        self._contar(metodo)
+        agora = int(time.time())
+        if metodo == "apiinfo.version":
+            return "6.0.0"
+        if metodo == "user.login":
+            return "token-fake"
+        if metodo == "user.logout":
+            return True
+        if metodo == "item.get":
+            itens = []
+            for itemid in self._itemids(params):
+                valor = self.itens[itemid]
+                itens.append({
+                    "itemid": itemid,
+                    "hostid": "10001",
+                    "key_": f"fake.item[{itemid}]",
+                    "name": f"Item {itemid}",
+                    "units": "%" if not isinstance(valor, str) else "",
+                    "value_type": str(self._value_type(valor)),
+                    "lastvalue": valor if isinstance(valor, str) else str(valor),
+                    "lastclock": str(agora - 60),
+                })
+            return itens
+        if metodo == "history.get":
+            linhas = []
+            time_from = int(params.get("time_from", agora - 3600))
+            time_till = int(params.get("time_till", agora))
+            for itemid in self._itemids(params):
+                valor = self.itens[itemid]
+                if isinstance(valor, str):
+                    linhas.append({"itemid": itemid, "clock": str(agora - 60), "value": valor, "ns": "0"})
+                else:
+                    linhas.extend({"itemid": itemid, "clock": str(c), "value": f"{v:.4f}", "ns": "0"}
+                                  for c, v in self._serie(itemid, time_from, time_till, 60))
+            reverso = params.get("sortorder") == "DESC"
+            linhas.sort(key=lambda linha: int(linha["clock"]), reverse=reverso)
+            limite = params.get("limit")
+            return linhas[:int(limite)] if limite else linhas
+        if metodo == "trend.get":
+            linhas = []
+            time_from = int(params.get("time_from", agora - 30 * 86400))
+            time_till = int(params.get("time_till", agora))
+            for itemid in self._itemids(params):
+                if isinstance(self.itens[itemid], str):
+                    continue
+                for clock, valor in self._serie(itemid, time_from, time_till, 3600):
+                    linhas.append({
+                        "itemid": itemid, "clock": str(clock), "num": "60",
+                        "value_min": f"{max(0.0, valor - 7):.4f}",
+                        "value_avg": f"{valor:.4f}",
+                        "value_max": f"{valor + 7:.4f}",
+                    })
+            limite = params.get("limit")
+            return linhas[:int(limite)] if limite else linhas
+        raise ValueError(f"Método não suportado pelo Zabbix falso: {metodo}")
+
+    def _responder_rpc(self, requisicao):
+        try:
+            resultado = self.rpc(requisicao.get("method"), requisicao.get("params") or {})
+            return {"jsonrpc": "2.0", "result": resultado, "id": requisicao.get("id")}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "error": {"code": -32602, "message": "Invalid params.", "data": str(e)},
+                    "id": requisicao.get("id")}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _enviar(self, status, corpo, tipo="text/html", cabecalhos=None):
+                if isinstance(corpo, str):
+                    corpo = corpo.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(corpo)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def do_GET(self):
+                if fake.latencia:
+                    time.sleep(fake.latencia)
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                caminho = url.path.rsplit("/", 1)[-1]
+                if caminho in ("", "index.php"):
+                    fake._contar("web.login_page")
+                    self._enviar(200, PAGINA_LOGIN)
+                elif caminho == "zabbix.php":
+                    self._enviar(200, "<html><body>Dashboard</body></html>")
+                elif caminho == "history.php":
+                    fake._contar("web.history")
+                    itemid = (query.get("itemids[]") or query.get("itemids") or ["0"])[0]
+                    self._enviar(200, PAGINA_HISTORICO.replace("{itemid}", itemid))
+                elif caminho in ("chart.php", "chart2.php"):
+                    fake._contar("web.chart")
+                    self._enviar(200, fake._png, tipo="image/png")
+                else:
+                    self._enviar(404, "not found")
+
+            def do_POST(self):
+                if fake.latencia:
+                    time.sleep(fake.latencia)
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho)
+                caminho = urlparse(self.path).path.rsplit("/", 1)[-1]
+                if caminho == "api_jsonrpc.php":
+                    requisicao = json.loads(corpo or b"{}")
+                    if isinstance(requisicao, list):
+                        resposta = [fake._responder_rpc(r) for r in requisicao]
+                    else:
+                        resposta = fake._responder_rpc(requisicao)
+                    self._enviar(200, json.dumps(resposta), tipo="application/json")
+                elif caminho == "index.php":
+                    fake._contar("web.login")
+                    self._enviar(302, "", cabecalhos={
+                        "Set-Cookie": "zbx_session=fake; Path=/",
+                        "Location": "zabbix.php?action=dashboard.view",
+                    })
+                else:
+                    self._enviar(404, "not found")
+
+        return Handler
+
+# ---------------------------------------------------------------------------
+# SSH
+# ---------------------------------------------------------------------------
+
+class _InterfaceSSH(paramiko.ServerInterface):
+    def __init__(self):
+        self.comandos = queue.Queue()
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_exec_request(self, channel, command):
+        self.comandos.put((channel, command.decode("utf-8") if isinstance(command, bytes) else command))
+        return True
+
+class SSHFake:
+    """Servidor SSH local que executa os comandos recebidos com "sh -c" na própria máquina."""
+    def __init__(self, latencia=0.0, host="127.0.0.1", port=0):
+        self.latencia = latencia
+        self.chave = paramiko.RSAKey.generate(2048)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(128)
+        self.conexoes = 0
+        self.comandos = 0
+        self._lock = threading.Lock()
+        self._ativo = False
+
+    @property
+    def endereco(self):
+        return self.sock.getsockname()[:2]
+
+    def start(self):
+        self._ativo = True
+        threading.Thread(target=self._aceitar, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._ativo = False
+        self.sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _aceitar(self):
+        while self._ativo:
+            try:
+                cliente, _ = self.sock.accept()
+            except OSError:
+                break
+            with self._lock:
+                self.conexoes += 1
+            threading.Thread(target=self._atender, args=(cliente,), daemon=True).start()
+
+    def _atender(self, cliente):
+        transporte = paramiko.Transport(cliente)
+        transporte.add_server_key(self.chave)
+        interface = _InterfaceSSH()
+        try:
+            transporte.start_server(server=interface)
+            # Cada exec_command do cliente chega em um canal próprio
+            while transporte.is_active():
+                try:
+                    canal, comando = interface.comandos.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                threading.Thread(target=self._executar, args=(canal, comando), daemon=True).start()
+        except Exception as e:
+            logging.debug(f"SSH falso: conexão encerrada ({e})")
+        finally:
+            transporte.close()
+
+    def _executar(self, canal, comando):
+        with self._lock:
+            self.comandos += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        processo = subprocess.run(["sh", "-c", comando], capture_output=True, timeout=60)
+        canal.sendall(processo.stdout)
+        canal.sendall_stderr(processo.stderr)
+        canal.send_exit_status(processo.returncode)
+        canal.close()
+
+# ---------------------------------------------------------------------------
+# Oracle
+# ---------------------------------------------------------------------------
+
+class _CursorOracleFake:
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.linhas = []
+        self.arraysize = 100
+
+    def execute(self, query, parametros=None):
+        if self.conexao.latencia:
+            time.sleep(self.conexao.latencia)
+        self.conexao.consultas += 1
+        self.linhas = list(self.conexao.responder(query))
+
+    def fetchall(self):
+        linhas, self.linhas = self.linhas, []
+        return linhas
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        linhas, self.linhas = self.linhas[:size], self.linhas[size:]
+        return linhas
+
+    def fetchone(self):
+        return self.linhas.pop(0) if self.linhas else None
+
+    def close(self):
+        pass
+
+class OracleFake:
+    """Conexão DB-API que reconhece as consultas do formatter.py e devolve linhas geradas."""
+    def __init__(self, nome_banco="FAKEDB", latencia=0.0, linhas_backup=7):
+        self.nome_banco = nome_banco
+        self.latencia = latencia
+        self.linhas_backup = linhas_backup
+        self.consultas = 0
+
+    def responder(self, query):
+        texto = query.lower()
+        if "product_component_version" in texto:
+            return [("19.0.0.0.0",)]
+        if "dba_segments" in texto:
+            return [("APP", f"TABELA_{i:02d}", round(50 / (i + 1), 4)) for i in range(20)]
+        if "v$sqlarea" in texto:
+            return [(i + 1, 100.0 / (i + 1), 10 * (i + 1), 5000 * (i + 1), f"sql{i:05d}",
+                     f"SELECT * FROM TABELA_{i:02d} WHERE ID = :1") for i in range(10)]
+        if "rman_backup_job_details" in texto:
+            return [(f"2025-01-{d + 1:02d} 01:00:00", f"2025-01-{d + 1:02d} 01:30:00", 1024.0 * (d + 1),
+                     "COMPLETED", "DB INCR", "Monday", 1800) for d in range(self.linhas_backup)]
+        if "from dual" in texto:
+            return [(self.nome_banco,)]
+        return []
+
+    def cursor(self):
+        return _CursorOracleFake(self)
+
+    def close(self):
+        pass
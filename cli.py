@@ -0,0 +1,120 @@
+"""
+Geração de relatórios pela linha de comando, sem Tkinter.
+
+Exemplos:
+    python cli.py 12 15 40 --usuario pedro
+    python cli.py all --workers 8             # cada cliente no fluxo do seu tpbanco
+    python cli.py all --fluxo sqlserver       # só o fluxo informado, para todos
+    python cli.py all --agendado --dia 1      # para uso no cron
+
+No modo --agendado a execução é protegida por um arquivo de trava (duas
+execuções do cron nunca se sobrepõem), a saída vai para logs/cli.log e,
+com --dia, o lote só roda naquele dia do mês; nos outros dias o comando
+termina sem fazer nada. O código de saída é 0 quando todos os relatórios
+foram gerados, 1 quando algum falhou e 2 quando a execução não pôde começar.
+"""
+import os
+import sys
+import json
+import fcntl
+import getpass
+import logging
+import argparse
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.apps import metadata, relatorio
+
+LOG_DIR = "logs"
+LOCK_FILE = os.path.join(LOG_DIR, "pgr_cli.lock")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gera relatórios situacionais do PGR sem interface gráfica.")
+    parser.add_argument("clientes", nargs="+", help='IDs dos clientes (idcliente) ou "all" para todos')
+    parser.add_argument("--fluxo", choices=relatorio.FLUXOS, default=None,
+                        help="fluxo de coleta para todos os clientes (padrão: o do tipo de banco de cada cliente)")
+    parser.add_argument("--usuario", default=os.getenv("PGR_USUARIO") or getpass.getuser(),
+                        help="usuário registrado na auditoria (padrão: PGR_USUARIO ou usuário do sistema)")
+    parser.add_argument("--workers", type=int, default=None, help="relatórios simultâneos (padrão: PGR_WORKERS)")
+    parser.add_argument("--json", action="store_true", help="imprime o resumo em JSON")
+    parser.add_argument("--agendado", action="store_true", help="modo cron: trava de execução única e log em arquivo")
+    parser.add_argument("--dia", type=int, default=None, help="com --agendado, só executa neste dia do mês")
+    return parser.parse_args(argv)
+
+def resolver_clientes(clientes):
+    """Converte os argumentos em uma lista de idcliente ("all" expande para todos)."""
+    if any(cliente.lower() == "all" for cliente in clientes):
+        return [cliente[0] for cliente in metadata.fetch_clients()]
+    try:
+        return [int(cliente) for cliente in clientes]
+    except ValueError:
+        raise SystemExit(f'IDs de cliente inválidos: {" ".join(clientes)} (use números ou "all")')
+
+def adquirir_trava():
+    """Trava exclusiva não bloqueante; retorna o arquivo aberto ou None se já houver outra execução."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    lock = open(LOCK_FILE, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    lock.write(str(os.getpid()))
+    lock.flush()
+    return lock
+
+def imprimir_resumo(resultados, como_json=False):
+    if como_json:
+        print(json.dumps([vars(resultado) for resultado in resultados], ensure_ascii=False, indent=2, default=str))
+        return
+    for resultado in resultados:
+        status = "OK  " if resultado.sucesso else "ERRO"
+        detalhe = resultado.arquivo if resultado.sucesso else resultado.mensagem
+        print(f"[{status}] {resultado.client_id} {resultado.nome or '-'} ({resultado.duracao:.1f}s): {detalhe}")
+    sucesso = sum(1 for resultado in resultados if resultado.sucesso)
+    print(f"{sucesso} de {len(resultados)} relatórios gerados com sucesso.")
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.agendado:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        logging.basicConfig(
+            filename=os.path.join(LOG_DIR, "cli.log"),
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s'
+        )
+        if args.dia is not None and datetime.now().day != args.dia:
+            logging.info(f"Execução agendada ignorada: hoje não é dia {args.dia}.")
+            return 0
+        lock = adquirir_trava()
+        if lock is None:
+            logging.error("Outra execução agendada do PGR ainda está em andamento.")
+            return 2
+    else:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        client_ids = resolver_clientes(args.clientes)
+    except Exception as e:
+        logging.error(f"Erro ao buscar a lista de clientes: {e}")
+        return 2
+    if not client_ids:
+        logging.error("Nenhum cliente para processar.")
+        return 2
+
+    def on_done(resultado, concluidos, total):
+        status = "gerado" if resultado.sucesso else f"falhou ({resultado.mensagem})"
+        logging.info(f"[{concluidos}/{total}] Cliente {resultado.client_id} {resultado.nome or ''}: {status}")
+
+    logging.info(f"Gerando {len(client_ids)} relatório(s) no fluxo {args.fluxo or 'do tipo de banco de cada cliente'}.")
+    resultados = relatorio.gerar_relatorios(client_ids, args.usuario, fluxo=args.fluxo,
+                                            max_workers=args.workers, ao_concluir=on_done)
+    imprimir_resumo(resultados, como_json=args.json)
+    return 0 if all(resultado.sucesso for resultado in resultados) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
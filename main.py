@@ -1,25 +1,16 @@
-from tkinterweb import HtmlFrame
+import time
+
+# Referência para medir o tempo até a primeira janela
+INICIO = time.perf_counter()
+
 import tkinter as tk
-import os
-import psycopg2
-import json
-import subprocess
 from dotenv import load_dotenv
-import shutil
 from tkinter import messagebox
 from tkinter import ttk
-import socket
-from datetime import datetime
 import threading
 
 load_dotenv()
 
-host = os.getenv("HOST_DB")
-port = os.getenv("PORT_DB")
-dbname = os.getenv("NAME_DB")
-user = os.getenv("USER_DB")
-password = os.getenv("PASS_DB")
-
 def center_window(win, width, height):
     win.update_idletasks()
     screen_width = win.winfo_screenwidth()
@@ -28,240 +19,122 @@ def center_window(win, width, height):
     y = (screen_height - height) // 2
     win.geometry(f"{width}x{height}+{x}+{y}")
 
-def connect_db():
-    try:
-        connection = psycopg2.connect(
-            host=host,
-            port=port,
-            dbname=dbname,
-            user=user,
-            password=password
-        )
-        return connection
-    except Exception as e:
-        messagebox.showerror("Erro", f"Erro ao conectar ao banco de dados: {e}")
-        return None
-
 def fetch_clients():
-    connection = connect_db()
-    if connection:
-        try:
-            cursor = connection.cursor()
-            cursor.execute("SELECT idcliente, nome FROM tb_cliente;")
-            return cursor.fetchall()
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao buscar dados: {e}")
-            return []
-        finally:
-            cursor.close()
-            connection.close()
-    return []
-
-def fetch_client_data(client_id):
-    connection = connect_db()
-    if connection:
-        try:
-            cursor = connection.cursor()
-            cursor.execute("SELECT * FROM tb_cliente WHERE idcliente = %s;", (client_id,))
-            return cursor.fetchone()
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao buscar dados do cliente: {e}")
-            return None
-        finally:
-            cursor.close()
-            connection.close()
-    return None
+    # Importado só aqui: psycopg2 e o pool de conexões carregam depois que a janela já apareceu
+    from src.apps import metadata
+    return metadata.fetch_clients(com_tipo=True)
 
-def save_user_data(username, client_name):
-    user_ip = socket.gethostbyname(socket.gethostname())
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    connection = connect_db()
-    if connection:
+def load_clients_async(client_root, on_loaded):
+    """Busca os clientes em uma thread e entrega (clientes, erro) à interface via after()."""
+    def worker():
         try:
-            cursor = connection.cursor()
-            cursor.execute("""
-                INSERT INTO tb_autentificacao (username, ipmaquina, horario, cliente)
-                VALUES (%s, %s, %s, %s);
-            """, (username, user_ip, timestamp, client_name))
-            connection.commit()
-            print("Dados do usuário salvos no banco de dados com sucesso!")
+            clients, erro = fetch_clients(), None
         except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao salvar os dados do usuário no banco: {e}")
-        finally:
-            cursor.close()
-            connection.close()
-
-def save_client_info(client_data):
-    # A coluna "nome" será utilizada para formar o nome do PDF.
-    # Conforme solicitado, "userssh" é a coluna 9 (índice 8) e "senhassh" é a coluna 10 (índice 9)
-    client_info = {
-        "idcliente": client_data[0],
-        "nome": client_data[1],
-        "ip": client_data[2],
-        "portassh": client_data[3],
-        "tpbanco": client_data[4],
-        "nomebanco": client_data[5],
-        "portabanco": client_data[6],
-        "idhostzbx": client_data[7],
-        "userssh": client_data[8],
-        "senhassh": client_data[9]
-    }
-    with open('client_info.json', 'w') as json_file:
-        json.dump(client_info, json_file)
-
-def get_month_in_portuguese(dt):
-    """Retorna o nome do mês em português (minúsculo) para o datetime informado."""
-    months = {
-        1: 'janeiro',
-        2: 'fevereiro',
-        3: 'março',
-        4: 'abril',
-        5: 'maio',
-        6: 'junho',
-        7: 'julho',
-        8: 'agosto',
-        9: 'setembro',
-        10: 'outubro',
-        11: 'novembro',
-        12: 'dezembro'
-    }
-    return months[dt.month]
-
-def clean():
-    try:
-        # Captura o valor da coluna "nome" antes de remover o arquivo de configurações
-        nome_cliente = None
-        if os.path.exists('client_info.json'):
-            with open('client_info.json', 'r') as f:
-                client_info = json.load(f)
-                nome_cliente = client_info.get("nome")
-            os.remove('client_info.json')
-            print("Arquivo client_info.json apagado com sucesso!")
-        else:
-            print("Arquivo client_info.json não encontrado para remoção.")
-        
-        if os.path.exists("output/images"):
-            shutil.rmtree("output/images")
-            print("Pasta 'images' apagada com sucesso!")
-        
-        # Renomeia o PDF gerado.
-        # O script mergepdf.py originalmente gera o arquivo em "output/relatorio.pdf"
-        if os.path.exists("output/relatorio.pdf"):
-            mes_atual = get_month_in_portuguese(datetime.now())
-            # Se nome_cliente não foi encontrado, usa "Cliente" como padrão
-            nome_cliente = nome_cliente if nome_cliente else "Cliente"
-            novo_nome_pdf = f"output/Relatório situacional {nome_cliente} de {mes_atual}.pdf"
-            shutil.move("output/relatorio.pdf", novo_nome_pdf)
-            print(f"Relatório movido para a pasta 'output' com o nome '{novo_nome_pdf}' com sucesso!")
-        
-        if os.path.exists("output/reports"):
-            shutil.rmtree("output/reports")
-            print("Pasta 'reports' apagada com sucesso!")
-        
-        # Exclusão das pastas adicionais
-        if os.path.exists("output/pdf temp"):
-            shutil.rmtree("output/pdf temp")
-            print("Pasta 'pdf temp' apagada com sucesso!")
-        
-        if os.path.exists("output/graphics"):
-            shutil.rmtree("output/graphics")
-            print("Pasta 'graphics' apagada com sucesso!")
-        
-        if os.path.exists("logs/zabbix.log"):
-            os.remove("logs/zabbix.log")
-            print("Arquivo 'zabbix.log' apagado com sucesso!")
-        
-        if os.path.exists("logs/pdf.log"):
-            os.remove("logs/pdf.log")
-            print("Arquivo 'pdf.log' apagado com sucesso!")
-    
-    except Exception as e:
-        messagebox.showerror("Erro", f"Erro ao limpar arquivos temporários: {e}")
+            clients, erro = [], e
+        client_root.after(0, lambda: on_loaded(clients, erro))
+    threading.Thread(target=worker, daemon=True).start()
 
-def execute_scripts():
-    try:
-        subprocess.run(["python", "src/apps/app_graphics.py"], check=True)
-        subprocess.run(["python", "src/apps/formatter.py"], check=True)
-        subprocess.run(["python", "src/apps/mergepdf.py"], check=True)
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"Erro ao executar os scripts: {e}")
+def log_first_window():
+    print(f"Janela exibida em {(time.perf_counter() - INICIO) * 1000:.0f} ms após o início.")
 
 def generate_report_worker(client_id, username):
-    client_data = fetch_client_data(client_id)
-    if client_data:
-        save_client_info(client_data)
-        save_user_data(username, client_data[1])
-        try:
-            execute_scripts()
-            clean()
-            return True, "Relatório gerado com sucesso!"
-        except Exception as e:
-            return False, str(e)
-    else:
-        return False, "Cliente não encontrado."
+    # A geração (sem Tkinter) fica em src/apps/relatorio.py, compartilhada com o cli.py;
+    # o fluxo (Oracle, SQL Server) é escolhido pelo tipo de banco do cliente
+    from src.apps import relatorio
+    resultado = relatorio.gerar_relatorio(client_id, username)
+    return resultado.sucesso, resultado.mensagem
 
-def finish_report_generation(progress_win, client_root, success, msg):
+def finish_report_generation(progress_win, client_root, success_count, errors):
     progress_win.destroy()
-    if success:
-        messagebox.showinfo("Sucesso", msg)
+    total = success_count + len(errors)
+    if success_count == total:
+        messagebox.showinfo("Sucesso", "Relatório gerado com sucesso!" if total == 1 else f"Todos os {total} relatórios gerados com sucesso!")
     else:
-        messagebox.showerror("Erro", msg)
+        error_msg = f"{success_count} relatórios gerados com sucesso, mas ocorreram erros em {len(errors)} relatório(is):\n" + "\n".join(errors)
+        messagebox.showerror("Erro", error_msg)
 
-def thread_generate_report(client_id, username, progress_win, client_root):
-    success, msg = generate_report_worker(client_id, username)
-    client_root.after(0, lambda: finish_report_generation(progress_win, client_root, success, msg))
+def generate_reports_worker(client_ids, username, progress_label, total, client_root):
+    def on_done(resultado, concluidos, total):
+        client_root.after(0, lambda: progress_label.config(text=f"{concluidos} de {total} relatórios concluídos..."))
 
-def show_client_selection(root):
-    root.destroy()
-    client_root = tk.Tk()
+    from src.apps import relatorio
+
+    # Os clientes são gerados em paralelo, limitados a PGR_WORKERS relatórios simultâneos,
+    # cada um só com os coletores do seu tipo de banco (clientes Oracle e SQL Server podem ser misturados)
+    resultados = relatorio.gerar_relatorios(client_ids, username, ao_concluir=on_done)
+    success_count = sum(1 for resultado in resultados if resultado.sucesso)
+    errors = [f"Cliente ID {resultado.client_id}: {resultado.mensagem}" for resultado in resultados if not resultado.sucesso]
+    return success_count, errors
+
+def thread_generate_reports(client_ids, username, progress_win, client_root, progress_label):
+    success_count, errors = generate_reports_worker(client_ids, username, progress_label, len(client_ids), client_root)
+    client_root.after(0, lambda: finish_report_generation(progress_win, client_root, success_count, errors))
+
+def show_client_selection(client_root):
     client_root.title("Gerador de Relatórios")
-    center_window(client_root, 400, 300)
+    center_window(client_root, 400, 500)
+
+    tk.Label(client_root, text="Selecione um ou mais clientes:").pack(pady=10)
+    
+    checkbox_frame = tk.Frame(client_root, bg="white", bd=1, relief=tk.SOLID, width=300, height=250)
+    checkbox_frame.pack(pady=5)
+    checkbox_frame.pack_propagate(False)
+    status_label = tk.Label(checkbox_frame, text="Carregando clientes...", fg="gray", bg="white")
+    status_label.pack(pady=10)
 
-    tk.Label(client_root, text="Selecione um cliente:").pack(pady=10)
-    clients = fetch_clients()
-    client_names = [client[1] for client in clients]
-    client_var = tk.StringVar()
-    client_dropdown = ttk.Combobox(client_root, textvariable=client_var, values=client_names, state="readonly")
-    client_dropdown.pack(pady=5)
+    checkbox_vars = []
 
     tk.Label(client_root, text="Seu nome de usuário:").pack(pady=10)
     username_entry = tk.Entry(client_root)
     username_entry.pack(pady=5)
 
     def on_generate():
-        selected_client_name = client_var.get()
-        username = username_entry.get()
-        if not selected_client_name or not username:
-            messagebox.showerror("Erro", "Por favor, preencha todos os campos.")
+        selected_clients = [client for client, var in checkbox_vars if var.get()]
+        username = username_entry.get().strip()
+        if not selected_clients or not username:
+            messagebox.showerror("Erro", "Selecione pelo menos um cliente e preencha seu nome de usuário.")
             return
-        selected_client = next((client for client in clients if client[1] == selected_client_name), None)
-        if selected_client:
-            # Cria a janela de progresso
-            progress_win = tk.Toplevel(client_root)
-            progress_win.title("Aguarde...")
-            center_window(progress_win, 300, 100)
-            tk.Label(progress_win, text="Gerando relatório...").pack(pady=10, padx=10)
-            progress_bar = ttk.Progressbar(progress_win, mode='indeterminate', length=250)
-            progress_bar.pack(pady=10, padx=10)
-            progress_bar.start()
-            # Executa a geração do relatório em uma thread separada
-            threading.Thread(
-                target=thread_generate_report,
-                args=(selected_client[0], username, progress_win, client_root),
-                daemon=True
-            ).start()
-        else:
-            messagebox.showerror("Erro", "Cliente selecionado não encontrado.")
-
-    tk.Button(client_root, text="Gerar Relatório", command=on_generate).pack(pady=20)
+        client_ids = [client[0] for client in selected_clients]
+        
+        progress_win = tk.Toplevel(client_root)
+        progress_win.title("Aguarde...")
+        center_window(progress_win, 300, 120)
+        progress_label = tk.Label(progress_win, text="Gerando relatórios...")
+        progress_label.pack(pady=10, padx=10)
+        progress_bar = ttk.Progressbar(progress_win, mode='indeterminate', length=250)
+        progress_bar.pack(pady=10, padx=10)
+        progress_bar.start()
+        threading.Thread(
+            target=thread_generate_reports,
+            args=(client_ids, username, progress_win, client_root, progress_label),
+            daemon=True
+        ).start()
+
+    generate_button = tk.Button(client_root, text="Gerar Relatórios", command=on_generate, state="disabled")
+    generate_button.pack(pady=20)
+
+    def on_clients_loaded(clients, erro):
+        if erro is not None:
+            status_label.config(text="Não foi possível carregar os clientes.", fg="red")
+            messagebox.showerror("Erro", f"Erro ao buscar dados: {erro}")
+            return
+        status_label.destroy()
+        for client in clients:
+            display_text = f"{client[1]} ({client[2] or 'tipo não cadastrado'})"
+            var = tk.BooleanVar()
+            chk = tk.Checkbutton(checkbox_frame, text=display_text, variable=var, anchor="w", bg="white")
+            chk.pack(anchor='w', fill="x", padx=5, pady=2)
+            checkbox_vars.append((client, var))
+        generate_button.config(state="normal")
+
+    # A janela aparece primeiro; a lista de clientes chega em segundo plano
+    client_root.after_idle(log_first_window)
+    load_clients_async(client_root, on_clients_loaded)
     client_root.mainloop()
 
 def main():
     # Abre diretamente a janela de seleção de cliente sem autenticação
-    root = tk.Tk()
-    root.withdraw()  # Oculta a janela principal
-    show_client_selection(root)
+    show_client_selection(tk.Tk())
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,28 @@
 # src/apps/app_graphics.py
+"""
+Captura dos gráficos de CPU e memória do Zabbix.
+
+No modo padrão (GRAPH_CAPTURE_MODE=local) os gráficos são desenhados a
+partir das tendências da API (ver graficos.py), sem depender do frontend do
+Zabbix; se isso falhar, os PNGs são baixados do chart.php como no modo http.
+Com GRAPH_CAPTURE_MODE=http o login no frontend é feito uma vez por processo
+com uma sessão HTTP e os PNGs são baixados direto do chart.php (ou
+chart2.php, para gráficos com graphid), com período e tamanho passados como
+parâmetros. O Chromium (GRAPH_CAPTURE_MODE=navegador) só é usado quando
+pedido ou quando os outros modos falham, e fica aberto entre os relatórios
+(ver navegador.py).
+"""
 import os
 import logging
-import re
 import json
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+import time
+import asyncio
+import threading
+from urllib.parse import urlparse, parse_qs
+import requests
 from dotenv import load_dotenv
+from src.apps.workspace import workspace_padrao
+from src.apps.metricas import cronometrar
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv(dotenv_path='/home/tauge/Documents/tauge/PGR/.env')
@@ -22,102 +40,215 @@ logging.basicConfig(
 ZABBIX_URL = os.getenv("URL_ZBX")
 ZABBIX_USER = os.getenv("USER_ZBX")
 ZABBIX_PASSWORD = os.getenv("PASS_ZBX")
-OUTPUT_DIR = "/home/tauge/Documents/tauge/PGR/output/graphics"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def login_zabbix(page):
+# "local" desenha a partir das tendências (com o chart.php e o navegador como
+# reserva), "http" baixa os PNGs do chart.php (com o navegador como reserva);
+# "navegador" usa só o Chromium
+CAPTURE_MODE = os.getenv("GRAPH_CAPTURE_MODE", "local").lower()
+GRAPH_PERIOD = os.getenv("GRAPH_PERIOD", "now-30d")
+GRAPH_WIDTH = int(os.getenv("GRAPH_WIDTH", "1200"))
+GRAPH_HEIGHT = int(os.getenv("GRAPH_HEIGHT", "300"))
+HTTP_TIMEOUT = float(os.getenv("GRAPH_HTTP_TIMEOUT", "30"))
+
+# (nome, chave no ulrzbx.json, arquivo de saída)
+GRAFICOS = (
+    ("cpu", "urlcpu", "full_page_cpu.png"),
+    ("memoria", "urlmemoria", "full_page_memoria.png"),
+)
+
+# Espera pela imagem no navegador: limites (ms) do timeout adaptativo
+GRAPH_TIMEOUT_MIN_MS = int(os.getenv("GRAPH_TIMEOUT_MIN_MS", "5000"))
+GRAPH_TIMEOUT_MAX_MS = int(os.getenv("GRAPH_TIMEOUT_MAX_MS", "60000"))
+
+# Média móvel exponencial das latências das capturas no navegador
+_latencia_media_ms = None
+_latencia_lock = threading.Lock()
+
+# Sessão HTTP autenticada, compartilhada por todos os relatórios do processo
+_sessao = None
+_sessao_lock = threading.Lock()
+
+class SessaoExpirada(Exception):
+    """O Zabbix devolveu a tela de login no lugar da imagem."""
+
+def login_http():
+    """Faz o login no frontend do Zabbix e retorna a sessão com o cookie de sessão."""
+    sessao = requests.Session()
+    resposta = sessao.post(
+        f"{ZABBIX_URL}/index.php",
+        data={"name": ZABBIX_USER, "password": ZABBIX_PASSWORD, "autologin": "1", "enter": "Sign in"},
+        timeout=HTTP_TIMEOUT,
+    )
+    resposta.raise_for_status()
+    if not any(cookie.name in ("zbx_session", "zbx_sessionid") for cookie in sessao.cookies):
+        raise PermissionError("Login no frontend do Zabbix recusado (cookie de sessão ausente).")
+    logging.info("Login HTTP no Zabbix realizado com sucesso.")
+    return sessao
+
+def obter_sessao(renovar=False):
+    """Retorna a sessão HTTP do processo, fazendo o login apenas na primeira vez ou quando expira."""
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None or renovar:
+            with cronometrar("zabbix_login_http"):
+                _sessao = login_http()
+        return _sessao
+
+def url_do_grafico(url):
     """
-    Realiza o login no Zabbix.
-    Página de login: {ZABBIX_URL}/
-      - Campo de usuário: input com id "name"
-      - Campo de senha: input com id "password"
-      - Botão de login: button com id "enter"
-    Após o login, o Zabbix redireciona para uma URL contendo "zabbix.php?action=dashboard.view".
+    Converte a URL da tela do gráfico (history.php com itemids[] ou
+    charts.php/graphs com graphid) na URL da imagem, com período e tamanho.
     """
-    login_url = f"{ZABBIX_URL}/"
-    logging.info(f"Iniciando login na URL: {login_url}")
-    
-    page.goto(login_url, wait_until="networkidle")
-    
-    # Aguarda e preenche os campos de login
-    page.wait_for_selector("input#name", timeout=15000)
-    page.fill("input#name", ZABBIX_USER)
-    page.fill("input#password", ZABBIX_PASSWORD)
-    
-    # Aguarda o botão de login e clica nele, esperando a navegação para o dashboard
-    page.wait_for_selector("button#enter", timeout=15000)
-    with page.expect_navigation(url=re.compile(r".*zabbix\.php\?action=dashboard\.view.*"), timeout=30000):
-        page.click("button#enter")
-    
-    logging.info(f"Login realizado com sucesso. URL atual: {page.url}")
-
-def set_date_and_capture(page, url, output_filename):
+    parametros = parse_qs(urlparse(url).query)
+    periodo = {"from": GRAPH_PERIOD, "to": "now", "width": GRAPH_WIDTH, "height": GRAPH_HEIGHT}
+    graphid = parametros.get("graphid")
+    if graphid:
+        return f"{ZABBIX_URL}/chart2.php", dict(periodo, graphid=graphid[0])
+    itemids = parametros.get("itemids[]") or parametros.get("itemids") or parametros.get("itemid")
+    if not itemids:
+        raise ValueError(f"Não foi possível identificar o item ou gráfico na URL: {url}")
+    return f"{ZABBIX_URL}/chart.php", dict(periodo, **{"itemids[]": itemids, "type": 0})
+
+def baixar_grafico(url, output_path):
+    """Baixa o PNG do gráfico com a sessão do processo, renovando o login uma vez se necessário."""
+    endereco, parametros = url_do_grafico(url)
+    for tentativa in range(2):
+        sessao = obter_sessao(renovar=tentativa > 0)
+        resposta = sessao.get(endereco, params=parametros, timeout=HTTP_TIMEOUT)
+        resposta.raise_for_status()
+        if resposta.headers.get("Content-Type", "").startswith("image/"):
+            with open(output_path, "wb") as f:
+                f.write(resposta.content)
+            logging.info(f"Gráfico salvo em {output_path} ({len(resposta.content)} bytes).")
+            return output_path
+        logging.info("Sessão do Zabbix expirada; refazendo o login.")
+    raise SessaoExpirada(f"O Zabbix não devolveu uma imagem para {url}")
+
+def capturar_via_http(urls, output_dir):
+    for nome, chave, arquivo in GRAFICOS:
+        with cronometrar("grafico", nome):
+            baixar_grafico(urls[chave], os.path.join(output_dir, arquivo))
+
+def _timeout_adaptativo():
+    """Timeout (ms) da espera pelo gráfico: algumas vezes a média móvel das últimas latências."""
+    with _latencia_lock:
+        if _latencia_media_ms is None:
+            return GRAPH_TIMEOUT_MAX_MS
+        return int(min(GRAPH_TIMEOUT_MAX_MS, max(GRAPH_TIMEOUT_MIN_MS, 4 * _latencia_media_ms + 2000)))
+
+def _registrar_latencia(latencia_ms):
+    global _latencia_media_ms
+    with _latencia_lock:
+        if _latencia_media_ms is None:
+            _latencia_media_ms = latencia_ms
+        else:
+            _latencia_media_ms = 0.8 * _latencia_media_ms + 0.2 * latencia_ms
+
+def _resposta_do_grafico(resposta):
+    """Reconhece a imagem do gráfico já com o período pedido (chart.php/chart2.php)."""
+    endereco = urlparse(resposta.url)
+    if not endereco.path.endswith(("chart.php", "chart2.php")):
+        return False
+    periodo = parse_qs(endereco.query).get("from")
+    return periodo is None or periodo[0] == GRAPH_PERIOD
+
+async def set_date_and_capture(pool, url, output_path):
     """
-    Acessa a URL do gráfico, altera o período para "now-30d" a "now",
-    clica no botão Apply, aguarda 7 segundos e captura a imagem do gráfico.
+    Acessa a URL do gráfico, altera o período para GRAPH_PERIOD a "now",
+    clica no botão Apply e grava a imagem devolvida pelo chart.php assim
+    que a resposta chega, sem pausa fixa nem screenshot.
     """
     logging.info(f"Acessando URL: {url}")
-    page.goto(url, wait_until="networkidle")
-    
-    # Aguarda os campos de data e botão de apply
-    page.wait_for_selector("input#from", timeout=15000)
-    page.wait_for_selector("input#to", timeout=15000)
-    page.wait_for_selector("button#apply", timeout=15000)
-    
-    # Define o período de 30 dias
-    page.fill("input#from", "now-30d")
-    page.fill("input#to", "now")
-    page.click("button#apply")
-    
-    # Aguarda 7 segundos para que o gráfico seja atualizado
-    page.wait_for_timeout(7000)
-    
-    # Aguarda que o elemento do gráfico esteja visível
-    page.wait_for_selector("img#historyGraph", timeout=15000)
-    
-    # Captura apenas o elemento do gráfico
-    output_path = os.path.join(OUTPUT_DIR, output_filename)
-    page.locator("img#historyGraph").screenshot(path=output_path)
-    logging.info(f"Screenshot do gráfico salvo com sucesso em: {output_path}")
-
-def capture_pages():
-    # Carrega as URLs do arquivo JSON (localizado na raiz da aplicação)
-    json_file = 'ulrzbx.json'
+    contexto, page = await pool.abrir(url, wait_until="domcontentloaded")
+    try:
+        # Aguarda os campos de data e botão de apply
+        await page.wait_for_selector("input#from", timeout=15000)
+        await page.wait_for_selector("input#to", timeout=15000)
+        await page.wait_for_selector("button#apply", timeout=15000)
+
+        # Define o período (padrão: 30 dias)
+        await page.fill("input#from", GRAPH_PERIOD)
+        await page.fill("input#to", "now")
+
+        # Espera a resposta da imagem com o novo período, com timeout adaptado às últimas capturas
+        timeout = _timeout_adaptativo()
+        inicio = time.perf_counter()
+        async with page.expect_response(_resposta_do_grafico, timeout=timeout) as info:
+            await page.click("button#apply")
+        resposta = await info.value
+        if not resposta.ok or not (resposta.headers.get("content-type") or "").startswith("image/"):
+            raise SessaoExpirada(f"O Zabbix não devolveu uma imagem para {url} (HTTP {resposta.status})")
+        conteudo = await resposta.body()
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        _registrar_latencia(latencia_ms)
+
+        with open(output_path, "wb") as f:
+            f.write(conteudo)
+        logging.info(f"Gráfico salvo em {output_path} em {latencia_ms:.0f} ms "
+                     f"({len(conteudo)} bytes, timeout {timeout} ms).")
+    finally:
+        await pool.liberar(contexto, page)
+
+async def _capturar_grafico(pool, nome, url, output_path):
+    with cronometrar("grafico", nome):
+        await set_date_and_capture(pool, url, output_path)
+
+async def _capturar_graficos(pool, pedidos):
+    # CPU e memória em páginas simultâneas (limitadas pelo pool)
+    return await asyncio.gather(*(_capturar_grafico(pool, *pedido) for pedido in pedidos), return_exceptions=True)
+
+def capture_pages(workspace=None):
+    workspace = workspace or workspace_padrao()
+    output_dir = workspace.graphics_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Carrega as URLs do arquivo JSON (localizado na área de trabalho da execução)
+    json_file = workspace.urlzbx_file
     try:
         with open(json_file, 'r') as f:
             data = json.load(f)
-        url_cpu = data.get("urlcpu")
-        url_memoria = data.get("urlmemoria")
         logging.info("URLs carregadas do arquivo JSON com sucesso.")
     except Exception as e:
         logging.error(f"Erro ao ler o arquivo JSON: {e}")
         print(f"Erro ao ler o arquivo JSON: {e}")
         return
 
-    with sync_playwright() as p:
+    if CAPTURE_MODE == "local":
         try:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
-            
-            # Efetua o login no Zabbix
-            login_zabbix(page)
-            
-            # Captura do gráfico de CPU (após alterar para 30 dias)
-            set_date_and_capture(page, url_cpu, "full_page_cpu.png")
-            
-            # Captura do gráfico de Memória (após alterar para 30 dias)
-            set_date_and_capture(page, url_memoria, "full_page_memoria.png")
-            
-            print("Imagens capturadas com sucesso!")
-        except PlaywrightTimeoutError as e:
-            logging.error(f"Timeout ao aguardar o estado da página: {e}")
-            print(f"Timeout ao aguardar o estado da página: {e}")
+            from src.apps import graficos
+            graficos.gerar_graficos(workspace)
+            print("Gráficos gerados localmente com sucesso!")
+            return
         except Exception as e:
-            logging.error(f"Erro durante a execução: {e}")
-            print(f"Erro durante a execução: {e}")
-        finally:
-            browser.close()
+            logging.error(f"Falha ao gerar os gráficos a partir das tendências, baixando do Zabbix: {e}")
+    if CAPTURE_MODE in ("local", "http"):
+        try:
+            capturar_via_http(data, output_dir)
+            print("Imagens baixadas com sucesso!")
+            return
+        except Exception as e:
+            logging.error(f"Falha ao baixar os gráficos via HTTP, usando o navegador: {e}")
+
+    capturar_via_navegador(data, output_dir)
+
+def capturar_via_navegador(urls, output_dir):
+    """Captura os gráficos no navegador persistente do processo (ver navegador.py)."""
+    from src.apps import navegador
+
+    pool = navegador.obter_pool()
+    pedidos = [(nome, urls.get(chave), os.path.join(output_dir, arquivo)) for nome, chave, arquivo in GRAFICOS]
+    try:
+        resultados = pool.executar(_capturar_graficos(pool, pedidos))
+    except Exception as e:
+        logging.error(f"Erro durante a execução: {e}")
+        print(f"Erro durante a execução: {e}")
+        return
+    for (nome, url, _), resultado in zip(pedidos, resultados):
+        if isinstance(resultado, Exception):
+            logging.error(f"Erro ao capturar o gráfico {nome} ({url}): {resultado}")
+            print(f"Erro ao capturar o gráfico {nome}: {resultado}")
+    if not any(isinstance(resultado, Exception) for resultado in resultados):
+        print("Imagens capturadas com sucesso!")
 
 if __name__ == "__main__":
     capture_pages()
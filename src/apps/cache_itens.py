@@ -0,0 +1,115 @@
+# src/apps/cache_itens.py
+"""
+Cache local (SQLite) dos metadados dos itens do Zabbix.
+
+value_type, chave, host, nome e unidade de um item praticamente nunca mudam,
+então ficam gravados em PGR_CACHE_DIR/zabbix_itens.sqlite3 por
+ITEM_CACHE_TTL segundos e são compartilhados por todas as execuções da
+máquina (GUI, cli.py e cron): com eles no cache, o item.get dos valores
+pede só lastvalue e lastclock. Itens que o Zabbix diz não existir são
+removidos com invalidar().
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+
+from dotenv import load_dotenv
+
+from src.apps.workspace import BASE_DIR
+
+load_dotenv()
+
+CACHE_DIR = os.getenv("PGR_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+CACHE_FILE = os.path.join(CACHE_DIR, "zabbix_itens.sqlite3")
+# Validade (segundos) dos metadados de um item; 0 desativa o cache
+CACHE_TTL = float(os.getenv("ITEM_CACHE_TTL", "86400"))
+
+COLUNAS = ("itemid", "value_type", "key_", "hostid", "name", "units")
+
+_criado = False
+_criar_lock = threading.Lock()
+
+def _conectar():
+    global _criado
+    conexao = sqlite3.connect(CACHE_FILE, timeout=30)
+    if not _criado:
+        with _criar_lock:
+            if not _criado:
+                conexao.execute("PRAGMA journal_mode=WAL")
+                conexao.execute("""
+                    CREATE TABLE IF NOT EXISTS itens (
+                        itemid TEXT PRIMARY KEY,
+                        value_type INTEGER NOT NULL,
+                        key_ TEXT,
+                        hostid TEXT,
+                        name TEXT,
+                        units TEXT,
+                        atualizado_em REAL NOT NULL
+                    )
+                """)
+                conexao.commit()
+                _criado = True
+    return conexao
+
+def _seguro(funcao, padrao):
+    """Falhas no cache nunca interrompem o relatório: viram log e o valor padrão."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with closing(_conectar()) as conexao, conexao:
+            return funcao(conexao)
+    except (OSError, sqlite3.Error) as e:
+        logging.error(f"Erro no cache de itens do Zabbix ({CACHE_FILE}): {e}")
+        return padrao
+
+def obter(itemids):
+    """Metadados ainda válidos dos itens pedidos: {itemid: {coluna: valor}}."""
+    itemids = [str(itemid) for itemid in itemids]
+    if CACHE_TTL <= 0 or not itemids:
+        return {}
+    limite = time.time() - CACHE_TTL
+
+    def consultar(conexao):
+        marcadores = ",".join("?" * len(itemids))
+        linhas = conexao.execute(
+            f"SELECT {', '.join(COLUNAS)} FROM itens "
+            f"WHERE itemid IN ({marcadores}) AND atualizado_em >= ?",
+            (*itemids, limite),
+        ).fetchall()
+        return {linha[0]: dict(zip(COLUNAS, linha)) for linha in linhas}
+
+    return _seguro(consultar, {})
+
+def gravar(itens):
+    """Grava/atualiza os metadados de itens devolvidos por item.get (precisam de itemid e value_type)."""
+    if CACHE_TTL <= 0 or not itens:
+        return
+    agora = time.time()
+    linhas = [
+        (str(item["itemid"]), int(item["value_type"]), item.get("key_"), item.get("hostid"),
+         item.get("name"), item.get("units"), agora)
+        for item in itens
+    ]
+
+    def inserir(conexao):
+        conexao.executemany("""
+            INSERT INTO itens (itemid, value_type, key_, hostid, name, units, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (itemid) DO UPDATE SET
+                value_type = excluded.value_type, key_ = excluded.key_, hostid = excluded.hostid,
+                name = excluded.name, units = excluded.units, atualizado_em = excluded.atualizado_em
+        """, linhas)
+
+    _seguro(inserir, None)
+
+def invalidar(itemids=None):
+    """Remove os itens informados (ou todos) do cache."""
+    if itemids is None:
+        _seguro(lambda conexao: conexao.execute("DELETE FROM itens"), None)
+        return
+    itemids = [str(itemid) for itemid in itemids]
+    if itemids:
+        _seguro(lambda conexao: conexao.executemany(
+            "DELETE FROM itens WHERE itemid = ?", [(itemid,) for itemid in itemids]), None)
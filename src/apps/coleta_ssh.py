@@ -0,0 +1,332 @@
+# src/apps/coleta_ssh.py
+"""
+Coleta de informações dos servidores dos clientes via SSH.
+
+Cada servidor recebe uma única conexão SSH por processo, guardada em cache
+e reaproveitada por todas as coletas (inclusive entre relatórios) enquanto
+estiver ativa e não ficar ociosa por mais de SSH_CACHE_TTL segundos. As
+conexões ociosas há mais tempo que isso são fechadas por uma varredura, feita
+a cada obter_conexao() e, enquanto houver conexões no cache, periodicamente
+em segundo plano, para que a GUI ou o cron não as mantenham abertas. Os
+comandos são enviados juntos em um único exec_command: o script remoto
+delimita a saída, o erro e o status de cada comando com marcadores, e a
+resposta é separada localmente.
+
+Os comandos executados estão em COMANDOS. Em lotes, coletar_frota() consulta
+muitos servidores ao mesmo tempo (no máximo SSH_FANOUT_WORKERS), com
+timeouts de conexão e de comando por servidor, e guarda os resultados para
+que o relatório de cada cliente os use sem conectar de novo.
+"""
+import os
+import re
+import time
+import shlex
+import atexit
+import logging
+import secrets
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+from dotenv import load_dotenv
+
+from src.apps.metricas import cronometrar
+
+load_dotenv()
+
+# Tempo (segundos) que uma conexão ociosa fica no cache antes de ser fechada
+SSH_CACHE_TTL = float(os.getenv("SSH_CACHE_TTL", "300"))
+SSH_CONNECT_TIMEOUT = float(os.getenv("SSH_CONNECT_TIMEOUT", "15"))
+SSH_COMMAND_TIMEOUT = float(os.getenv("SSH_COMMAND_TIMEOUT", "60"))
+# Autenticação por chave (opcional): arquivo da chave privada e sua senha
+SSH_KEY_FILE = os.getenv("SSH_KEY_FILE")
+SSH_KEY_PASSPHRASE = os.getenv("SSH_KEY_PASSPHRASE")
+# Servidores consultados ao mesmo tempo por coletar_frota() e validade (segundos) dos resultados guardados
+SSH_FANOUT_WORKERS = int(os.getenv("SSH_FANOUT_WORKERS", "16"))
+SSH_PREFETCH_TTL = float(os.getenv("SSH_PREFETCH_TTL", "900"))
+
+# Comandos da seção "Informações do Servidor Produtivo", na ordem em que aparecem no relatório
+COMANDOS = (
+    "hostname",
+    "ifconfig | grep inet | awk '{ print $2 }'",
+    "cat /etc/*release",
+    "df -h",
+    "free -h",
+)
+
+@dataclass(frozen=True)
+class Alvo:
+    """Servidor a consultar; sem senha, a autenticação usa a chave (SSH_KEY_FILE ou as padrão do usuário)."""
+    host: str
+    porta: int = 22
+    usuario: str = None
+    senha: str = field(default=None, repr=False)
+
+    @property
+    def chave(self):
+        return (self.host, int(self.porta), self.usuario)
+
+def alvo_do_cliente(dados):
+    """Alvo a partir do client_info.json / linha de tb_cliente."""
+    return Alvo(dados.get('ip'), int(dados.get('portassh') or 22), dados.get('userssh'), dados.get('senhassh'))
+
+@dataclass
+class ResultadoComando:
+    comando: str
+    saida: str = ""
+    erro: str = ""
+    status: int = None
+
+@dataclass
+class ResultadoServidor:
+    """Resultado da coleta em um servidor: os comandos, ou o erro que impediu a coleta."""
+    alvo: Alvo
+    comandos: list = field(default_factory=list)
+    erro: str = None
+    duracao: float = 0.0
+
+    @property
+    def sucesso(self):
+        return self.erro is None
+
+_conexoes = {}
+_conexoes_lock = threading.Lock()
+_conectar_locks = {}
+_varredura = None
+
+def _conectar(alvo):
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy)
+    with cronometrar("ssh_conexao", alvo.host):
+        ssh.connect(alvo.host, port=int(alvo.porta), username=alvo.usuario, password=alvo.senha,
+                    key_filename=SSH_KEY_FILE or None, passphrase=SSH_KEY_PASSPHRASE,
+                    # Sem senha, procura as chaves padrão do usuário e o agente SSH
+                    look_for_keys=not alvo.senha, allow_agent=not alvo.senha,
+                    timeout=SSH_CONNECT_TIMEOUT, banner_timeout=SSH_CONNECT_TIMEOUT, auth_timeout=SSH_CONNECT_TIMEOUT)
+    logging.info(f"Conexão SSH aberta com {alvo.host}:{alvo.porta}.")
+    return ssh
+
+def _ativa(ssh):
+    transporte = ssh.get_transport()
+    return transporte is not None and transporte.is_active()
+
+def _ociosidade_maxima():
+    # Uma coleta em andamento renova o último uso ao terminar; o comando pode levar até SSH_COMMAND_TIMEOUT
+    return max(SSH_CACHE_TTL, SSH_COMMAND_TIMEOUT)
+
+def fechar_expiradas():
+    """Fecha e remove do cache as conexões ociosas há mais de SSH_CACHE_TTL segundos ou já caídas."""
+    limite = time.monotonic() - _ociosidade_maxima()
+    with _conexoes_lock:
+        expiradas = [chave for chave, (ssh, ultimo_uso) in _conexoes.items()
+                     if ultimo_uso < limite or not _ativa(ssh)]
+        fechar = [_conexoes.pop(chave)[0] for chave in expiradas]
+    for ssh in fechar:
+        ssh.close()
+    if fechar:
+        logging.info(f"{len(fechar)} conexão(ões) SSH ociosa(s) fechada(s).")
+
+def _varrer_periodicamente():
+    global _varredura
+    fechar_expiradas()
+    with _conexoes_lock:
+        _varredura = None
+        if _conexoes:
+            _agendar_varredura()
+
+def _agendar_varredura():
+    """Agenda (chamado com _conexoes_lock) a próxima varredura em segundo plano, se ainda não houver."""
+    global _varredura
+    if _varredura is None:
+        _varredura = threading.Timer(_ociosidade_maxima(), _varrer_periodicamente)
+        _varredura.daemon = True
+        _varredura.start()
+
+def _registrar_uso(chave, ssh):
+    with _conexoes_lock:
+        _conexoes[chave] = (ssh, time.monotonic())
+        _agendar_varredura()
+
+def obter_conexao(alvo):
+    """Conexão SSH do servidor, aberta na primeira coleta e reaproveitada pelas seguintes."""
+    fechar_expiradas()
+    chave = alvo.chave
+    with _conexoes_lock:
+        lock = _conectar_locks.setdefault(chave, threading.Lock())
+    # Uma coleta por vez abre a conexão de cada servidor; as demais esperam e a reaproveitam
+    with lock:
+        with _conexoes_lock:
+            ssh, ultimo_uso = _conexoes.get(chave, (None, 0.0))
+        if ssh is not None and (not _ativa(ssh) or time.monotonic() - ultimo_uso > SSH_CACHE_TTL):
+            ssh.close()
+            ssh = None
+        if ssh is None:
+            ssh = _conectar(alvo)
+        _registrar_uso(chave, ssh)
+        return ssh
+
+def descartar_conexao(alvo):
+    with _conexoes_lock:
+        ssh, _ = _conexoes.pop(alvo.chave, (None, 0.0))
+    if ssh is not None:
+        ssh.close()
+
+def fechar_conexoes():
+    """Fecha todas as conexões do cache (chamado automaticamente ao sair)."""
+    with _conexoes_lock:
+        conexoes = list(_conexoes.values())
+        _conexoes.clear()
+    for ssh, _ in conexoes:
+        ssh.close()
+
+atexit.register(fechar_conexoes)
+
+def montar_script(comandos, marcador):
+    """
+    Script sh que executa os comandos em sequência. A saída de cada um vai
+    direto para o stdout; o stderr é capturado e impresso depois, entre
+    marcadores com o índice do comando, e o marcador final leva o status.
+    """
+    linhas = ["exec 3>&1"]
+    for indice, comando in enumerate(comandos):
+        linhas += [
+            f"printf '%s\\n' '<<<{marcador} {indice} SAIDA>>>'",
+            f"erro=$( {{ {comando} ; }} 2>&1 1>&3 3>&- ); status=$?",
+            f"printf '\\n%s\\n' '<<<{marcador} {indice} ERRO>>>'",
+            "printf '%s' \"$erro\"",
+            f"printf '\\n%s\\n' \"<<<{marcador} {indice} FIM $status>>>\"",
+        ]
+    return "\n".join(linhas) + "\n"
+
+def separar_saida(texto, comandos, marcador):
+    """Separa a resposta de montar_script() em um ResultadoComando por comando."""
+    resultados = [ResultadoComando(comando) for comando in comandos]
+    padrao = re.compile(rf"^<<<{marcador} (\d+) (SAIDA|ERRO|FIM)(?: (-?\d+))?>>>$", re.MULTILINE)
+    inicio, atual = 0, None
+    for match in padrao.finditer(texto):
+        indice, parte = int(match.group(1)), match.group(2)
+        trecho = texto[inicio:match.start()]
+        if atual == "SAIDA":
+            # Remove a quebra de linha inserida antes do marcador
+            resultados[indice].saida = trecho[:-1] if trecho.endswith("\n") else trecho
+        elif atual == "ERRO":
+            resultados[indice].erro = trecho[:-1] if trecho.endswith("\n") else trecho
+        if parte == "FIM":
+            resultados[indice].status = int(match.group(3))
+        atual, inicio = parte, match.end() + 1
+    return resultados
+
+def executar_comandos(ssh, comandos=COMANDOS, timeout=SSH_COMMAND_TIMEOUT):
+    """Executa os comandos em um único canal e retorna um ResultadoComando para cada um."""
+    marcador = f"PGR-{secrets.token_hex(8)}"
+    # sh explícito: o shell de login do usuário remoto pode não ser compatível (csh, fish)
+    _, stdout, stderr = ssh.exec_command(f"sh -c {shlex.quote(montar_script(comandos, marcador))}", timeout=timeout)
+    texto = stdout.read().decode(errors="replace")
+    erro_geral = stderr.read().decode(errors="replace")
+    if erro_geral:
+        logging.error(f"Erro no script de coleta: {erro_geral}")
+    resultados = separar_saida(texto, comandos, marcador)
+    for resultado in resultados:
+        if resultado.status is None:
+            resultado.erro = resultado.erro or erro_geral or "Comando não executado."
+    return resultados
+
+def coletar(alvo, comandos=COMANDOS):
+    """
+    Executa os comandos no servidor com a conexão em cache; se a conexão
+    guardada tiver caído, abre outra e tenta mais uma vez.
+    """
+    for tentativa in range(2):
+        ssh = obter_conexao(alvo)
+        try:
+            with cronometrar("ssh_comandos", alvo.host):
+                resultados = executar_comandos(ssh, comandos)
+            # A ociosidade conta a partir do fim da coleta
+            _registrar_uso(alvo.chave, ssh)
+            return resultados
+        except TimeoutError:
+            # Comando travado: não adianta repetir, mas o canal fica inutilizado
+            descartar_conexao(alvo)
+            raise
+        except (paramiko.SSHException, EOFError, OSError):
+            descartar_conexao(alvo)
+            if tentativa:
+                raise
+            logging.info(f"Conexão SSH com {alvo.host} caiu; reconectando.")
+
+_precarregados = {}
+_precarregados_lock = threading.Lock()
+
+def _coletar_servidor(alvo, comandos):
+    inicio = time.monotonic()
+    resultado = ResultadoServidor(alvo)
+    try:
+        resultado.comandos = coletar(alvo, comandos)
+    except (paramiko.SSHException, EOFError, OSError) as e:
+        logging.error(f"Erro na conexão SSH com {alvo.host}:{alvo.porta}: {e}")
+        resultado.erro = str(e) or e.__class__.__name__
+    resultado.duracao = time.monotonic() - inicio
+    return resultado
+
+def coletar_servidor(alvo, comandos=COMANDOS):
+    """
+    ResultadoServidor de um servidor (nunca levanta exceção). Usa o resultado
+    guardado por coletar_frota(), se ainda válido e com os mesmos comandos.
+    """
+    with _precarregados_lock:
+        guardado = _precarregados.pop(alvo.chave, None)
+    if guardado is not None:
+        resultado, instante = guardado
+        if (time.monotonic() - instante <= SSH_PREFETCH_TTL and resultado.sucesso
+                and tuple(r.comando for r in resultado.comandos) == tuple(comandos)):
+            return resultado
+    return _coletar_servidor(alvo, comandos)
+
+def coletar_frota(alvos, comandos=COMANDOS, max_workers=None):
+    """
+    Coleta os comandos em vários servidores ao mesmo tempo (no máximo
+    max_workers ou SSH_FANOUT_WORKERS). Um servidor inacessível só ocupa o
+    seu trabalhador até o timeout, sem atrasar os demais. Retorna um
+    ResultadoServidor por alvo, na mesma ordem, e guarda os bem-sucedidos
+    para coletar_servidor(). As conexões abertas pelo lote são fechadas ao
+    final: os relatórios usam os resultados guardados.
+    """
+    alvos = list(dict.fromkeys(alvos))
+    if not alvos:
+        return []
+    with _conexoes_lock:
+        ja_abertas = set(_conexoes)
+    workers = max(1, min(max_workers or SSH_FANOUT_WORKERS, len(alvos)))
+    try:
+        with cronometrar("ssh_frota", len(alvos)):
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pgr-ssh") as executor:
+                resultados = list(executor.map(lambda alvo: _coletar_servidor(alvo, comandos), alvos))
+    finally:
+        for alvo in alvos:
+            if alvo.chave not in ja_abertas:
+                descartar_conexao(alvo)
+    agora = time.monotonic()
+    with _precarregados_lock:
+        for resultado in resultados:
+            if resultado.sucesso:
+                _precarregados[resultado.alvo.chave] = (resultado, agora)
+    falhas = sum(not resultado.sucesso for resultado in resultados)
+    logging.info(f"Coleta SSH em {len(alvos)} servidores concluída ({falhas} com erro).")
+    return resultados
+
+def formatar_html(resultado):
+    """Texto da seção "Informações do Servidor Produtivo" (linhas separadas por <br>)."""
+    if not resultado.sucesso:
+        return "Erro na conexão SSH"
+    output_total = ""
+    for comando in resultado.comandos:
+        if comando.erro:
+            if comando.comando.startswith("df -h") and "gvfs" in comando.erro:
+                output_total += f"{comando.comando}:\n{comando.saida}\n"
+            else:
+                logging.error(f"Erro ao executar comando {comando.comando}: {comando.erro}")
+                output_total += f"Erro ao executar comando {comando.comando}: {comando.erro}\n"
+        else:
+            output_total += f"{comando.comando}:\n{comando.saida}\n"
+    return "<br>".join(output_total.splitlines())
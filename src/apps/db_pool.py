@@ -0,0 +1,126 @@
+# src/apps/db_pool.py
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions as pg_extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configurações do banco de metadados do PGR (PostgreSQL)
+host = os.getenv("HOST_DB")
+port = os.getenv("PORT_DB")
+dbname = os.getenv("NAME_DB")
+user = os.getenv("USER_DB")
+password = os.getenv("PASS_DB")
+
+# Limites do pool: mínimo de conexões abertas, máximo simultâneo e tempo
+# máximo (segundos) que uma thread espera por uma conexão livre.
+POOL_MIN = int(os.getenv("POOL_MIN_DB", "1"))
+POOL_MAX = int(os.getenv("POOL_MAX_DB", "8"))
+POOL_TIMEOUT = float(os.getenv("POOL_TIMEOUT_DB", "30"))
+# Conexões ociosas há mais tempo que isso são testadas com "SELECT 1" antes do uso.
+POOL_HEALTHCHECK = float(os.getenv("POOL_HEALTHCHECK_DB", "60"))
+CONNECT_TIMEOUT = int(os.getenv("CONNECT_TIMEOUT_DB", "10"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(POOL_MAX)
+_ultimo_uso = {}
+
+def get_pool():
+    """Retorna o pool de conexões do processo, criando-o no primeiro uso."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pg_pool.ThreadedConnectionPool(
+                    POOL_MIN,
+                    POOL_MAX,
+                    host=host,
+                    port=port,
+                    dbname=dbname,
+                    user=user,
+                    password=password,
+                    connect_timeout=CONNECT_TIMEOUT
+                )
+                logging.info(f"Pool de conexões criado ({POOL_MIN}-{POOL_MAX} conexões).")
+    return _pool
+
+def _conexao_saudavel(connection):
+    """Verifica se a conexão ainda responde; só vai ao servidor se ela estava ociosa."""
+    if connection.closed:
+        return False
+    ultimo_uso = _ultimo_uso.get(id(connection))
+    if ultimo_uso is None or time.monotonic() - ultimo_uso < POOL_HEALTHCHECK:
+        return True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+        connection.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def _obter_conexao(pool):
+    """Retira uma conexão saudável do pool, descartando as que caíram."""
+    for _ in range(POOL_MAX + 1):
+        connection = pool.getconn()
+        if _conexao_saudavel(connection):
+            return connection
+        logging.warning("Conexão inválida descartada do pool.")
+        _ultimo_uso.pop(id(connection), None)
+        pool.putconn(connection, close=True)
+    raise pg_pool.PoolError("Não foi possível obter uma conexão válida do pool.")
+
+@contextmanager
+def connection():
+    """
+    Empresta uma conexão do pool e a devolve ao final do bloco.
+    Transações não confirmadas são desfeitas na devolução; conexões que
+    falharam no meio do uso são fechadas em vez de voltarem ao pool.
+    """
+    if not _slots.acquire(timeout=POOL_TIMEOUT):
+        raise pg_pool.PoolError("Tempo esgotado aguardando conexão livre no pool.")
+    pool = None
+    conn = None
+    descartar = False
+    try:
+        pool = get_pool()
+        conn = _obter_conexao(pool)
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        descartar = True
+        raise
+    finally:
+        if conn is not None:
+            descartar = descartar or conn.closed
+            if not descartar and conn.get_transaction_status() != pg_extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    descartar = True
+            if descartar:
+                _ultimo_uso.pop(id(conn), None)
+            else:
+                _ultimo_uso[id(conn)] = time.monotonic()
+            pool.putconn(conn, close=descartar)
+        _slots.release()
+
+def close_pool():
+    """Fecha todas as conexões do pool (chamado automaticamente ao sair)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _ultimo_uso.clear()
+            logging.info("Pool de conexões encerrado.")
+
+atexit.register(close_pool)
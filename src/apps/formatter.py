@@ -1,30 +1,39 @@
-import jaydebeapi
 import jinja2
 import pdfkit
 import os
 import json
 import logging
-import paramiko
-import pandas as pd  # Importa o pandas para formatação da tabela
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from src.apps.workspace import workspace_padrao
+from src.apps.metricas import cronometrar
+from src.apps import coleta_ssh, oracle_driver
+from src.apps.tabela_html import tabela_html
 
 load_dotenv()
 
 # Configuração de logs
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Configurações JDBC (obtidas do .env)
+# Credenciais do banco Oracle (obtidas do .env; as mesmas no modo thin e no JDBC)
 jdbc_user = os.getenv("USER_JDBC")
 jdbc_password = os.getenv("PASS_JDBC")
-jdbc_jar = os.getenv("JAR_JDBC")
 
 # Caminho do template HTML
 template_path = "static/assets/pgr.html"
 
-# Caminho do arquivo de armazenamento
-storage_file = 'client_info.json'
+# Linhas trazidas do banco por ida e volta (fetchmany) e pré-carregadas junto com o execute
+ORACLE_ARRAYSIZE = int(os.getenv("ORACLE_ARRAYSIZE", "500"))
+ORACLE_PREFETCHROWS = int(os.getenv("ORACLE_PREFETCHROWS", str(ORACLE_ARRAYSIZE + 1)))
 
-def carregar_configuracoes_do_storage():
+# Consultas exibidas como tabela: chave -> títulos das colunas
+TABELAS = {
+    "maiores_tabelas": ["OWNER", "TABLE_NAME", "SIZE (GB)"],
+    "print_backup": ["START_TIME", "END_TIME", "MBYTES", "STATUS", "INPUT_TYPE", "DOW", "SECONDS TAKEN"],
+}
+
+def carregar_configuracoes_do_storage(storage_file):
     """Carrega configurações do cliente a partir de client_info.json"""
     if os.path.exists(storage_file):
         with open(storage_file, 'r') as f:
@@ -37,198 +46,219 @@ def carregar_configuracoes_do_storage():
             if not all([ip, db_name, jdbc_user, jdbc_password]):
                 raise ValueError("Informações incompletas no arquivo de armazenamento.")
             
-            jdbc_url = f"jdbc:oracle:thin:@{ip}:{port_jdbc}/{db_name}"
-            logging.info(f"String de conexão montada: {jdbc_url}")
-            return jdbc_url, jdbc_user, jdbc_password, db_name
+            logging.info(f"Banco de destino: {ip}:{port_jdbc}/{db_name}")
+            return ip, port_jdbc or 1521, db_name
     else:
         raise FileNotFoundError("Arquivo 'client_info.json' não encontrado.")
 
+def _abrir_cursor(conexao, query):
+    cursor = conexao.cursor()
+    cursor.arraysize = ORACLE_ARRAYSIZE
+    if hasattr(cursor, "prefetchrows"):
+        # python-oracledb: as primeiras linhas já chegam na resposta do execute
+        cursor.prefetchrows = ORACLE_PREFETCHROWS
+    cursor.execute(query)
+    return cursor
+
+def iterar_consulta(cursor):
+    """Linhas do cursor em blocos de ORACLE_ARRAYSIZE (fetchmany), sem carregar o resultado inteiro."""
+    while True:
+        bloco = cursor.fetchmany(ORACLE_ARRAYSIZE)
+        if not bloco:
+            return
+        yield from bloco
+
 def executar_consulta(conexao, query):
     """Executa uma consulta e retorna o resultado"""
-    cursor = conexao.cursor()
     try:
-        cursor.execute(query)
-        resultado = cursor.fetchall()
-        return resultado
-    except jaydebeapi.DatabaseError as e:
+        cursor = _abrir_cursor(conexao, query)
+    except oracle_driver.ERROS as e:
+        logging.error(f"Erro ao executar a query: {e}")
+        return None
+    try:
+        return list(iterar_consulta(cursor))
+    except oracle_driver.ERROS as e:
+        logging.error(f"Erro ao executar a query: {e}")
+        return None
+    finally:
+        cursor.close()
+
+def executar_tabela(conexao, query, colunas):
+    """
+    Executa a consulta e monta a tabela HTML direto do cursor, linha a
+    linha; retorna None se a consulta falhar ou não trouxer linhas.
+    """
+    try:
+        cursor = _abrir_cursor(conexao, query)
+    except oracle_driver.ERROS as e:
+        logging.error(f"Erro ao executar a query: {e}")
+        return None
+    try:
+        return tabela_html(iterar_consulta(cursor), colunas)
+    except oracle_driver.ERROS as e:
         logging.error(f"Erro ao executar a query: {e}")
         return None
     finally:
         cursor.close()
 
-def obter_dados_do_servidor():
+def obter_dados_do_servidor(workspace=None):
     """
     Executa os comandos solicitados via SSH e retorna os resultados
     agrupados na chave 'Informações do Servidor Produtivo', formatados com <br>.
     Agora utiliza as credenciais SSH contidas no JSON.
     """
-    try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy)
-        
-        with open(storage_file, 'r') as f:
-            data = json.load(f)
-            ip = data.get('ip')
-            port_ssh = data.get('portassh')
-            ssh_user = data.get('userssh')
-            ssh_password = data.get('senhassh')
-        
-        ssh.connect(ip, port=int(port_ssh), username=ssh_user, password=ssh_password)
+    storage_file = (workspace or workspace_padrao()).client_info_file
+    with cronometrar("ssh"):
+        return _coletar_dados_do_servidor(storage_file)
 
-        comandos = [
-            "hostname",
-            "ifconfig | grep inet | awk '{ print $2 }'",
-            "cat /etc/*release",
-            "df -h",
-            "free -h"
-        ]
+def _coletar_dados_do_servidor(storage_file):
+    with open(storage_file, 'r') as f:
+        data = json.load(f)
 
-        output_total = ""
-        for comando in comandos:
-            stdin, stdout, stderr = ssh.exec_command(comando)
-            saida = stdout.read().decode()
-            erros = stderr.read().decode()
-            if erros:
-                if comando == "df -h" and "gvfs" in erros:
-                    output_total += f"{comando}:\n{saida}\n"
-                else:
-                    logging.error(f"Erro ao executar comando {comando}: {erros}")
-                    output_total += f"Erro ao executar comando {comando}: {erros}\n"
-            else:
-                output_total += f"{comando}:\n{saida}\n"
-        
-        ssh.close()
-        formatted_output = "<br>".join(output_total.splitlines())
-        return {"Informações do Servidor Produtivo": formatted_output}
-    except paramiko.SSHException as e:
-        logging.error(f"Erro na conexão SSH: {e}")
-        return {"Informações do Servidor Produtivo": "Erro na conexão SSH"}
+    # Uma conexão por servidor (em cache) e todos os comandos da coleta em um único
+    # exec_command; em lotes, o resultado já vem da coleta paralela (coleta_ssh.coletar_frota)
+    resultado = coleta_ssh.coletar_servidor(coleta_ssh.alvo_do_cliente(data))
+    return {"Informações do Servidor Produtivo": coleta_ssh.formatar_html(resultado)}
+
+def consultas_oracle(db_name):
+    """Consultas do relatório Oracle (chave no template -> SQL)."""
+    return {
+        # Consulta para a versão do Oracle
+        "versao_do_banco_de_dados": """
+            SELECT version 
+            FROM PRODUCT_COMPONENT_VERSION 
+            WHERE product LIKE 'Oracle Database%'
+        """,
+        # Consulta para as 20 maiores tabelas
+        "maiores_tabelas": """
+            SELECT * 
+            FROM 
+                (SELECT owner, segment_name AS table_name, bytes/1024/1024/1024 AS "SIZE (GB)"
+                 FROM dba_segments 
+                 WHERE segment_type = 'TABLE'
+                 AND segment_name NOT LIKE 'BIN%' 
+                 ORDER BY 3 DESC) 
+            WHERE rownum <= 20
+        """,
+        # Consulta para top 10 queries mais lentas
+        "top_sql": """
+            SELECT rownum AS rank, a.* 
+            FROM 
+                (SELECT elapsed_Time/1000000 AS elapsed_time, executions, cpu_time, sql_id, sql_text
+                 FROM v$sqlarea 
+                 WHERE elapsed_time/1000000 > 5 
+                 ORDER BY elapsed_time DESC) a 
+            WHERE rownum < 11
+        """,
+        # Consulta para detalhes de backup do RMAN
+        "print_backup": """
+            SELECT
+                TO_CHAR(j.start_time, 'yyyy-mm-dd hh24:mi:ss') AS start_time,
+                TO_CHAR(j.end_time, 'yyyy-mm-dd hh24:mi:ss') AS end_time,
+                (j.output_bytes + j.output_bytes / 1024 / 1024) AS output_mbytes,
+                j.status, 
+                j.input_type,
+                DECODE(TO_CHAR(j.start_time, 'd'), 
+                       1, 'Sunday', 
+                       2, 'Monday', 
+                       3, 'Tuesday', 
+                       4, 'Wednesday', 
+                       5, 'Thursday', 
+                       6, 'Friday', 
+                       7, 'Saturday') AS dow,
+                j.elapsed_seconds
+            FROM v$RMAN_BACKUP_JOB_DETAILS j
+            LEFT OUTER JOIN 
+                (SELECT 
+                    d.session_recid, 
+                    d.session_stamp,
+                    SUM(CASE WHEN d.controlfile_included = 'YES' THEN d.pieces ELSE 0 END) AS CF,
+                    SUM(CASE WHEN d.controlfile_included = 'NO' AND d.backup_type||d.incremental_level = 'D' THEN d.pieces ELSE 0 END) AS DF,
+                    SUM(CASE WHEN d.backup_type||d.incremental_level = 'D0' THEN d.pieces ELSE 0 END) AS I0,
+                    SUM(CASE WHEN d.backup_type||d.incremental_level = 'I1' THEN d.pieces ELSE 0 END) AS I1,
+                    SUM(CASE WHEN d.backup_type = 'L' THEN d.pieces ELSE 0 END) AS L
+                FROM v$BACKUP_SET_DETAILS d
+                JOIN v$BACKUP_SET s ON s.set_stamp = d.set_stamp AND s.set_count = d.set_count
+                WHERE s.input_file_scan_only = 'NO'
+                GROUP BY d.session_recid, d.session_stamp) x 
+            ON x.session_recid = j.session_recid AND x.session_stamp = j.session_stamp
+            LEFT OUTER JOIN 
+                (SELECT o.session_recid, o.session_stamp, MIN(inst_id) AS inst_id
+                 FROM Gv$RMAN_OUTPUT o
+                 GROUP BY o.session_recid, o.session_stamp) ro 
+            ON ro.session_recid = j.session_recid AND ro.session_stamp = j.session_stamp
+            WHERE j.start_time > TRUNC(SYSDATE)-7
+            AND j.input_type not in ('ARCHIVELOG') 
+            ORDER BY j.start_time
+        """,
+        # Nova consulta: exibe o nome do cliente (nome do banco) conforme definido no client_info.json
+        "nome_do_cliente": f"SELECT '{db_name}' AS nome_cliente FROM dual"
+    }
 
-def obter_dados_do_banco():
-    """Executa as consultas e retorna um dicionário com os dados formatados"""
-    jdbc_url, jdbc_user, jdbc_password, db_name = carregar_configuracoes_do_storage()
+def executar_consultas(ip, porta, db_name, consultas):
+    """
+    Executa as consultas ao mesmo tempo, cada uma em uma sessão própria do
+    pool do banco (no máximo ORACLE_PARALELISMO simultâneas por banco, ver
+    oracle_driver.py): o tempo total fica próximo ao da consulta mais lenta.
+    No JDBC as consultas do relatório compartilham uma única conexão.
+    Retorna {chave: linhas}, ou o HTML pronto para as chaves de TABELAS
+    (None nas consultas que falharam).
+    """
+    with oracle_driver.sessao(ip, porta, db_name, jdbc_user, jdbc_password) as sessao:
+        def executar(chave):
+            try:
+                with sessao.conexao() as conexao:
+                    with cronometrar("oracle_consulta", chave):
+                        if chave in TABELAS:
+                            return executar_tabela(conexao, consultas[chave], TABELAS[chave])
+                        return executar_consulta(conexao, consultas[chave])
+            except oracle_driver.ERROS as e:
+                # Sem conexão para esta consulta: ela sai como "Não disponível" e as outras seguem
+                logging.error(f"Erro ao conectar ao banco para a consulta {chave}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=oracle_driver.PARALELISMO, thread_name_prefix="pgr-oracle") as executor:
+            # Cada consulta leva uma cópia do contexto, para que as medições entrem na execução do relatório
+            futures = {chave: executor.submit(contextvars.copy_context().run, executar, chave) for chave in consultas}
+            return {chave: future.result() for chave, future in futures.items()}
+
+def obter_dados_do_banco(workspace=None, incluir_servidor=True):
+    """
+    Executa as consultas e retorna um dicionário com os dados formatados.
+    Com incluir_servidor=False a coleta via SSH fica de fora, para que o
+    pipeline possa executá-la em paralelo como uma etapa separada.
+    """
+    workspace = workspace or workspace_padrao()
+    ip, porta, db_name = carregar_configuracoes_do_storage(workspace.client_info_file)
     
     try:
-        conexao = jaydebeapi.connect(
-            'oracle.jdbc.driver.OracleDriver',
-            jdbc_url,
-            [jdbc_user, jdbc_password],
-            jdbc_jar
-        )
-
-        consultas = {
-            # Consulta para a versão do Oracle
-            "versao_do_banco_de_dados": """
-                SELECT version 
-                FROM PRODUCT_COMPONENT_VERSION 
-                WHERE product LIKE 'Oracle Database%'
-            """,
-            # Consulta para as 20 maiores tabelas
-            "maiores_tabelas": """
-                SELECT * 
-                FROM 
-                    (SELECT owner, segment_name AS table_name, bytes/1024/1024/1024 AS "SIZE (GB)"
-                     FROM dba_segments 
-                     WHERE segment_type = 'TABLE'
-                     AND segment_name NOT LIKE 'BIN%' 
-                     ORDER BY 3 DESC) 
-                WHERE rownum <= 20
-            """,
-            # Consulta para top 10 queries mais lentas
-            "top_sql": """
-                SELECT rownum AS rank, a.* 
-                FROM 
-                    (SELECT elapsed_Time/1000000 AS elapsed_time, executions, cpu_time, sql_id, sql_text
-                     FROM v$sqlarea 
-                     WHERE elapsed_time/1000000 > 5 
-                     ORDER BY elapsed_time DESC) a 
-                WHERE rownum < 11
-            """,
-            # Consulta para detalhes de backup do RMAN
-            "print_backup": """
-                SELECT
-                    TO_CHAR(j.start_time, 'yyyy-mm-dd hh24:mi:ss') AS start_time,
-                    TO_CHAR(j.end_time, 'yyyy-mm-dd hh24:mi:ss') AS end_time,
-                    (j.output_bytes + j.output_bytes / 1024 / 1024) AS output_mbytes,
-                    j.status, 
-                    j.input_type,
-                    DECODE(TO_CHAR(j.start_time, 'd'), 
-                           1, 'Sunday', 
-                           2, 'Monday', 
-                           3, 'Tuesday', 
-                           4, 'Wednesday', 
-                           5, 'Thursday', 
-                           6, 'Friday', 
-                           7, 'Saturday') AS dow,
-                    j.elapsed_seconds
-                FROM v$RMAN_BACKUP_JOB_DETAILS j
-                LEFT OUTER JOIN 
-                    (SELECT 
-                        d.session_recid, 
-                        d.session_stamp,
-                        SUM(CASE WHEN d.controlfile_included = 'YES' THEN d.pieces ELSE 0 END) AS CF,
-                        SUM(CASE WHEN d.controlfile_included = 'NO' AND d.backup_type||d.incremental_level = 'D' THEN d.pieces ELSE 0 END) AS DF,
-                        SUM(CASE WHEN d.backup_type||d.incremental_level = 'D0' THEN d.pieces ELSE 0 END) AS I0,
-                        SUM(CASE WHEN d.backup_type||d.incremental_level = 'I1' THEN d.pieces ELSE 0 END) AS I1,
-                        SUM(CASE WHEN d.backup_type = 'L' THEN d.pieces ELSE 0 END) AS L
-                    FROM v$BACKUP_SET_DETAILS d
-                    JOIN v$BACKUP_SET s ON s.set_stamp = d.set_stamp AND s.set_count = d.set_count
-                    WHERE s.input_file_scan_only = 'NO'
-                    GROUP BY d.session_recid, d.session_stamp) x 
-                ON x.session_recid = j.session_recid AND x.session_stamp = j.session_stamp
-                LEFT OUTER JOIN 
-                    (SELECT o.session_recid, o.session_stamp, MIN(inst_id) AS inst_id
-                     FROM Gv$RMAN_OUTPUT o
-                     GROUP BY o.session_recid, o.session_stamp) ro 
-                ON ro.session_recid = j.session_recid AND ro.session_stamp = j.session_stamp
-                WHERE j.start_time > TRUNC(SYSDATE)-7
-                AND j.input_type not in ('ARCHIVELOG') 
-                ORDER BY j.start_time
-            """,
-            # Nova consulta: exibe o nome do cliente (nome do banco) conforme definido no client_info.json
-            "nome_do_cliente": f"SELECT '{db_name}' AS nome_cliente FROM dual"
-        }
+        # Sessões do pool thin (python-oracledb) do banco, ou JDBC como reserva (ver oracle_driver.py)
+        resultados = executar_consultas(ip, porta, db_name, consultas_oracle(db_name))
 
         dados = {}
-        for chave, query in consultas.items():
-            resultado = executar_consulta(conexao, query)
+        for chave, resultado in resultados.items():
             if resultado:
-                if chave == "maiores_tabelas":
-                    try:
-                        # Utiliza pandas para converter o resultado em uma tabela HTML
-                        df = pd.DataFrame(resultado, columns=["OWNER", "TABLE_NAME", "SIZE (GB)"])
-                        # Gera a tabela HTML com a classe 'tabela_cinza'
-                        dados[chave] = df.to_html(classes="tabela_cinza", index=False, border=0, justify="center")
-                    except Exception as e:
-                        logging.error(f"Erro ao converter maiores_tabelas para HTML: {e}")
-                        dados[chave] = "<p>Erro ao formatar os dados.</p>"
-                elif chave == "print_backup":
-                    try:
-                        # Converte o resultado em uma tabela HTML com os títulos definidos
-                        df = pd.DataFrame(resultado, columns=["START_TIME", "END_TIME", "MBYTES", "STATUS", "INPUT_TYPE", "DOW", "SECONDS TAKEN"])
-                        dados[chave] = df.to_html(classes="tabela_cinza", index=False, border=0, justify="center")
-                    except Exception as e:
-                        logging.error(f"Erro ao converter print_backup para HTML: {e}")
-                        dados[chave] = "<p>Erro ao formatar os dados.</p>"
+                if chave in TABELAS:
+                    # Tabela HTML (classe 'tabela_cinza') já montada a partir do cursor
+                    dados[chave] = resultado
                 else:
                     resultado_str = "<br><br>".join(str(item) for item in resultado)
                     dados[chave] = resultado_str
             else:
                 dados[chave] = "Não disponível"
 
-        dados_servidor = obter_dados_do_servidor()
-        dados.update(dados_servidor)
+        if incluir_servidor:
+            dados_servidor = obter_dados_do_servidor(workspace)
+            dados.update(dados_servidor)
 
         return dados
-    except jaydebeapi.DatabaseError as e:
+    except oracle_driver.ERROS as e:
         logging.error(f"Erro ao conectar ao banco: {e}")
         return {}
-    finally:
-        if 'conexao' in locals() and conexao:
-            conexao.close()
 
-def gerar_pdf(dados):
+def gerar_pdf(dados, workspace=None):
     """Gera um PDF a partir do template preenchido"""
+    workspace = workspace or workspace_padrao()
     template_loader = jinja2.FileSystemLoader('./')
     template_env = jinja2.Environment(loader=template_loader)
 
@@ -236,18 +266,20 @@ def gerar_pdf(dados):
         template = template_env.get_template(template_path)
     except jinja2.exceptions.TemplateNotFound:
         logging.error("Erro: O template 'pgr.html' não foi encontrado.")
-        exit(1)
+        raise
 
-    # Atualiza informações do servidor no dicionário de dados
-    info_servidor = obter_dados_do_servidor().get("Informações do Servidor Produtivo")
+    # Informações do servidor: reaproveita as já coletadas (etapa "servidor" do pipeline)
+    info_servidor = dados.get("Informações do Servidor Produtivo")
+    if info_servidor is None:
+        info_servidor = obter_dados_do_servidor(workspace).get("Informações do Servidor Produtivo")
     dados["informacoes_servidor"] = info_servidor
 
     # Inserir as imagens no contexto para o template
-    caminho_imagens = "/home/tauge/Documents/tauge/PGR/output/graphics"
-    dados["monitoramento_cpu"] = f"file://{os.path.join(caminho_imagens, 'CPU___utilizacao_plotly.png')}"
-    dados["monitoramento_memoria"] = f"file://{os.path.join(caminho_imagens, 'Uso_de_memoria_plotly.png')}"
+    dados["monitoramento_cpu"] = f"file://{workspace.grafico('cpu')}"
+    dados["monitoramento_memoria"] = f"file://{workspace.grafico('memoria')}"
 
-    output_text = template.render(dados)
+    with cronometrar("render_html"):
+        output_text = template.render(dados)
 
     config = pdfkit.configuration(wkhtmltopdf="/usr/bin/wkhtmltopdf")
     options = {
@@ -260,14 +292,18 @@ def gerar_pdf(dados):
     }
 
     # Define o diretório de destino para o PDF
-    output_dir = "/home/tauge/Documents/tauge/PGR/output/pdf temp"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    output_file = os.path.join(output_dir, "pgr_final.pdf")
+    os.makedirs(workspace.pdf_temp_dir, exist_ok=True)
+    output_file = workspace.pgr_final_pdf
 
-    pdfkit.from_string(output_text, output_file, configuration=config, options=options)
+    with cronometrar("wkhtmltopdf"):
+        pdfkit.from_string(output_text, output_file, configuration=config, options=options)
     print("PDF gerado com sucesso em:", output_file)
 
+def main(workspace=None):
+    """Coleta os dados do banco e do servidor e gera o PDF; retorna os dados usados."""
+    dados_extraidos = obter_dados_do_banco(workspace)
+    gerar_pdf(dados_extraidos, workspace)
+    return dados_extraidos
+
 if __name__ == "__main__":
-    dados_extraidos = obter_dados_do_banco()
-    gerar_pdf(dados_extraidos)
+    main()
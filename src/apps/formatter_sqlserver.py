@@ -3,9 +3,10 @@ import pdfkit
 import os
 import logging
 import pandas as pd  # Para formatação das tabelas
-import io
 import re
 import json
+from src.apps.workspace import workspace_padrao
+from src.apps.metricas import cronometrar
 
 # Configuração de logs
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,72 +14,79 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Caminho do template HTML
 template_path = "static/assets/pgr.html"
 
-def ler_arquivo(caminho):
-    """Lê o conteúdo de um arquivo de texto."""
+def _decodificar(valor):
+    """Os itens do Zabbix devolvem texto; o que for JSON vira lista/dicionário."""
+    if isinstance(valor, str):
+        try:
+            return json.loads(valor)
+        except ValueError:
+            return valor
+    return valor
+
+def _tabelas_de_texto(texto):
+    """
+    Interpreta o item de maiores tabelas quando ele não devolve JSON, no
+    formato "dbo.TABELA: 77029.38 MB, dbo.OUTRA: 12.50 MB".
+    """
     try:
-        with open(caminho, 'r', encoding='utf-8') as f:
-            return f.read()
-    except Exception as e:
-        logging.error(f"Erro ao ler o arquivo {caminho}: {e}")
-        return ""
-
-def obter_dados_do_banco():
-    """Extrai e formata os dados dos arquivos de entrada para o PDF."""
+        # Divide os itens pela vírgula
+        list_data = []
+        for entry in texto.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            # Supondo o formato: "dbo.TABELA: 77029.38 MB"
+            parts = entry.split(':')
+            if len(parts) < 2:
+                continue
+            key_part = parts[0].strip()       # Ex: "dbo.PROCESS_DOCUMENTS"
+            value_part = parts[1].strip()       # Ex: "77029.38 MB"
+            # Remove a unidade "MB"
+            value_str = value_part.replace("MB", "").strip()
+            try:
+                size_mb = float(value_str)
+                size_gb = size_mb / 1024  # Converte de MB para GB
+            except Exception as ex:
+                logging.error(f"Erro ao converter valor {value_str}: {ex}")
+                size_gb = value_str
+            # Separa owner e table_name (supondo que estejam unidos por ponto)
+            if '.' in key_part:
+                owner, table_name = key_part.split('.', 1)
+            else:
+                owner = ""
+                table_name = key_part
+            list_data.append({"owner": owner, "table_name": table_name, "size_gb": f"{size_gb:.2f}"})
+        return list_data
+    except Exception as ex:
+        logging.error(f"Erro ao interpretar o texto de biggest_tables: {ex}")
+        return []
+
+def obter_dados_do_banco(workspace=None, resultado=None):
+    """
+    Formata para o PDF os dados coletados do Zabbix. Recebe o ResultadoZabbix
+    de ultima_consulta.main; sem ele, lê os arquivos gravados na área de
+    trabalho por ultima_consulta.salvar_snapshot.
+    """
+    if resultado is None:
+        from src.apps.ultima_consulta import ler_snapshot
+        resultado = ler_snapshot((workspace or workspace_padrao()).output_dir)
+    consultas = resultado.cliente
     dados = {}
     
     # 1) Versão do banco (extrai apenas números e pontos)
-    conteudo_versao = ler_arquivo("/home/tauge/Documents/tauge/PGR/output/info_db_consulta.txt").strip()
-    match = re.findall(r"[0-9]+(?:\.[0-9]+)+", conteudo_versao)
+    match = re.findall(r"[0-9]+(?:\.[0-9]+)+", str(consultas.get("info_db", "")))
     versao = match[0] if match else "Versão não disponível"
     dados["versao_do_banco_de_dados"] = versao
 
-    # 2) Tabela de maiores_tabelas (biggest_tables_consulta.txt)
-    conteudo_biggest_tables = ler_arquivo("/home/tauge/Documents/tauge/PGR/output/biggest_tables_consulta.txt").strip()
-    list_data = None
+    # 2) Tabela de maiores_tabelas (biggest_tables)
+    biggest_tables = consultas.get("biggest_tables", "")
+    list_data = _decodificar(biggest_tables)
+    if isinstance(list_data, str):
+        list_data = _tabelas_de_texto(list_data)
+
     try:
-        # Tenta carregar como JSON
-        list_data = json.loads(conteudo_biggest_tables)
-        if isinstance(list_data, str):
-            list_data = json.loads(list_data)
         if not isinstance(list_data, list):
             raise ValueError("O conteúdo não é uma lista.")
-    except Exception as e:
-        logging.error(f"Falha ao ler JSON diretamente: {e}")
-        # Fallback: tratar o conteúdo como string formatada
-        try:
-            # Divide os itens pela vírgula
-            entries = conteudo_biggest_tables.split(',')
-            list_data = []
-            for entry in entries:
-                entry = entry.strip()
-                if not entry:
-                    continue
-                # Supondo o formato: "dbo.TABELA: 77029.38 MB"
-                parts = entry.split(':')
-                if len(parts) < 2:
-                    continue
-                key_part = parts[0].strip()       # Ex: "dbo.PROCESS_DOCUMENTS"
-                value_part = parts[1].strip()       # Ex: "77029.38 MB"
-                # Remove a unidade "MB"
-                value_str = value_part.replace("MB", "").strip()
-                try:
-                    size_mb = float(value_str)
-                    size_gb = size_mb / 1024  # Converte de MB para GB
-                except Exception as ex:
-                    logging.error(f"Erro ao converter valor {value_str}: {ex}")
-                    size_gb = value_str
-                # Separa owner e table_name (supondo que estejam unidos por ponto)
-                if '.' in key_part:
-                    owner, table_name = key_part.split('.', 1)
-                else:
-                    owner = ""
-                    table_name = key_part
-                list_data.append({"owner": owner, "table_name": table_name, "size_gb": f"{size_gb:.2f}"})
-        except Exception as ex:
-            logging.error(f"Erro no fallback do parsing de biggest_tables_consulta: {ex}")
-            list_data = []
-
-    try:
         df_tables = pd.DataFrame(list_data)
         df_tables = df_tables.rename(columns={
             "owner": "Owner",
@@ -87,32 +95,27 @@ def obter_dados_do_banco():
         })
         dados["maiores_tabelas"] = df_tables.to_html(classes="tabela_cinza", index=False, border=0, justify="center")
     except Exception as e:
-        logging.error(f"Erro ao converter biggest_tables_consulta para HTML: {e}")
-        dados["maiores_tabelas"] = f"<p>Erro ao formatar os dados: {conteudo_biggest_tables}</p>"
+        logging.error(f"Erro ao converter biggest_tables para HTML: {e}")
+        dados["maiores_tabelas"] = f"<p>Erro ao formatar os dados: {biggest_tables}</p>"
 
-    # 3) Conteúdo de top_sql (top_queries_consulta.txt)
-    conteudo_top_sql = ler_arquivo("/home/tauge/Documents/tauge/PGR/output/top_queries_consulta.txt").strip()
+    # 3) Conteúdo de top_sql (top_queries)
+    top_queries = consultas.get("top_queries", "")
     try:
-        # Parsear o JSON para uma lista de dicionários
-        data_top_sql = json.loads(conteudo_top_sql)
-        if isinstance(data_top_sql, str):
-            data_top_sql = json.loads(data_top_sql)
+        data_top_sql = _decodificar(top_queries)
         if not isinstance(data_top_sql, list):
-            raise ValueError("O conteúdo do top_queries_consulta não é uma lista de dicionários.")
+            raise ValueError("O conteúdo do top_queries não é uma lista de dicionários.")
         
         # Formatar cada objeto JSON em uma linha compacta, sem espaços extras, e com uma linha em branco entre eles
         formatted_top_sql = "\n\n".join(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) for obj in data_top_sql)
         dados["top_sql"] = formatted_top_sql
     except Exception as e:
-        logging.error(f"Erro ao formatar top_queries_consulta: {e}")
-        dados["top_sql"] = f"<p>Erro ao formatar os dados: {conteudo_top_sql}</p>"
+        logging.error(f"Erro ao formatar top_queries: {e}")
+        dados["top_sql"] = f"<p>Erro ao formatar os dados: {top_queries}</p>"
 
-    # 4) Conteúdo de print_backup (backups_consulta.txt)
-    conteudo_print_backup = ler_arquivo("/home/tauge/Documents/tauge/PGR/output/backups_consulta.txt").strip()
+    # 4) Conteúdo de print_backup (backups)
+    backups = consultas.get("backups", "")
     try:
-        data_backup = json.loads(conteudo_print_backup)
-        if isinstance(data_backup, str):
-            data_backup = json.loads(data_backup)
+        data_backup = _decodificar(backups)
         if not isinstance(data_backup, list):
             raise ValueError("O conteúdo do backup não é uma lista de dicionários.")
         df_backup = pd.DataFrame(data_backup)
@@ -128,29 +131,24 @@ def obter_dados_do_banco():
         dados["print_backup"] = df_backup.to_html(classes="tabela_cinza", index=False, border=0, justify="center")
     except Exception as e:
         logging.error(f"Erro ao converter print_backup para HTML: {e}")
-        dados["print_backup"] = f"<p>Erro ao formatar os dados: {conteudo_print_backup}</p>"
+        dados["print_backup"] = f"<p>Erro ao formatar os dados: {backups}</p>"
 
-    # 5) Conteúdo de informações do servidor (Info_serv_prod.txt) com formatação específica
-    conteudo_info_servidor = ler_arquivo("/home/tauge/Documents/tauge/PGR/output/Info_serv_prod.txt").strip()
-    if conteudo_info_servidor:
-        linhas = conteudo_info_servidor.splitlines()
+    # 5) Informações do servidor (serv_info) com formatação específica
+    if resultado.servidor:
         conteudo_formatado = ""
-        for linha in linhas:
-            if ':' in linha:
-                chave, valor = linha.split(':', 1)
-                chave = chave.strip()
-                valor = valor.strip().strip('"')  # Remove aspas se presentes
-                conteudo_formatado += f"{chave}:<br>\"{valor}\"<br><br>"
-            else:
-                conteudo_formatado += f"{linha}<br><br>"
+        for chave, valor in resultado.servidor.items():
+            texto = valor if isinstance(valor, str) else json.dumps(valor, ensure_ascii=False)
+            texto = texto.strip().replace("\n", "<br>")
+            conteudo_formatado += f"{chave}:<br>\"{texto}\"<br><br>"
         dados["informacoes_servidor"] = conteudo_formatado
     else:
         dados["informacoes_servidor"] = "Nenhuma informação do servidor disponível."
     
     return dados
 
-def gerar_pdf(dados):
+def gerar_pdf(dados, workspace=None):
     """Gera um PDF a partir do template HTML preenchido com os dados."""
+    workspace = workspace or workspace_padrao()
     template_loader = jinja2.FileSystemLoader('./')
     template_env = jinja2.Environment(loader=template_loader)
 
@@ -158,14 +156,14 @@ def gerar_pdf(dados):
         template = template_env.get_template(template_path)
     except jinja2.exceptions.TemplateNotFound:
         logging.error("Erro: O template 'pgr.html' não foi encontrado.")
-        exit(1)
+        raise
 
     # Utiliza caminhos absolutos para as imagens, garantindo que o wkhtmltopdf as encontre
-    caminho_imagens = os.path.abspath("output/graphics")
-    dados["monitoramento_cpu"] = f"file://{os.path.join(caminho_imagens, 'full_page_cpu.png')}"
-    dados["monitoramento_memoria"] = f"file://{os.path.join(caminho_imagens, 'full_page_memoria.png')}"
+    dados["monitoramento_cpu"] = f"file://{workspace.grafico('cpu')}"
+    dados["monitoramento_memoria"] = f"file://{workspace.grafico('memoria')}"
 
-    output_text = template.render(dados)
+    with cronometrar("render_html"):
+        output_text = template.render(dados)
 
     config = pdfkit.configuration(wkhtmltopdf="/usr/bin/wkhtmltopdf")
     options = {
@@ -177,18 +175,23 @@ def gerar_pdf(dados):
         "margin-left": "2cm"
     }
 
-    output_dir = "/home/tauge/Documents/tauge/PGR/output/pdf temp"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    output_file = os.path.join(output_dir, "pgr_final.pdf")
+    os.makedirs(workspace.pdf_temp_dir, exist_ok=True)
+    output_file = workspace.pgr_final_pdf
 
     try:
-        pdfkit.from_string(output_text, output_file, configuration=config, options=options)
+        with cronometrar("wkhtmltopdf"):
+            pdfkit.from_string(output_text, output_file, configuration=config, options=options)
         print("PDF gerado com sucesso em:", output_file)
     except Exception as e:
         logging.error(f"Erro ao gerar o PDF: {e}")
         print(f"Erro ao gerar o PDF: {e}")
 
+def main(workspace=None, resultado=None, estatisticas=None):
+    """Formata as consultas coletadas do Zabbix e gera o PDF; retorna os dados usados."""
+    dados_extraidos = obter_dados_do_banco(workspace, resultado)
+    dados_extraidos["estatisticas"] = estatisticas or {}
+    gerar_pdf(dados_extraidos, workspace)
+    return dados_extraidos
+
 if __name__ == "__main__":
-    dados_extraidos = obter_dados_do_banco()
-    gerar_pdf(dados_extraidos)
+    main()
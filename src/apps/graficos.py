@@ -0,0 +1,281 @@
+# src/apps/graficos.py
+"""
+Gráficos de CPU e memória gerados localmente a partir das tendências do Zabbix.
+
+Em vez de capturar a tela do Zabbix, busca pela API (trend.get, com
+history.get como reserva para itens sem tendência) os últimos GRAPH_PERIOD
+dos itens usados nas URLs do ulrzbx.json, agrega a série com NumPy em
+janelas de GRAPH_BUCKET segundos (mínimo, média e máximo) e desenha os PNGs
+com plotly/kaleido nos nomes esperados pelos formatters
+(CPU___utilizacao_plotly.png e Uso_de_memoria_plotly.png). As séries ficam
+guardadas localmente (serie_local.py) e só o trecho novo é pedido ao Zabbix.
+
+Em lotes de vários clientes, precarregar_frota() faz uma única busca de
+tendências para os itens de todos eles, e gerar_graficos() de cada relatório
+usa essas séries em vez de consultar o Zabbix de novo.
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from src.apps import cache_itens, serie_local, ultima_consulta
+from src.apps.metricas import cronometrar
+from src.apps.workspace import ARQUIVOS_GRAFICOS
+
+GRAPH_PERIOD = os.getenv("GRAPH_PERIOD", "now-30d")
+GRAPH_WIDTH = int(os.getenv("GRAPH_WIDTH", "1200"))
+GRAPH_HEIGHT = int(os.getenv("GRAPH_HEIGHT", "300"))
+# Largura (segundos) de cada ponto do gráfico; 3 h dá 240 pontos em 30 dias
+GRAPH_BUCKET = int(os.getenv("GRAPH_BUCKET", "10800"))
+# Validade (segundos) das séries buscadas antecipadamente para um lote
+GRAPH_PREFETCH_TTL = float(os.getenv("GRAPH_PREFETCH_TTL", "900"))
+
+# itemid -> (série, time_from, time_till, momento da busca)
+_precarregadas = {}
+_precarregadas_lock = threading.Lock()
+
+# (nome, chave no ulrzbx.json, título)
+GRAFICOS = (
+    ("cpu", "urlcpu", "CPU - utilização"),
+    ("memoria", "urlmemoria", "Uso de memória"),
+)
+
+_UNIDADES_PERIODO = {"h": 3600, "d": 86400, "w": 7 * 86400, "M": 30 * 86400}
+
+def segundos_do_periodo(periodo=GRAPH_PERIOD):
+    """Converte "now-30d" (ou 12h, 2w, 1M) em segundos; formatos desconhecidos valem 30 dias."""
+    match = re.fullmatch(r"now-(\d+)([hdwM])", periodo.strip())
+    if not match:
+        logging.error(f"Período de gráfico não reconhecido: {periodo}; usando 30 dias.")
+        return 30 * 86400
+    return int(match.group(1)) * _UNIDADES_PERIODO[match.group(2)]
+
+def itemid_da_url(zapi, url):
+    """Item do gráfico a partir da URL do ulrzbx.json (itemids[] ou, para gráficos, o primeiro item do graphid)."""
+    parametros = parse_qs(urlparse(url).query)
+    itemids = parametros.get("itemids[]") or parametros.get("itemids") or parametros.get("itemid")
+    if itemids:
+        return str(itemids[0])
+    graphid = parametros.get("graphid")
+    if graphid:
+        itens = zapi.graphitem.get(graphids=graphid[0], output=["itemid"], sortfield="gitemid")
+        if itens:
+            return str(itens[0]["itemid"])
+    raise ValueError(f"Não foi possível identificar o item do gráfico na URL: {url}")
+
+def _tendencias_do_zabbix(zapi, itemids, time_from, time_till):
+    """Tendências de todos os itens em uma única chamada trend.get."""
+    with cronometrar("zabbix_trend", len(itemids)):
+        linhas = zapi.trend.get(
+            itemids=itemids, time_from=time_from, time_till=time_till,
+            output=["itemid", "clock", "num", "value_min", "value_avg", "value_max"],
+        )
+    series = {}
+    if linhas:
+        ids = np.array([linha["itemid"] for linha in linhas])
+        clock = np.array([linha["clock"] for linha in linhas]).astype(np.int64)
+        num = np.array([linha["num"] for linha in linhas]).astype(np.float64)
+        minimo = np.array([linha["value_min"] for linha in linhas]).astype(np.float64)
+        media = np.array([linha["value_avg"] for linha in linhas]).astype(np.float64)
+        maximo = np.array([linha["value_max"] for linha in linhas]).astype(np.float64)
+        for itemid in np.unique(ids):
+            filtro = ids == itemid
+            series[str(itemid)] = (clock[filtro], minimo[filtro], media[filtro], maximo[filtro], num[filtro])
+    return series
+
+def buscar_series(zapi, itemids, time_from, time_till):
+    """
+    Busca as tendências de todos os itens e devolve {itemid: (clock, mínimo,
+    média, máximo, peso)} como arrays NumPy. Com o armazenamento local
+    (serie_local) o Zabbix só envia o que mudou desde a última sincronização.
+    Itens sem tendência (histórico recente ou tendências desativadas) usam o
+    histórico.
+    """
+    itemids = sorted(set(itemids))
+    if serie_local.sincronizar(zapi, itemids, time_from, time_till):
+        # Só o trecho novo veio do Zabbix; a janela inteira é lida do armazenamento local
+        series = serie_local.ler_tendencias(itemids, time_from, time_till)
+    else:
+        series = _tendencias_do_zabbix(zapi, itemids, time_from, time_till)
+
+    faltantes = [itemid for itemid in itemids if itemid not in series]
+    if faltantes:
+        # value_type vem do cache local de metadados; só os desconhecidos vão ao item.get
+        tipos = {itemid: meta["value_type"] for itemid, meta in cache_itens.obter(faltantes).items()}
+        desconhecidos = [itemid for itemid in faltantes if itemid not in tipos]
+        if desconhecidos:
+            itens = zapi.item.get(itemids=desconhecidos,
+                                  output=["itemid", "value_type", "key_", "hostid", "name", "units"])
+            cache_itens.gravar(itens)
+            tipos.update({item["itemid"]: int(item["value_type"]) for item in itens})
+        for itemid in faltantes:
+            if tipos.get(itemid) not in (0, 3):
+                logging.error(f"Item {itemid} sem dados numéricos para o gráfico.")
+                continue
+            if serie_local.sincronizar(zapi, [itemid], time_from, time_till, tipos[itemid]):
+                paginas = list(serie_local.paginas_historico(itemid, time_from, time_till))
+                if not paginas:
+                    continue
+                clock = np.concatenate([pagina[0] for pagina in paginas])
+                valor = np.concatenate([pagina[1] for pagina in paginas])
+            else:
+                with cronometrar("zabbix_history", itemid):
+                    historico = zapi.history.get(itemids=itemid, history=tipos[itemid], time_from=time_from,
+                                                 time_till=time_till, output=["clock", "value"])
+                if not historico:
+                    continue
+                clock = np.array([linha["clock"] for linha in historico]).astype(np.int64)
+                valor = np.array([linha["value"] for linha in historico]).astype(np.float64)
+            series[itemid] = (clock, valor, valor, valor, np.ones_like(valor))
+    return series
+
+def agregar(serie, inicio, fim, passo=GRAPH_BUCKET):
+    """
+    Agrupa a série em janelas de passo segundos entre inicio e fim. Retorna
+    (centro de cada janela, mínimo, média ponderada, máximo); janelas sem
+    dados ficam com NaN (aparecem como falhas no gráfico).
+    """
+    clock, minimo, media, maximo, peso = serie
+    n = max(1, int(np.ceil((fim - inicio) / passo)))
+    indices = np.clip((clock - inicio) // passo, 0, n - 1)
+
+    contagem = np.bincount(indices, weights=peso, minlength=n)
+    soma = np.bincount(indices, weights=media * peso, minlength=n)
+    menor = np.full(n, np.inf)
+    np.minimum.at(menor, indices, minimo)
+    maior = np.full(n, -np.inf)
+    np.maximum.at(maior, indices, maximo)
+
+    vazio = contagem == 0
+    media_janela = np.divide(soma, contagem, out=np.full(n, np.nan), where=~vazio)
+    menor[vazio] = np.nan
+    maior[vazio] = np.nan
+    centros = inicio + (np.arange(n) + 0.5) * passo
+    return centros, menor, media_janela, maior
+
+def unidades_dos_itens(zapi, itemids):
+    """{itemid: unidade} do cache de metadados; só os itens fora dele vão ao item.get."""
+    unidades = {itemid: meta.get("units") or "" for itemid, meta in cache_itens.obter(itemids).items()}
+    desconhecidos = [itemid for itemid in itemids if itemid not in unidades]
+    if desconhecidos:
+        itens = zapi.item.get(itemids=desconhecidos,
+                              output=["itemid", "value_type", "key_", "hostid", "name", "units"])
+        cache_itens.gravar(itens)
+        unidades.update({item["itemid"]: item.get("units") or "" for item in itens})
+    return unidades
+
+def escala_da_unidade(unidade, maximo):
+    """
+    (divisor, rótulo) do eixo como no Zabbix: B e Bps em potências de 1024
+    (KB, MB, GB...), as demais unidades sem prefixo.
+    """
+    if unidade not in ("B", "Bps") or not np.isfinite(maximo):
+        return 1, unidade
+    divisor, prefixo = 1, ""
+    for proximo in "KMGTP":
+        if maximo < divisor * 1024:
+            break
+        divisor, prefixo = divisor * 1024, proximo
+    return divisor, f"{prefixo}{unidade}"
+
+def renderizar(titulo, centros, minimo, media, maximo, caminho, unidade="%"):
+    """Desenha a faixa mínimo–máximo e a linha da média, na unidade do item, e grava o PNG."""
+    import plotly.graph_objects as go
+
+    divisor, unidade = escala_da_unidade(unidade, np.nanmax(maximo, initial=0))
+    minimo, media, maximo = minimo / divisor, media / divisor, maximo / divisor
+    horarios = [datetime.fromtimestamp(t) for t in centros]
+    figura = go.Figure()
+    figura.add_trace(go.Scatter(x=horarios, y=maximo, mode="lines", line=dict(width=0),
+                                showlegend=False, hoverinfo="skip"))
+    figura.add_trace(go.Scatter(x=horarios, y=minimo, mode="lines", line=dict(width=0), fill="tonexty",
+                                fillcolor="rgba(38, 163, 116, 0.25)", name="Mínimo – máximo"))
+    figura.add_trace(go.Scatter(x=horarios, y=media, mode="lines", line=dict(color="rgb(38, 163, 116)", width=2),
+                                name="Média"))
+    figura.update_layout(
+        title=titulo, template="plotly_white", width=GRAPH_WIDTH, height=GRAPH_HEIGHT,
+        margin=dict(l=50, r=20, t=50, b=40), yaxis=dict(title=unidade, rangemode="tozero"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    figura.write_image(caminho)
+    logging.info(f"Gráfico salvo em {caminho}")
+
+def precarregar_frota(urls):
+    """
+    Busca de uma vez (uma única sincronização/trend.get para todos os itens)
+    as séries dos gráficos de vários clientes, a partir do ulrzbx de cada um,
+    e as guarda por GRAPH_PREFETCH_TTL segundos para gerar_graficos().
+    """
+    zapi = ultima_consulta.obter_zapi()
+    time_till = int(time.time())
+    time_from = time_till - segundos_do_periodo()
+    itemids = []
+    for urls_cliente in urls:
+        for nome, chave, _ in GRAFICOS:
+            try:
+                itemids.append(itemid_da_url(zapi, urls_cliente[chave]))
+            except (KeyError, ValueError) as e:
+                # O relatório do cliente tenta de novo e registra o erro
+                logging.error(f"Gráfico {nome} fora da busca antecipada: {e}")
+    if not itemids:
+        return
+    with cronometrar("grafico_prefetch", len(itemids)):
+        series = buscar_series(zapi, itemids, time_from, time_till)
+    agora = time.monotonic()
+    with _precarregadas_lock:
+        for itemid, serie in series.items():
+            _precarregadas[itemid] = (serie, time_from, time_till, agora)
+    logging.info(f"Séries de {len(series)} itens buscadas antecipadamente para o lote.")
+
+def _series_precarregadas(itemid):
+    limite = time.monotonic() - GRAPH_PREFETCH_TTL
+    with _precarregadas_lock:
+        entrada = _precarregadas.get(itemid)
+    if entrada is None or entrada[3] < limite:
+        return None
+    return entrada[:3]
+
+def gerar_graficos(workspace):
+    """
+    Gera os gráficos de CPU e memória de uma área de trabalho (itens lidos do
+    ulrzbx.json), usando as séries do lote quando houver. Levanta exceção se
+    algum gráfico não puder ser gerado.
+    """
+    zapi = ultima_consulta.obter_zapi()
+    time_till = int(time.time())
+    time_from = time_till - segundos_do_periodo()
+
+    with open(workspace.urlzbx_file, 'r') as f:
+        urls = json.load(f)
+    pedidos = [(nome, titulo, itemid_da_url(zapi, urls[chave])) for nome, chave, titulo in GRAFICOS]
+
+    janelas = {}
+    for *_, itemid in pedidos:
+        precarregada = _series_precarregadas(itemid)
+        if precarregada is not None:
+            janelas[itemid] = precarregada
+    faltantes = [itemid for *_, itemid in pedidos if itemid not in janelas]
+    if faltantes:
+        series = buscar_series(zapi, faltantes, time_from, time_till)
+        janelas.update({itemid: (serie, time_from, time_till) for itemid, serie in series.items()})
+
+    unidades = unidades_dos_itens(zapi, [itemid for *_, itemid in pedidos])
+    erros = []
+    for nome, titulo, itemid in pedidos:
+        if itemid not in janelas:
+            erros.append(f"{nome} (item {itemid})")
+            continue
+        serie, inicio, fim = janelas[itemid]
+        os.makedirs(workspace.graphics_dir, exist_ok=True)
+        caminho = os.path.join(workspace.graphics_dir, ARQUIVOS_GRAFICOS[nome][0])
+        with cronometrar("grafico_local", nome):
+            renderizar(titulo, *agregar(serie, inicio, fim), caminho, unidades.get(itemid, "%"))
+    if erros:
+        raise ValueError(f"Sem dados no Zabbix para os gráficos: {', '.join(erros)}")
@@ -1,10 +1,18 @@
 from pypdf import PdfReader, PdfWriter
 import os
+import logging
+from src.apps.workspace import BASE_DIR, workspace_padrao
+from src.apps.metricas import cronometrado
 
-def main():
+# Páginas do pgr_final.pdf (uma por <div class="page"> do pgr.html) usadas no mapeamento abaixo
+PAGINAS_PGR_FINAL = 5
+
+@cronometrado("merge")
+def main(workspace=None):
+    workspace = workspace or workspace_padrao()
     # Caminhos absolutos dos arquivos
-    template_pdf_path = '/home/tauge/Documents/tauge/PGR/static/assets/template pgr final.pdf'
-    pgr_final_pdf_path = '/home/tauge/Documents/tauge/PGR/output/pdf temp/pgr_final.pdf'
+    template_pdf_path = os.path.join(BASE_DIR, 'static', 'assets', 'template pgr final.pdf')
+    pgr_final_pdf_path = workspace.pgr_final_pdf
     
     # Verifica se os arquivos existem
     if not os.path.isfile(template_pdf_path):
@@ -17,6 +25,18 @@ def main():
     # Abre os PDFs
     template_reader = PdfReader(template_pdf_path)
     pgr_final_reader = PdfReader(pgr_final_pdf_path)
+
+    # O mapeamento usa as páginas 1 a 5; com menos delas o relatório não pode ser montado
+    if len(pgr_final_reader.pages) < PAGINAS_PGR_FINAL:
+        raise ValueError(
+            f"O pgr_final.pdf tem {len(pgr_final_reader.pages)} páginas, esperadas {PAGINAS_PGR_FINAL}."
+        )
+    # Páginas a mais (transbordo de backups ou SQL extensos) são ignoradas, como antes
+    if len(pgr_final_reader.pages) > PAGINAS_PGR_FINAL:
+        logging.warning(
+            f"O pgr_final.pdf tem {len(pgr_final_reader.pages)} páginas, esperadas {PAGINAS_PGR_FINAL}: "
+            "as páginas excedentes não entram no relatório."
+        )
     
     writer = PdfWriter()
     
@@ -44,9 +64,8 @@ def main():
         writer.add_page(template_reader.pages[i])
     
     # Define o caminho da pasta de saída e cria-a, se não existir
-    output_dir = '/home/tauge/Documents/tauge/PGR/output'
-    os.makedirs(output_dir, exist_ok=True)
-    output_pdf_path = os.path.join(output_dir, 'relatorio.pdf')
+    os.makedirs(workspace.output_dir, exist_ok=True)
+    output_pdf_path = workspace.relatorio_pdf
     
     # Salva o novo PDF
     with open(output_pdf_path, 'wb') as f:
@@ -0,0 +1,156 @@
+# src/apps/metadata.py
+"""
+Consultas ao banco de metadados do PGR (clientes, servidores, URLs do Zabbix
+e registro de auditoria). Não depende do Tkinter: os erros são propagados
+como exceções para que a interface gráfica ou a linha de comando decidam
+como exibi-los.
+
+A lista de clientes e o contexto de cada cliente ficam em um cache em memória
+com validade de METADATA_CACHE_TTL segundos; use invalidar_cache() após
+alterar as tabelas de cadastro para que a mudança valha imediatamente.
+"""
+import os
+import copy
+import time
+import socket
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+from psycopg2 import errors as pg_errors
+from dotenv import load_dotenv
+
+from src.apps import db_pool
+
+load_dotenv()
+
+client_table = os.getenv("CLIENT_TABLE", "tb_cliente")
+serv_table = os.getenv("SERV_TABLE", "tb_servidor")  # Tabela de informações do servidor
+urlzbx_table = os.getenv("URLZBX_TABLE", "tb_urlzbx")  # Tabela de gráficos (ulrzbx.json)
+
+# Validade (segundos) das entradas do cache de metadados; 0 desativa o cache
+CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "300"))
+
+_cache = {}
+_cache_lock = threading.Lock()
+# Coluna do tipo de banco na tabela de clientes (ver _coluna_tipo)
+_expressao_tipo = None
+
+@dataclass
+class ContextoCliente:
+    cliente: dict
+    servidor: dict = None
+    urlzbx: dict = None
+
+def _cache_get(chave):
+    with _cache_lock:
+        entrada = _cache.get(chave)
+        if entrada is None:
+            return None
+        expira_em, valor = entrada
+        if time.monotonic() >= expira_em:
+            del _cache[chave]
+            return None
+    return copy.deepcopy(valor)
+
+def _cache_set(chave, valor):
+    if CACHE_TTL > 0:
+        with _cache_lock:
+            _cache[chave] = (time.monotonic() + CACHE_TTL, copy.deepcopy(valor))
+    return valor
+
+def invalidar_cache(client_id=None):
+    """Descarta o cache inteiro ou, com client_id, apenas o contexto daquele cliente."""
+    with _cache_lock:
+        if client_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(("contexto", client_id), None)
+
+def _coluna_tipo(cursor):
+    """
+    Expressão SQL do tipo de banco do cliente: o cadastro atual usa tpbanco e
+    o antigo db_type. A coluna existente é consultada uma vez e guardada.
+    """
+    global _expressao_tipo
+    if _expressao_tipo is None:
+        cursor.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = %s AND column_name IN ('tpbanco', 'db_type');
+        """, (client_table.split(".")[-1],))
+        existentes = {linha[0] for linha in cursor.fetchall()}
+        if existentes == {"tpbanco", "db_type"}:
+            _expressao_tipo = "COALESCE(NULLIF(tpbanco, ''), db_type)"
+        elif existentes:
+            _expressao_tipo = existentes.pop()
+        else:
+            _expressao_tipo = "NULL"
+    return _expressao_tipo
+
+def fetch_clients(com_tipo=False):
+    """
+    Lista (idcliente, nome) de todos os clientes; com_tipo inclui o tipo de
+    banco (tpbanco, ou db_type nos cadastros antigos), o mesmo que define o
+    fluxo do relatório.
+    """
+    chave = ("clientes", com_tipo)
+    clientes = _cache_get(chave)
+    if clientes is not None:
+        return clientes
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        colunas = f"idcliente, nome, {_coluna_tipo(cursor)}" if com_tipo else "idcliente, nome"
+        cursor.execute(f"SELECT {colunas} FROM {client_table} ORDER BY nome;")
+        return _cache_set(chave, cursor.fetchall())
+
+def fetch_client_context(client_id):
+    """
+    Retorna o ContextoCliente (linha do cliente, linha do servidor e URLs do
+    Zabbix, estas duas buscadas pelo nome do cliente) em uma única consulta,
+    ou None se o cliente não existir.
+    """
+    chave = ("contexto", client_id)
+    contexto = _cache_get(chave)
+    if contexto is not None:
+        return contexto
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT row_to_json(c),
+                   CASE WHEN s.nome IS NULL THEN NULL ELSE row_to_json(s) END,
+                   CASE WHEN u.nome IS NULL THEN NULL ELSE row_to_json(u) END
+            FROM {client_table} c
+            LEFT JOIN LATERAL (SELECT * FROM {serv_table} WHERE nome = c.nome LIMIT 1) s ON TRUE
+            LEFT JOIN LATERAL (SELECT * FROM {urlzbx_table} WHERE nome = c.nome LIMIT 1) u ON TRUE
+            WHERE c.idcliente = %s;
+        """, (client_id,))
+        linha = cursor.fetchone()
+    if linha is None:
+        return None
+    return _cache_set(chave, ContextoCliente(*linha))
+
+def save_user_data(username, client_name):
+    """
+    Registra em tb_autentificacao quem gerou o relatório de qual cliente.
+    Retorna o idexecucao do registro, usado para ligar as medições de tempo
+    à execução (None se o banco ainda não tiver a coluna, ver tempos_etapas.sql).
+    """
+    user_ip = socket.gethostbyname(socket.gethostname())
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        try:
+            cursor.execute("""
+                INSERT INTO tb_autentificacao (username, ipmaquina, horario, cliente)
+                VALUES (%s, %s, %s, %s)
+                RETURNING idexecucao;
+            """, (username, user_ip, timestamp, client_name))
+            idexecucao = cursor.fetchone()[0]
+        except pg_errors.UndefinedColumn:
+            connection.rollback()
+            cursor.execute("""
+                INSERT INTO tb_autentificacao (username, ipmaquina, horario, cliente)
+                VALUES (%s, %s, %s, %s);
+            """, (username, user_ip, timestamp, client_name))
+            idexecucao = None
+        connection.commit()
+    print("Dados do usuário salvos no banco de dados com sucesso!")
+    return idexecucao
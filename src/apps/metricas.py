@@ -0,0 +1,98 @@
+# src/apps/metricas.py
+"""
+Cronometragem das etapas do relatório.
+
+Cada geração abre uma execução (iniciar_execucao) e todo trecho envolvido
+por cronometrar("etapa") é medido com relógio monotônico e anotado nela.
+A execução atual é guardada em um ContextVar, então funciona mesmo com
+vários relatórios sendo gerados em paralelo; o scheduler copia o contexto
+para as threads das etapas. Ao final, persistir() grava as medições em
+tb_tempo_etapa, ligadas ao registro de tb_autentificacao da execução
+(ver src/scripts/sql/tempos_etapas.sql para a tabela e as views de p50/p95).
+"""
+import time
+import logging
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+
+_execucao_atual = contextvars.ContextVar("pgr_execucao_atual", default=None)
+
+@dataclass
+class Medicao:
+    etapa: str
+    detalhe: str
+    inicio: datetime
+    duracao_ms: float
+    sucesso: bool
+
+@dataclass
+class Execucao:
+    cliente: str = None
+    medicoes: list = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def registrar(self, medicao):
+        with self._lock:
+            self.medicoes.append(medicao)
+
+@contextmanager
+def iniciar_execucao(cliente=None):
+    """Abre uma execução no contexto atual; as medições feitas dentro do bloco vão para ela."""
+    execucao = Execucao(cliente)
+    token = _execucao_atual.set(execucao)
+    try:
+        yield execucao
+    finally:
+        _execucao_atual.reset(token)
+
+@contextmanager
+def cronometrar(etapa, detalhe=None):
+    """Mede o bloco e registra na execução atual (se houver) e no log."""
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    sucesso = False
+    try:
+        yield
+        sucesso = True
+    finally:
+        duracao_ms = (time.perf_counter() - t0) * 1000
+        execucao = _execucao_atual.get()
+        if execucao is not None:
+            execucao.registrar(Medicao(etapa, None if detalhe is None else str(detalhe), inicio, duracao_ms, sucesso))
+        sufixo = f" [{detalhe}]" if detalhe is not None else ""
+        logging.info(f"Tempo da etapa '{etapa}'{sufixo}: {duracao_ms:.0f} ms")
+
+def cronometrado(etapa):
+    """Decorador equivalente a envolver a função inteira em cronometrar(etapa)."""
+    def decorador(funcao):
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            with cronometrar(etapa):
+                return funcao(*args, **kwargs)
+        return wrapper
+    return decorador
+
+def persistir(execucao, idexecucao):
+    """Grava as medições em tb_tempo_etapa; falhas são apenas registradas no log."""
+    if not execucao.medicoes or idexecucao is None:
+        return
+    from src.apps import db_pool
+
+    linhas = [
+        (idexecucao, execucao.cliente, m.etapa, m.detalhe, m.inicio, m.duracao_ms, m.sucesso)
+        for m in execucao.medicoes
+    ]
+    try:
+        with db_pool.connection() as connection, connection.cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO tb_tempo_etapa (idexecucao, cliente, etapa, detalhe, inicio, duracao_ms, sucesso)
+                VALUES (%s, %s, %s, %s, %s, %s, %s);
+            """, linhas)
+            connection.commit()
+        logging.info(f"{len(linhas)} medições de tempo gravadas para a execução {idexecucao}.")
+    except Exception as e:
+        logging.error(f"Erro ao gravar as medições de tempo: {e}")
@@ -0,0 +1,227 @@
+# src/apps/navegador.py
+"""
+Navegador persistente para a captura de gráficos pelo frontend do Zabbix.
+
+Um único Chromium fica aberto durante todo o processo, rodando em um event
+loop próprio (thread "pgr-navegador"); as chamadas vindas das threads dos
+relatórios são encaminhadas para esse loop. As páginas são abertas em um
+pool de contextos que reaproveitam o storage state salvo (cookie de sessão
+do Zabbix, também gravado em ZABBIX_STORAGE_STATE), de modo que o login só é
+refeito quando a sessão expira. No máximo GRAPH_BROWSER_CONCURRENCY páginas
+ficam abertas ao mesmo tempo, somando todos os clientes.
+"""
+import os
+import re
+import json
+import atexit
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+
+from src.apps.metricas import cronometrar
+from src.apps.workspace import BASE_DIR
+
+load_dotenv()
+
+ZABBIX_URL = os.getenv("URL_ZBX")
+ZABBIX_USER = os.getenv("USER_ZBX")
+ZABBIX_PASSWORD = os.getenv("PASS_ZBX")
+
+# Páginas abertas ao mesmo tempo no navegador (todas as capturas do processo)
+CONCORRENCIA = int(os.getenv("GRAPH_BROWSER_CONCURRENCY", "4"))
+# Arquivo com o storage state (cookies) da sessão do Zabbix
+STORAGE_STATE_FILE = os.getenv("ZABBIX_STORAGE_STATE", os.path.join(BASE_DIR, "logs", "zabbix_storage_state.json"))
+
+class PoolNavegador:
+    def __init__(self, concorrencia=CONCORRENCIA):
+        self.concorrencia = max(1, concorrencia)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="pgr-navegador", daemon=True)
+        self._thread.start()
+        self._playwright = None
+        self._browser = None
+        self._estado = self._carregar_estado()
+        self._versao = 0
+        self._ociosos = []
+        # Os objetos asyncio são criados dentro do loop do navegador
+        self._iniciar_lock = None
+        self._login_lock = None
+        self._semaforo = None
+
+    # -- chamadas a partir das threads dos relatórios --------------------------
+    def executar(self, corrotina):
+        """
+        Executa a corrotina no loop do navegador e espera o resultado. A
+        tarefa herda o contexto da thread chamadora, para que as medições de
+        cronometrar() entrem na execução do relatório certo.
+        """
+        contexto = contextvars.copy_context()
+        future = Future()
+
+        def concluir(tarefa):
+            if tarefa.cancelled():
+                future.cancel()
+            elif tarefa.exception() is not None:
+                future.set_exception(tarefa.exception())
+            else:
+                future.set_result(tarefa.result())
+
+        def agendar():
+            tarefa = contexto.run(self._loop.create_task, corrotina)
+            tarefa.add_done_callback(concluir)
+
+        self._loop.call_soon_threadsafe(agendar)
+        return future.result()
+
+    def fechar(self):
+        if self._loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._fechar(), self._loop).result(timeout=30)
+            except Exception as e:
+                logging.error(f"Erro ao fechar o navegador: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # -- dentro do loop do navegador -------------------------------------------
+    @staticmethod
+    def _carregar_estado():
+        try:
+            with open(STORAGE_STATE_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _salvar_estado(self):
+        try:
+            os.makedirs(os.path.dirname(STORAGE_STATE_FILE), exist_ok=True)
+            # O arquivo contém o cookie de sessão: somente o dono pode ler
+            descritor = os.open(STORAGE_STATE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descritor, 'w') as f:
+                json.dump(self._estado, f)
+        except OSError as e:
+            logging.error(f"Não foi possível gravar o storage state do Zabbix: {e}")
+
+    async def _iniciar(self):
+        if self._iniciar_lock is None:
+            self._iniciar_lock = asyncio.Lock()
+            self._login_lock = asyncio.Lock()
+            self._semaforo = asyncio.Semaphore(self.concorrencia)
+        async with self._iniciar_lock:
+            if self._browser is None or not self._browser.is_connected():
+                from playwright.async_api import async_playwright
+                with cronometrar("navegador_inicio"):
+                    if self._playwright is None:
+                        self._playwright = await async_playwright().start()
+                    self._browser = await self._playwright.chromium.launch(headless=True)
+                self._ociosos.clear()
+                logging.info("Navegador iniciado para a captura de gráficos.")
+
+    async def _adquirir_contexto(self):
+        if self._ociosos:
+            contexto, versao = self._ociosos.pop()
+            if versao != self._versao and self._estado:
+                await contexto.add_cookies(self._estado.get("cookies", []))
+            return contexto
+        return await self._browser.new_context(storage_state=self._estado)
+
+    def _devolver_contexto(self, contexto):
+        self._ociosos.append((contexto, self._versao))
+
+    @staticmethod
+    async def _tela_de_login(page):
+        return await page.locator("input#name").count() > 0 and await page.locator("button#enter").count() > 0
+
+    async def _login(self, page, versao_vista):
+        """Faz o login nesta página, a menos que outra captura já tenha renovado a sessão."""
+        async with self._login_lock:
+            if versao_vista != self._versao:
+                await page.context.add_cookies(self._estado.get("cookies", []))
+                return
+            with cronometrar("zabbix_login_web"):
+                await login_zabbix(page)
+            self._estado = await page.context.storage_state()
+            self._versao += 1
+            self._salvar_estado()
+
+    async def abrir(self, url, wait_until="networkidle"):
+        """
+        Abre a URL em uma página autenticada e retorna (contexto, página);
+        devolva-os com liberar() ao terminar.
+        """
+        await self._iniciar()
+        await self._semaforo.acquire()
+        contexto = page = None
+        try:
+            contexto = await self._adquirir_contexto()
+            page = await contexto.new_page()
+            versao = self._versao
+            await page.goto(url, wait_until=wait_until)
+            if await self._tela_de_login(page):
+                logging.info("Sessão do Zabbix ausente ou expirada; fazendo login no navegador.")
+                await self._login(page, versao)
+                await page.goto(url, wait_until=wait_until)
+            return contexto, page
+        except BaseException:
+            try:
+                if page is not None:
+                    await page.close()
+                if contexto is not None:
+                    self._devolver_contexto(contexto)
+            finally:
+                self._semaforo.release()
+            raise
+
+    async def liberar(self, contexto, page):
+        try:
+            await page.close()
+            self._devolver_contexto(contexto)
+        finally:
+            self._semaforo.release()
+
+    async def _fechar(self):
+        for contexto, _ in self._ociosos:
+            await contexto.close()
+        self._ociosos.clear()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+async def login_zabbix(page):
+    """
+    Realiza o login no Zabbix.
+    Página de login: {ZABBIX_URL}/
+      - Campo de usuário: input com id "name"
+      - Campo de senha: input com id "password"
+      - Botão de login: button com id "enter"
+    Após o login, o Zabbix redireciona para uma URL contendo "zabbix.php?action=dashboard.view".
+    """
+    login_url = f"{ZABBIX_URL}/"
+    logging.info(f"Iniciando login na URL: {login_url}")
+    await page.goto(login_url, wait_until="networkidle")
+
+    # Aguarda e preenche os campos de login
+    await page.wait_for_selector("input#name", timeout=15000)
+    await page.fill("input#name", ZABBIX_USER)
+    await page.fill("input#password", ZABBIX_PASSWORD)
+
+    # Aguarda o botão de login e clica nele, esperando a navegação para o dashboard
+    await page.wait_for_selector("button#enter", timeout=15000)
+    async with page.expect_navigation(url=re.compile(r".*zabbix\.php\?action=dashboard\.view.*"), timeout=30000):
+        await page.click("button#enter")
+    logging.info(f"Login realizado com sucesso. URL atual: {page.url}")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obter_pool():
+    """Pool de navegador do processo, criado na primeira captura."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolNavegador()
+            atexit.register(_pool.fechar)
+        return _pool
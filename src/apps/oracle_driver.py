@@ -0,0 +1,229 @@
+# src/apps/oracle_driver.py
+"""
+Conexões com os bancos Oracle dos clientes.
+
+O caminho principal é o python-oracledb em modo thin (sem JVM e sem Oracle
+Client): um pool de sessões por banco de destino, criado na primeira conexão
+e reaproveitado por todos os relatórios do processo. O jaydebeapi (JDBC,
+que inicia uma JVM) fica como reserva para bancos que o modo thin não
+atende (versões anteriores ao 12.1, verificadores de senha antigos) ou
+quando ORACLE_DRIVER=jdbc.
+
+As sessões ociosas do pool são fechadas depois de ORACLE_POOL_IDLE
+segundos, para que os bancos de todos os clientes já atendidos não fiquem
+com sessões abertas enquanto o processo (GUI, lote) continua rodando. Um
+relatório usa sessao(): no JDBC, todas as suas consultas compartilham uma
+única conexão, fechada ao final.
+"""
+import os
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from src.apps.metricas import cronometrar
+
+try:
+    import oracledb
+except ImportError:
+    oracledb = None
+
+try:
+    import jaydebeapi
+except ImportError:
+    jaydebeapi = None
+
+load_dotenv()
+
+# "thin" (python-oracledb, com o JDBC como reserva) ou "jdbc" (só jaydebeapi)
+DRIVER = os.getenv("ORACLE_DRIVER", "thin").lower()
+JAR_JDBC = os.getenv("JAR_JDBC")
+
+# Pool de sessões de cada banco: mínimo aberto, máximo simultâneo e espera (segundos) por uma sessão livre
+POOL_MIN = int(os.getenv("ORACLE_POOL_MIN", "0"))
+POOL_MAX = int(os.getenv("ORACLE_POOL_MAX", "4"))
+POOL_TIMEOUT = float(os.getenv("ORACLE_POOL_TIMEOUT", "30"))
+CONNECT_TIMEOUT = float(os.getenv("ORACLE_CONNECT_TIMEOUT", "10"))
+# Segundos que uma sessão ociosa (acima de ORACLE_POOL_MIN) fica aberta no pool
+POOL_IDLE = int(os.getenv("ORACLE_POOL_IDLE", "60"))
+# Consultas simultâneas em um mesmo banco, somando todos os relatórios do processo
+PARALELISMO = max(1, int(os.getenv("ORACLE_PARALELISMO", "3")))
+
+class ErroConexao(Exception):
+    """Não foi possível obter uma conexão (tempo esgotado no limite do banco, driver ausente)."""
+
+# Exceções de banco dos drivers disponíveis e ErroConexao, para os except de quem consulta
+ERROS = (ErroConexao, *(modulo.Error for modulo in (oracledb, jaydebeapi) if modulo is not None))
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Semáforo de cada banco, que limita as conexões emprestadas a ORACLE_PARALELISMO
+_limites = {}
+# Bancos em que o modo thin já falhou por falta de suporte: vão direto ao JDBC
+_somente_jdbc = set()
+# A JVM do jaydebeapi é única por processo: a conexão é serializada para que
+# relatórios gerados em paralelo não tentem iniciá-la ao mesmo tempo.
+_jdbc_lock = threading.Lock()
+
+def _dsn(host, porta, servico):
+    return f"{host}:{porta}/{servico}"
+
+def _limite(dsn):
+    with _pools_lock:
+        return _limites.setdefault(dsn, threading.BoundedSemaphore(PARALELISMO))
+
+def _obter_pool(host, porta, servico, usuario, senha):
+    """Pool thin do banco de destino, criado na primeira conexão."""
+    chave = (_dsn(host, porta, servico), usuario)
+    with _pools_lock:
+        pool = _pools.get(chave)
+        if pool is None:
+            pool = oracledb.create_pool(
+                user=usuario, password=senha, host=host, port=int(porta), service_name=servico,
+                min=POOL_MIN, max=POOL_MAX, increment=1,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT, wait_timeout=int(POOL_TIMEOUT * 1000),
+                timeout=POOL_IDLE, ping_interval=60, tcp_connect_timeout=CONNECT_TIMEOUT,
+            )
+            _pools[chave] = pool
+            logging.info(f"Pool Oracle (thin) criado para {chave[0]} ({POOL_MIN}-{POOL_MAX} sessões).")
+        return pool
+
+def _sem_suporte_thin(erro):
+    """Erros DPY-3xxx indicam recurso do banco que o modo thin não suporta."""
+    detalhe = erro.args[0] if erro.args else None
+    return str(getattr(detalhe, "full_code", "")).startswith("DPY-3")
+
+def _conectar_jdbc(host, porta, servico, usuario, senha):
+    if jaydebeapi is None:
+        raise ErroConexao("jaydebeapi não está instalado e o modo thin não pôde ser usado.")
+    jdbc_url = f"jdbc:oracle:thin:@{_dsn(host, porta, servico)}"
+    logging.info(f"String de conexão montada: {jdbc_url}")
+    with cronometrar("oracle_conexao", "jdbc"), _jdbc_lock:
+        try:
+            return jaydebeapi.connect('oracle.jdbc.driver.OracleDriver', jdbc_url, [usuario, senha], JAR_JDBC)
+        except ERROS:
+            raise
+        except Exception as e:
+            # Falhas da JVM (JAR ausente, classe do driver não encontrada) não são erros de banco
+            raise ErroConexao(f"Falha ao conectar via JDBC a {jdbc_url}: {e}") from e
+
+def _usa_thin(dsn):
+    return DRIVER != "jdbc" and oracledb is not None and dsn not in _somente_jdbc
+
+def _adquirir_thin(host, porta, servico, usuario, senha, dsn):
+    """
+    (pool, sessão) do pool thin; a sessão é None se o modo thin não atende o
+    banco, que a partir daí vai direto ao JDBC.
+    """
+    pool = _obter_pool(host, porta, servico, usuario, senha)
+    try:
+        with cronometrar("oracle_conexao", "thin"):
+            return pool, pool.acquire()
+    except oracledb.Error as e:
+        if not _sem_suporte_thin(e):
+            raise
+        logging.error(f"O modo thin não atende o banco {dsn} ({e}); usando JDBC.")
+        _somente_jdbc.add(dsn)
+        return pool, None
+
+@contextmanager
+def _limitado(dsn):
+    """No máximo ORACLE_PARALELISMO conexões emprestadas ao mesmo tempo por banco."""
+    limite = _limite(dsn)
+    if not limite.acquire(timeout=POOL_TIMEOUT):
+        raise ErroConexao(f"Tempo esgotado aguardando uma conexão livre com o banco {dsn}.")
+    try:
+        yield
+    finally:
+        limite.release()
+
+@contextmanager
+def conexao(host, porta, servico, usuario, senha):
+    """
+    Empresta uma conexão com o banco do cliente e a devolve (ao pool, no modo
+    thin, ou fechando-a, no JDBC) ao final do bloco. No máximo
+    ORACLE_PARALELISMO conexões por banco ficam emprestadas ao mesmo tempo.
+    """
+    dsn = _dsn(host, porta, servico)
+    with _limitado(dsn):
+        if _usa_thin(dsn):
+            pool, conn = _adquirir_thin(host, porta, servico, usuario, senha, dsn)
+            if conn is not None:
+                try:
+                    yield conn
+                finally:
+                    pool.release(conn)
+                return
+        conn = _conectar_jdbc(host, porta, servico, usuario, senha)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+class Sessao:
+    """
+    Conexões de um relatório com um banco. No modo thin cada consulta empresta
+    uma sessão do pool; no JDBC todas usam uma única conexão, aberta na
+    primeira consulta, usada por uma consulta de cada vez e fechada em fechar().
+    """
+    def __init__(self, host, porta, servico, usuario, senha):
+        self._credenciais = (host, porta, servico, usuario, senha)
+        self.dsn = _dsn(host, porta, servico)
+        self._jdbc = None
+        self._erro_jdbc = None
+        self._jdbc_lock = threading.Lock()
+
+    @contextmanager
+    def conexao(self):
+        with _limitado(self.dsn):
+            if _usa_thin(self.dsn):
+                pool, conn = _adquirir_thin(*self._credenciais, self.dsn)
+                if conn is not None:
+                    try:
+                        yield conn
+                    finally:
+                        pool.release(conn)
+                    return
+            with self._jdbc_lock:
+                if self._jdbc is None:
+                    # Se a conexão já falhou neste relatório, as outras consultas não tentam de novo
+                    if self._erro_jdbc is not None:
+                        raise self._erro_jdbc
+                    try:
+                        self._jdbc = _conectar_jdbc(*self._credenciais)
+                    except ERROS as e:
+                        self._erro_jdbc = e
+                        raise
+                yield self._jdbc
+
+    def fechar(self):
+        with self._jdbc_lock:
+            if self._jdbc is not None:
+                try:
+                    self._jdbc.close()
+                except Exception as e:
+                    logging.error(f"Erro ao fechar a conexão JDBC com {self.dsn}: {e}")
+                self._jdbc = None
+
+@contextmanager
+def sessao(host, porta, servico, usuario, senha):
+    """Sessao do relatório com o banco do cliente, fechada ao final do bloco."""
+    atual = Sessao(host, porta, servico, usuario, senha)
+    try:
+        yield atual
+    finally:
+        atual.fechar()
+
+def fechar_pools():
+    """Fecha os pools thin (chamado automaticamente ao sair)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            try:
+                pool.close(force=True)
+            except Exception as e:
+                logging.error(f"Erro ao fechar o pool Oracle: {e}")
+        _pools.clear()
+
+atexit.register(fechar_pools)
@@ -0,0 +1,99 @@
+# src/apps/pipeline.py
+"""
+Orquestra as etapas do relatório no próprio processo.
+
+Antes cada etapa era um "python src/apps/<script>.py" separado, o que
+recarregava o interpretador, pandas, Playwright, jinja2, pypdf e o .env a
+cada relatório. Aqui as etapas são chamadas como funções: os módulos são
+importados uma única vez (na primeira execução) e os dados coletados passam
+direto de uma etapa para a outra. Cada execução recebe sua própria área de
+trabalho (ver workspace.py), o que permite rodar vários relatórios em paralelo.
+
+As etapas formam um grafo de dependências (ver scheduler.py): os coletores
+independentes (gráficos, itens e estatísticas do Zabbix, consultas no banco, SSH)
+rodam ao mesmo tempo e só a renderização do PDF e a mesclagem esperam por
+todos eles.
+
+Cada tipo de banco registra o seu fluxo em FLUXOS (ver registrar_fluxo) e o
+relatório executa só o fluxo do tpbanco do cliente: um cliente SQL Server não
+passa pelas consultas Oracle nem pelo SSH, e vice-versa. Um novo tipo
+(PostgreSQL, MySQL) só precisa de uma função decorada com registrar_fluxo.
+"""
+import logging
+
+from src.apps.scheduler import Etapa, executar_etapas
+
+# Tipo de banco (normalizado) -> função que executa o fluxo dele com a área de trabalho
+FLUXOS = {}
+
+# Grafias do tpbanco/db_type que indicam o mesmo tipo de banco
+APELIDOS = {
+    "mssql": "sqlserver",
+    "postgresql": "postgres",
+    "mariadb": "mysql",
+}
+
+def normalizar_tipo(tipo):
+    """"SQL Server", "sql_server" e "MSSQL" viram "sqlserver"; "Oracle" vira "oracle"."""
+    tipo = "".join(caractere for caractere in str(tipo or "").lower() if caractere.isalnum())
+    return APELIDOS.get(tipo, tipo)
+
+def registrar_fluxo(tipo):
+    """Decorador que registra a função como o fluxo do tipo de banco informado."""
+    def decorador(funcao):
+        FLUXOS[normalizar_tipo(tipo)] = funcao
+        return funcao
+    return decorador
+
+def fluxo_do_cliente(cliente):
+    """Fluxo do cliente pela coluna tpbanco (ou db_type); ValueError se o tipo não tiver fluxo."""
+    tipo = cliente.get("tpbanco") or cliente.get("db_type")
+    fluxo = normalizar_tipo(tipo)
+    if not fluxo:
+        raise ValueError("O cliente não tem o tipo de banco (tpbanco) cadastrado.")
+    if fluxo not in FLUXOS:
+        raise ValueError(f"Não há coletores para o tipo de banco {tipo!r} (suportados: {', '.join(FLUXOS)}).")
+    return fluxo
+
+def executar(fluxo, workspace):
+    """Executa o fluxo registrado para o tipo de banco na área de trabalho."""
+    return FLUXOS[normalizar_tipo(fluxo)](workspace)
+
+@registrar_fluxo("oracle")
+def executar_oracle(workspace):
+    """Fluxo Oracle: gráficos do Zabbix, coleta no banco/servidor, PDF e mesclagem."""
+    from src.apps import app_graphics, formatter, mergepdf, ultima_consulta
+
+    def renderizar(graficos, banco, servidor, estatisticas):
+        dados = dict(banco)
+        dados.update(servidor)
+        dados["estatisticas"] = estatisticas
+        formatter.gerar_pdf(dados, workspace)
+        return dados
+
+    logging.info("Iniciando pipeline Oracle.")
+    resultados = executar_etapas([
+        Etapa("graficos", lambda: app_graphics.capture_pages(workspace)),
+        Etapa("banco", lambda: formatter.obter_dados_do_banco(workspace, incluir_servidor=False)),
+        Etapa("servidor", lambda: formatter.obter_dados_do_servidor(workspace)),
+        Etapa("estatisticas", lambda: ultima_consulta.estatisticas_desempenho(workspace)),
+        Etapa("render", renderizar, ("graficos", "banco", "servidor", "estatisticas")),
+        Etapa("merge", lambda render: mergepdf.main(workspace), ("render",)),
+    ])
+    return resultados["render"]
+
+@registrar_fluxo("sqlserver")
+def executar_sqlserver(workspace):
+    """Fluxo SQL Server: gráficos e itens do Zabbix, PDF e mesclagem."""
+    from src.apps import app_graphics, ultima_consulta, formatter_sqlserver, mergepdf
+
+    logging.info("Iniciando pipeline SQL Server.")
+    resultados = executar_etapas([
+        Etapa("graficos", lambda: app_graphics.capture_pages(workspace)),
+        Etapa("zabbix", lambda: ultima_consulta.main(workspace)),
+        Etapa("estatisticas", lambda: ultima_consulta.estatisticas_desempenho(workspace)),
+        Etapa("render", lambda graficos, zabbix, estatisticas: formatter_sqlserver.main(workspace, zabbix, estatisticas),
+              ("graficos", "zabbix", "estatisticas")),
+        Etapa("merge", lambda render: mergepdf.main(workspace), ("render",)),
+    ])
+    return resultados["render"]
@@ -0,0 +1,260 @@
+# src/apps/relatorio.py
+"""
+Geração de relatórios sem interface gráfica.
+
+Reúne o trabalho que antes ficava em generate_report_worker (main.py e
+main copy.py): busca os dados do cliente, prepara a área de trabalho,
+registra a auditoria, executa o pipeline e move o PDF final para a pasta
+output. É usado tanto pela janela Tkinter quanto pelo cli.py.
+
+Sem fluxo explícito, cada cliente segue o fluxo do seu tipo de banco
+(tpbanco), escolhido em pipeline.FLUXOS; um lote pode misturar tipos.
+"""
+import os
+import json
+import time
+import shutil
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.apps import metadata, metricas, pipeline
+from src.apps.metricas import cronometrar
+from src.apps.workspace import BASE_DIR, criar_workspace, remover_workspace
+
+# Quantidade máxima de relatórios gerados em paralelo em um lote
+MAX_WORKERS = int(os.getenv("PGR_WORKERS", "4"))
+REPORTS_DIR = os.path.join(BASE_DIR, "output")
+
+FLUXOS = tuple(pipeline.FLUXOS)
+
+@dataclass
+class ResultadoRelatorio:
+    client_id: object
+    nome: str = None
+    sucesso: bool = False
+    mensagem: str = ""
+    arquivo: str = None
+    duracao: float = 0.0
+
+def get_month_in_portuguese(dt):
+    """Retorna o nome do mês em português (minúsculo) para o datetime informado."""
+    months = {
+        1: 'janeiro',
+        2: 'fevereiro',
+        3: 'março',
+        4: 'abril',
+        5: 'maio',
+        6: 'junho',
+        7: 'julho',
+        8: 'agosto',
+        9: 'setembro',
+        10: 'outubro',
+        11: 'novembro',
+        12: 'dezembro'
+    }
+    return months[dt.month]
+
+def _salvar_json(caminho, dados):
+    with open(caminho, 'w') as json_file:
+        json.dump(dados, json_file, default=str)
+
+def preparar_workspace(contexto, workspace, fluxo):
+    """
+    Grava na área de trabalho os JSONs lidos pelas etapas: client_info.json
+    (no fluxo Oracle, só as colunas usadas pelo formatter.py), serv_info.json
+    e ulrzbx.json.
+    """
+    if fluxo == "oracle":
+        colunas = ["idcliente", "nome", "ip", "portassh", "tpbanco", "nomebanco",
+                   "portabanco", "idhostzbx", "userssh", "senhassh"]
+        _salvar_json(workspace.client_info_file, {coluna: contexto.cliente.get(coluna) for coluna in colunas})
+    else:
+        _salvar_json(workspace.client_info_file, contexto.cliente)
+    if contexto.servidor:
+        _salvar_json(workspace.serv_info_file, contexto.servidor)
+    if contexto.urlzbx:
+        _salvar_json(workspace.urlzbx_file, contexto.urlzbx)
+
+def mover_relatorio(workspace, nome_cliente):
+    """Move o relatorio.pdf da área de trabalho para output/ com o nome definitivo."""
+    if not os.path.exists(workspace.relatorio_pdf):
+        raise FileNotFoundError("O relatório final não foi gerado pelo pipeline.")
+    mes_atual = get_month_in_portuguese(datetime.now())
+    # Se nome_cliente não foi encontrado, usa "Cliente" como padrão
+    nome_cliente = nome_cliente if nome_cliente else "Cliente"
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    novo_nome_pdf = os.path.join(REPORTS_DIR, f"Relatório situacional {nome_cliente} de {mes_atual}.pdf")
+    shutil.move(workspace.relatorio_pdf, novo_nome_pdf)
+    print(f"Relatório movido para a pasta 'output' com o nome '{novo_nome_pdf}' com sucesso!")
+    return novo_nome_pdf
+
+def gerar_relatorio(client_id, username, fluxo=None):
+    """
+    Gera o relatório de um cliente e retorna um ResultadoRelatorio (nunca
+    levanta exceção). Com fluxo None, usa o fluxo do tipo de banco do cliente.
+    """
+    if fluxo is not None and fluxo not in FLUXOS:
+        raise ValueError(f"Fluxo desconhecido: {fluxo}")
+
+    inicio = time.monotonic()
+    resultado = ResultadoRelatorio(client_id)
+    with metricas.iniciar_execucao() as execucao:
+        try:
+            # Cliente, servidor e URLs do Zabbix vêm em uma única consulta (com cache)
+            with cronometrar("metadados"):
+                contexto = metadata.fetch_client_context(client_id)
+        except Exception as e:
+            logging.error(f"Erro ao buscar dados do cliente {client_id}: {e}")
+            resultado.mensagem = f"Erro ao buscar dados do cliente: {e}"
+            return resultado
+        if not contexto:
+            resultado.mensagem = "Cliente não encontrado."
+            return resultado
+        resultado.nome = execucao.cliente = contexto.cliente.get("nome")
+        try:
+            fluxo = fluxo or pipeline.fluxo_do_cliente(contexto.cliente)
+        except ValueError as e:
+            logging.error(f"Cliente {client_id}: {e}")
+            resultado.mensagem = str(e)
+            return resultado
+
+        # Cada geração usa uma área de trabalho própria, o que permite rodar clientes em paralelo
+        workspace = criar_workspace()
+        idexecucao = None
+        try:
+            preparar_workspace(contexto, workspace, fluxo)
+
+            try:
+                idexecucao = metadata.save_user_data(username, resultado.nome)
+            except Exception as e:
+                # A falha na auditoria não impede a geração do relatório
+                logging.error(f"Erro ao salvar os dados do usuário no banco: {e}")
+
+            with cronometrar("relatorio", fluxo):
+                pipeline.executar(fluxo, workspace)
+
+            resultado.arquivo = mover_relatorio(workspace, resultado.nome)
+            resultado.sucesso = True
+            resultado.mensagem = "Relatório gerado com sucesso!"
+        except Exception as e:
+            logging.error(f"Erro ao gerar o relatório do cliente {client_id}: {e}")
+            resultado.mensagem = f"Erro ao executar os scripts: {e}"
+        finally:
+            remover_workspace(workspace)
+            resultado.duracao = time.monotonic() - inicio
+            metricas.persistir(execucao, idexecucao)
+    return resultado
+
+def precarregar_zabbix(client_ids):
+    """
+    Coleta antecipadamente, em requisições concorrentes, os itens do Zabbix de
+    todos os clientes do lote (fluxo SQL Server). Falhas só são registradas:
+    cada relatório consulta o que não foi coletado.
+    """
+    try:
+        from src.apps import ultima_consulta
+        infos = []
+        for client_id in client_ids:
+            contexto = metadata.fetch_client_context(client_id)
+            if contexto:
+                infos.append(contexto.cliente)
+                infos.append(contexto.servidor or {})
+        ultima_consulta.precarregar_frota(infos)
+    except Exception as e:
+        logging.error(f"Erro na coleta antecipada dos itens do Zabbix: {e}")
+
+def precarregar_servidores(client_ids):
+    """
+    Coleta antecipadamente, em paralelo, as informações via SSH dos servidores
+    de todos os clientes do lote (fluxo Oracle). Servidores que falharem são
+    tentados de novo pelo próprio relatório.
+    """
+    try:
+        from src.apps import coleta_ssh
+        alvos = []
+        for client_id in client_ids:
+            contexto = metadata.fetch_client_context(client_id)
+            if contexto and contexto.cliente.get("ip"):
+                alvos.append(coleta_ssh.alvo_do_cliente(contexto.cliente))
+        coleta_ssh.coletar_frota(alvos)
+    except Exception as e:
+        logging.error(f"Erro na coleta antecipada dos servidores via SSH: {e}")
+
+def precarregar_graficos(client_ids):
+    """
+    No modo local dos gráficos (GRAPH_CAPTURE_MODE=local), busca de uma vez
+    as séries de CPU e memória de todos os clientes do lote; cada relatório
+    só desenha o seu gráfico a partir delas.
+    """
+    try:
+        from src.apps import app_graphics
+        if app_graphics.CAPTURE_MODE != "local":
+            return
+        from src.apps import graficos
+        urls = []
+        for client_id in client_ids:
+            contexto = metadata.fetch_client_context(client_id)
+            if contexto and contexto.urlzbx:
+                urls.append(contexto.urlzbx)
+        graficos.precarregar_frota(urls)
+    except Exception as e:
+        logging.error(f"Erro na busca antecipada das séries dos gráficos: {e}")
+
+# Coleta antecipada de cada fluxo, feita uma vez para todos os clientes do lote daquele tipo
+PRECARGAS = {
+    "oracle": precarregar_servidores,
+    "sqlserver": precarregar_zabbix,
+}
+
+def fluxos_do_lote(client_ids, fluxo=None):
+    """
+    {client_id: fluxo} do lote: o fluxo informado para todos ou, com None, o
+    do tipo de banco de cada cliente. Clientes cujo tipo não pôde ser obtido
+    ficam com None e o erro aparece no resultado do próprio relatório.
+    """
+    fluxos = {}
+    for client_id in client_ids:
+        if fluxo is not None:
+            fluxos[client_id] = fluxo
+            continue
+        try:
+            contexto = metadata.fetch_client_context(client_id)
+            fluxos[client_id] = pipeline.fluxo_do_cliente(contexto.cliente) if contexto else None
+        except Exception as e:
+            logging.error(f"Erro ao identificar o tipo de banco do cliente {client_id}: {e}")
+            fluxos[client_id] = None
+    return fluxos
+
+def gerar_relatorios(client_ids, username, fluxo=None, max_workers=None, ao_concluir=None):
+    """
+    Gera os relatórios de vários clientes em paralelo, limitado a max_workers
+    simultâneos. Com fluxo None, cada cliente segue o fluxo do seu tipo de
+    banco. ao_concluir(resultado, concluidos, total) é chamado a cada
+    relatório finalizado. Retorna a lista de resultados na ordem de client_ids.
+    """
+    if fluxo is not None and fluxo not in FLUXOS:
+        raise ValueError(f"Fluxo desconhecido: {fluxo}")
+    client_ids = list(client_ids)
+    total = len(client_ids)
+    if not total:
+        return []
+    fluxos = fluxos_do_lote(client_ids, fluxo)
+    if total > 1:
+        precarregar_graficos(client_ids)
+    for tipo, precarregar in PRECARGAS.items():
+        ids = [client_id for client_id in client_ids if fluxos[client_id] == tipo]
+        if len(ids) > 1:
+            precarregar(ids)
+    workers = max(1, min(max_workers or MAX_WORKERS, total))
+    resultados = [None] * total
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(gerar_relatorio, client_id, username, fluxos[client_id]): i
+                   for i, client_id in enumerate(client_ids)}
+        for concluidos, future in enumerate(as_completed(futures), start=1):
+            resultado = future.result()
+            resultados[futures[future]] = resultado
+            if ao_concluir:
+                ao_concluir(resultado, concluidos, total)
+    return resultados
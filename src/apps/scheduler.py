@@ -0,0 +1,94 @@
+# src/apps/scheduler.py
+"""
+Agendador simples de etapas com dependências (DAG).
+
+Cada etapa declara de quais outras depende; as que não dependem umas das
+outras (ex.: captura de gráficos do Zabbix e coleta no banco/SSH) rodam ao
+mesmo tempo, e uma etapa começa assim que todas as suas dependências
+terminam. A função de cada etapa recebe os resultados das dependências
+como argumentos nomeados.
+"""
+import logging
+import contextvars
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from src.apps.metricas import cronometrar
+
+@dataclass
+class Etapa:
+    nome: str
+    funcao: object
+    depende_de: tuple = field(default_factory=tuple)
+
+class ErroEtapa(Exception):
+    """Falha em uma etapa; guarda o nome da etapa e a exceção original."""
+    def __init__(self, etapa, erro):
+        super().__init__(f"Etapa '{etapa}' falhou: {erro}")
+        self.etapa = etapa
+        self.erro = erro
+
+def _validar(etapas):
+    nomes = [etapa.nome for etapa in etapas]
+    if len(nomes) != len(set(nomes)):
+        raise ValueError("Há etapas com nomes repetidos.")
+    por_nome = {etapa.nome: etapa for etapa in etapas}
+    for etapa in etapas:
+        for dependencia in etapa.depende_de:
+            if dependencia not in por_nome:
+                raise ValueError(f"A etapa '{etapa.nome}' depende de '{dependencia}', que não existe.")
+    # Detecta ciclos removendo repetidamente as etapas sem dependências pendentes
+    pendentes = {etapa.nome: set(etapa.depende_de) for etapa in etapas}
+    while pendentes:
+        prontas = [nome for nome, deps in pendentes.items() if not deps]
+        if not prontas:
+            raise ValueError(f"Dependência circular entre as etapas: {', '.join(sorted(pendentes))}")
+        for nome in prontas:
+            del pendentes[nome]
+        for deps in pendentes.values():
+            deps.difference_update(prontas)
+
+def _executar_etapa(etapa, argumentos):
+    with cronometrar(f"pipeline.{etapa.nome}"):
+        return etapa.funcao(**argumentos)
+
+def executar_etapas(etapas, max_workers=None):
+    """
+    Executa as etapas respeitando as dependências e retorna {nome: resultado}.
+    Se uma etapa falha, nenhuma etapa nova é iniciada, as que já estão rodando
+    terminam e ErroEtapa é levantada.
+    """
+    etapas = list(etapas)
+    _validar(etapas)
+    resultados = {}
+    pendentes = {etapa.nome: etapa for etapa in etapas}
+    em_execucao = {}
+    erro = None
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(etapas))) as executor:
+        while pendentes or em_execucao:
+            if erro is None:
+                for nome, etapa in list(pendentes.items()):
+                    if all(dependencia in resultados for dependencia in etapa.depende_de):
+                        argumentos = {dependencia: resultados[dependencia] for dependencia in etapa.depende_de}
+                        logging.info(f"Iniciando etapa '{nome}'.")
+                        # Cada etapa roda numa cópia do contexto atual (mantém a execução da cronometragem)
+                        contexto = contextvars.copy_context()
+                        em_execucao[executor.submit(contexto.run, _executar_etapa, etapa, argumentos)] = nome
+                        del pendentes[nome]
+            if not em_execucao:
+                break
+            concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for future in concluidos:
+                nome = em_execucao.pop(future)
+                try:
+                    resultados[nome] = future.result()
+                    logging.info(f"Etapa '{nome}' concluída.")
+                except Exception as e:
+                    logging.error(f"Etapa '{nome}' falhou: {e}")
+                    if erro is None:
+                        erro = ErroEtapa(nome, e)
+
+    if erro is not None:
+        raise erro
+    return resultados
@@ -0,0 +1,220 @@
+# src/apps/serie_local.py
+"""
+Armazenamento local (SQLite) das tendências e do histórico dos itens do Zabbix.
+
+Os relatórios mensais leem sempre os mesmos 30 dias de CPU e memória. Em vez
+de buscar tudo no Zabbix a cada execução, as séries ficam em
+PGR_CACHE_DIR/zabbix_series.sqlite3 (chave itemid + clock) e cada
+sincronização pede ao Zabbix só o trecho a partir do último clock gravado
+(e o início da janela, se ela crescer). Depois disso a janela é lida
+localmente, em páginas, sem passar pela rede.
+
+Com ZABBIX_SERIE_LOCAL=0, ou se o arquivo não puder ser usado, sincronizar()
+retorna False e quem chamou consulta o Zabbix diretamente, como antes.
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.apps.cache_itens import CACHE_DIR
+from src.apps.metricas import cronometrar
+
+load_dotenv()
+
+SERIE_FILE = os.path.join(CACHE_DIR, "zabbix_series.sqlite3")
+ATIVO = os.getenv("ZABBIX_SERIE_LOCAL", "1").lower() in ("1", "true", "sim")
+# Dados mais antigos que isso (segundos) são apagados a cada sincronização
+RETENCAO = int(os.getenv("ZABBIX_SERIE_RETENCAO", str(400 * 86400)))
+# Janela (segundos) de cada página pedida ao Zabbix durante a sincronização
+TREND_PAGE = int(os.getenv("ZABBIX_TREND_PAGE", str(7 * 86400)))
+HISTORY_PAGE = int(os.getenv("ZABBIX_HISTORY_PAGE", "86400"))
+
+TENDENCIAS = "tendencias"
+HISTORICO = "historico"
+
+_criado = False
+_criar_lock = threading.Lock()
+
+def _conectar():
+    global _criado
+    conexao = sqlite3.connect(SERIE_FILE, timeout=30)
+    if not _criado:
+        with _criar_lock:
+            if not _criado:
+                conexao.execute("PRAGMA journal_mode=WAL")
+                conexao.executescript("""
+                    CREATE TABLE IF NOT EXISTS tendencias (
+                        itemid TEXT NOT NULL,
+                        clock INTEGER NOT NULL,
+                        num INTEGER,
+                        value_min REAL,
+                        value_avg REAL,
+                        value_max REAL,
+                        PRIMARY KEY (itemid, clock)
+                    ) WITHOUT ROWID;
+                    CREATE TABLE IF NOT EXISTS historico (
+                        itemid TEXT NOT NULL,
+                        clock INTEGER NOT NULL,
+                        value REAL,
+                        PRIMARY KEY (itemid, clock)
+                    ) WITHOUT ROWID;
+                    -- Trecho [desde, ate] já sincronizado de cada item em cada tabela
+                    CREATE TABLE IF NOT EXISTS sincronizacao (
+                        itemid TEXT NOT NULL,
+                        tabela TEXT NOT NULL,
+                        desde INTEGER NOT NULL,
+                        ate INTEGER NOT NULL,
+                        PRIMARY KEY (itemid, tabela)
+                    ) WITHOUT ROWID;
+                """)
+                conexao.commit()
+                _criado = True
+    return conexao
+
+def paginas(inicio, fim, passo):
+    """Divide [inicio, fim) em janelas de passo segundos."""
+    while inicio < fim:
+        yield inicio, min(inicio + passo, fim)
+        inicio += passo
+
+def _trechos_pendentes(conexao, tabela, itemids, time_from, time_till):
+    """
+    ({(inicio, fim): [itemids]} que ainda faltam no armazenamento para cobrir
+    a janela, {itemids} cujo trecho sincronizado deve ser substituído). O
+    trecho de cada item é sempre contínuo: se a janela começa depois do fim
+    do trecho gravado, o buraco entre os dois não é buscado e o trecho passa
+    a ser só a janela nova.
+    """
+    marcadores = ",".join("?" * len(itemids))
+    estado = {linha[0]: linha[1:] for linha in conexao.execute(
+        f"SELECT itemid, desde, ate FROM sincronizacao WHERE tabela = ? AND itemid IN ({marcadores})",
+        (tabela, *itemids))}
+    ultimos = dict(conexao.execute(
+        f"SELECT itemid, MAX(clock) FROM {tabela} WHERE itemid IN ({marcadores}) GROUP BY itemid",
+        itemids).fetchall())
+    trechos = {}
+    substituir = set()
+    for itemid in itemids:
+        desde, ate = estado.get(itemid, (None, None))
+        if desde is None or time_from > ate:
+            trechos.setdefault((time_from, time_till), []).append(itemid)
+            substituir.add(itemid)
+            continue
+        if time_from < desde:
+            trechos.setdefault((time_from, desde), []).append(itemid)
+        # A partir do último clock gravado (inclusive): cobre valores que chegaram atrasados
+        inicio = min(ate, ultimos.get(itemid) or ate)
+        if inicio < time_till:
+            trechos.setdefault((max(inicio, time_from), time_till), []).append(itemid)
+    return trechos, substituir
+
+def _gravar(conexao, tabela, linhas):
+    if tabela == TENDENCIAS:
+        conexao.executemany(
+            "INSERT OR REPLACE INTO tendencias (itemid, clock, num, value_min, value_avg, value_max) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(linha["itemid"], int(linha["clock"]), int(linha["num"]), float(linha["value_min"]),
+              float(linha["value_avg"]), float(linha["value_max"])) for linha in linhas])
+    else:
+        conexao.executemany(
+            "INSERT OR REPLACE INTO historico (itemid, clock, value) VALUES (?, ?, ?)",
+            [(linha["itemid"], int(linha["clock"]), float(linha["value"])) for linha in linhas])
+
+def sincronizar(zapi, itemids, time_from, time_till, value_type=None):
+    """
+    Traz do Zabbix o que falta para cobrir [time_from, time_till] dos itens:
+    tendências (value_type None) ou histórico do value_type (0 ou 3). Retorna
+    True se a janela pode ser lida localmente; False se o armazenamento está
+    desativado ou indisponível. Erros da API do Zabbix são propagados.
+    """
+    if not ATIVO:
+        return False
+    itemids = sorted({str(itemid) for itemid in itemids})
+    if not itemids:
+        return True
+    tabela = TENDENCIAS if value_type is None else HISTORICO
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with closing(_conectar()) as conexao:
+            trechos, substituir = _trechos_pendentes(conexao, tabela, itemids, time_from, time_till)
+            for (inicio, fim), ids in trechos.items():
+                passo = TREND_PAGE if tabela == TENDENCIAS else HISTORY_PAGE
+                for pagina_inicio, pagina_fim in paginas(inicio, fim, passo):
+                    with cronometrar(f"sincronizar_{tabela}", len(ids)):
+                        if tabela == TENDENCIAS:
+                            linhas = zapi.trend.get(
+                                itemids=ids, time_from=pagina_inicio, time_till=pagina_fim,
+                                output=["itemid", "clock", "num", "value_min", "value_avg", "value_max"])
+                        else:
+                            linhas = zapi.history.get(
+                                itemids=ids, history=value_type, time_from=pagina_inicio, time_till=pagina_fim,
+                                output=["itemid", "clock", "value"])
+                    # Uma transação por página: a memória fica limitada ao tamanho da página
+                    with conexao:
+                        _gravar(conexao, tabela, linhas)
+                with conexao:
+                    # Trechos contíguos ao já gravado são somados a ele; os demais o substituem
+                    conexao.executemany(
+                        "INSERT OR REPLACE INTO sincronizacao (itemid, tabela, desde, ate) VALUES (?, ?, ?, ?)",
+                        [(itemid, tabela, inicio, fim) for itemid in ids if itemid in substituir])
+                    conexao.executemany("""
+                        INSERT INTO sincronizacao (itemid, tabela, desde, ate) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (itemid, tabela) DO UPDATE SET
+                            desde = MIN(sincronizacao.desde, excluded.desde),
+                            ate = MAX(sincronizacao.ate, excluded.ate)
+                    """, [(itemid, tabela, inicio, fim) for itemid in ids if itemid not in substituir])
+            with conexao:
+                limite = int(time.time()) - RETENCAO
+                conexao.execute(f"DELETE FROM {tabela} WHERE clock < ?", (limite,))
+                # Trechos inteiramente expirados são esquecidos (nunca fica desde > ate)
+                conexao.execute("DELETE FROM sincronizacao WHERE tabela = ? AND ate <= ?", (tabela, limite))
+                conexao.execute("UPDATE sincronizacao SET desde = MAX(desde, ?) WHERE tabela = ?", (limite, tabela))
+        return True
+    except (OSError, sqlite3.Error) as e:
+        logging.error(f"Erro no armazenamento local das séries do Zabbix ({SERIE_FILE}): {e}")
+        return False
+
+def _consultar(tabela, colunas, itemids, time_from, time_till):
+    marcadores = ",".join("?" * len(itemids))
+    with closing(_conectar()) as conexao:
+        return conexao.execute(
+            f"SELECT itemid, clock, {', '.join(colunas)} FROM {tabela} "
+            f"WHERE itemid IN ({marcadores}) AND clock BETWEEN ? AND ? ORDER BY itemid, clock",
+            (*itemids, time_from, time_till)).fetchall()
+
+def paginas_tendencias(itemid, time_from, time_till, passo=TREND_PAGE):
+    """Tendências gravadas do item, uma página por vez: (clock, mínimo, média, máximo, num)."""
+    for inicio, fim in paginas(time_from, time_till, passo):
+        linhas = _consultar(TENDENCIAS, ("value_min", "value_avg", "value_max", "num"), [str(itemid)], inicio, fim - 1)
+        if linhas:
+            _, clock, minimo, media, maximo, num = (np.array(coluna) for coluna in zip(*linhas))
+            yield (clock.astype(np.int64), minimo.astype(np.float64), media.astype(np.float64),
+                   maximo.astype(np.float64), num.astype(np.float64))
+
+def paginas_historico(itemid, time_from, time_till, passo=HISTORY_PAGE):
+    """Histórico gravado do item, uma página por vez: (clock, valor)."""
+    for inicio, fim in paginas(time_from, time_till, passo):
+        linhas = _consultar(HISTORICO, ("value",), [str(itemid)], inicio, fim - 1)
+        if linhas:
+            _, clock, valor = (np.array(coluna) for coluna in zip(*linhas))
+            yield clock.astype(np.int64), valor.astype(np.float64)
+
+def ler_tendencias(itemids, time_from, time_till):
+    """Tendências gravadas de vários itens: {itemid: (clock, mínimo, média, máximo, num)}."""
+    itemids = sorted({str(itemid) for itemid in itemids})
+    linhas = _consultar(TENDENCIAS, ("value_min", "value_avg", "value_max", "num"), itemids, time_from, time_till)
+    series = {}
+    if linhas:
+        ids, clock, minimo, media, maximo, num = (np.array(coluna) for coluna in zip(*linhas))
+        for itemid in np.unique(ids):
+            filtro = ids == itemid
+            series[str(itemid)] = (clock[filtro].astype(np.int64), minimo[filtro].astype(np.float64),
+                                   media[filtro].astype(np.float64), maximo[filtro].astype(np.float64),
+                                   num[filtro].astype(np.float64))
+    return series
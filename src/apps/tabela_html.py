@@ -0,0 +1,57 @@
+# src/apps/tabela_html.py
+"""
+Tabela HTML montada linha a linha, sem DataFrame.
+
+Gera a mesma estrutura do DataFrame.to_html(classes=..., index=False,
+justify="center") usada pelo template (tabela "dataframe tabela_cinza",
+cabeçalho centralizado, uma <tr> por linha), consumindo as linhas de um
+iterador: quem chama pode passar o cursor em streaming (fetchmany) e
+nenhuma cópia intermediária do resultado é feita.
+
+Os valores são formatados um a um: o pandas iguala as casas decimais de
+cada coluna, o que exigiria ler o resultado inteiro antes de escrever a
+primeira linha. Aqui números saem na forma mais curta (até 6 casas), e
+valores ausentes (None/NaN) como "NaN", como o pandas os exibia.
+"""
+import io
+import html
+import math
+from decimal import Decimal
+from numbers import Integral, Real
+
+def _celula(valor):
+    if valor is None:
+        return "NaN"
+    if isinstance(valor, bool) or isinstance(valor, Integral):
+        return str(valor)
+    if isinstance(valor, Decimal):
+        # NUMBER do Oracle (oracledb com fetch_decimals): sem notação científica
+        return "NaN" if valor.is_nan() else format(valor, "f")
+    if isinstance(valor, Real):
+        valor = float(valor)
+        return "NaN" if math.isnan(valor) else repr(round(valor, 6))
+    return html.escape(str(valor))
+
+def tabela_html(linhas, colunas, classes="tabela_cinza"):
+    """
+    HTML da tabela com as colunas informadas e as linhas do iterador.
+    Retorna None se o iterador não tiver nenhuma linha.
+    """
+    saida = io.StringIO()
+    quantidade = 0
+    for linha in linhas:
+        if not quantidade:
+            saida.write(f'<table border="0" class="dataframe {classes}">\n')
+            saida.write('  <thead>\n    <tr style="text-align: center;">\n')
+            for coluna in colunas:
+                saida.write(f"      <th>{html.escape(str(coluna))}</th>\n")
+            saida.write("    </tr>\n  </thead>\n  <tbody>\n")
+        saida.write("    <tr>\n")
+        for valor in linha:
+            saida.write(f"      <td>{_celula(valor)}</td>\n")
+        saida.write("    </tr>\n")
+        quantidade += 1
+    if not quantidade:
+        return None
+    saida.write("  </tbody>\n</table>")
+    return saida.getvalue()
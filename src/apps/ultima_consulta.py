@@ -1,9 +1,18 @@
 import os
+import glob
 import json
+import time
+import asyncio
 import logging
+import threading
+from dataclasses import dataclass, field
+import numpy as np
 from pyzabbix import ZabbixAPI
 from dotenv import load_dotenv
 from urllib.parse import urlparse
+from src.apps.workspace import workspace_padrao
+from src.apps.metricas import cronometrar
+from src.apps import cache_itens, serie_local
 
 # Configuração do log
 log_dir = 'logs'
@@ -19,9 +28,37 @@ load_dotenv(dotenv_path='/home/tauge/Documents/tauge/PGR/.env')
 ZABBIX_URL = os.getenv("URL_ZBX")
 ZABBIX_USER = os.getenv("USER_ZBX")
 ZABBIX_PASSWORD = os.getenv("PASS_ZBX")
-OUTPUT_DIR = "/home/tauge/Documents/tauge/PGR/output"
-CLIENT_INFO_FILE = "/home/tauge/Documents/tauge/PGR/client_info copy.json"
-SERV_INFO_FILE = "/home/tauge/Documents/tauge/PGR/serv_info.json"
+
+# Tempo (segundos) de reaproveitamento da sessão da API antes de um novo login
+ZABBIX_SESSION_TTL = float(os.getenv("ZABBIX_SESSION_TTL", "600"))
+
+_zapi = None
+_zapi_expira_em = 0.0
+_zapi_lock = threading.Lock()
+
+# Janela (segundos) do histórico consultado para itens sem lastvalue
+HISTORY_WINDOW = int(os.getenv("ZABBIX_HISTORY_WINDOW", str(7 * 86400)))
+
+# Grava também os arquivos *_consulta.txt / Info_serv_prod.txt (cópia para depuração)
+SNAPSHOT_ZABBIX = os.getenv("PGR_SNAPSHOT_ZABBIX", "0").lower() in ("1", "true", "sim")
+
+# Valores coletados antecipadamente para um lote de clientes (ver precarregar_frota)
+ZABBIX_PREFETCH_TTL = float(os.getenv("ZABBIX_PREFETCH_TTL", "900"))
+_precarregados = {}
+_precarregados_lock = threading.Lock()
+
+# Estatísticas de CPU e memória: limites (na unidade do item) do "tempo acima"
+LIMITE_CPU = float(os.getenv("PGR_LIMITE_CPU", "80"))
+LIMITE_MEMORIA = float(os.getenv("PGR_LIMITE_MEMORIA", "90"))
+# Erro relativo máximo do p95 (largura dos bins do histograma)
+P95_PRECISAO = 0.005
+_BIN_ZERO = np.iinfo(np.int64).min
+
+@dataclass
+class ResultadoZabbix:
+    """Valores coletados do Zabbix (chave do client_info/serv_info -> último valor do item)."""
+    cliente: dict = field(default_factory=dict)
+    servidor: dict = field(default_factory=dict)
 
 def validar_url_zabbix():
     """Valida e ajusta a URL do Zabbix para a API."""
@@ -31,6 +68,21 @@ def validar_url_zabbix():
         return parsed._replace(path=new_path).geturl()
     return ZABBIX_URL
 
+def obter_zapi(renovar=False):
+    """
+    Sessão da API do Zabbix compartilhada pelo processo: o login é feito na
+    primeira chamada e refeito a cada ZABBIX_SESSION_TTL segundos.
+    """
+    global _zapi, _zapi_expira_em
+    with _zapi_lock:
+        if _zapi is None or renovar or time.monotonic() >= _zapi_expira_em:
+            with cronometrar("zabbix_login"):
+                zapi = ZabbixAPI(validar_url_zabbix())
+                zapi.login(ZABBIX_USER, ZABBIX_PASSWORD)
+            logging.info("Autenticação API realizada com sucesso.")
+            _zapi, _zapi_expira_em = zapi, time.monotonic() + ZABBIX_SESSION_TTL
+        return _zapi
+
 def carregar_json(caminho_arquivo):
     """Carrega as informações de um arquivo JSON."""
     try:
@@ -42,71 +94,342 @@ def carregar_json(caminho_arquivo):
         logging.error(f"Erro ao carregar {caminho_arquivo}: {str(e)}")
         raise
 
-def obter_valor_item(zapi, itemid):
+def _itemid(valor):
+    """Converte o valor do JSON em itemid (texto) ou None se ele não for numérico."""
+    try:
+        return str(int(valor))
+    except (ValueError, TypeError):
+        return None
+
+def _mais_recentes(linhas):
+    """{itemid: (valor, clock)} com a linha de clock mais recente de cada item."""
+    recentes = {}
+    for linha in linhas:
+        clock = int(linha["clock"])
+        if clock > recentes.get(linha["itemid"], (None, -1))[1]:
+            recentes[linha["itemid"]] = (linha["value"], clock)
+    return recentes
+
+def _ultimos_do_historico(zapi, ids_por_tipo):
     """
-    Obtém a última informação do item com base em seu itemid.
-    Retorna o valor encontrado.
+    Último valor de cada item no histórico: um history.get por value_type com
+    todos os itens daquele tipo, limitado às últimas HISTORY_WINDOW segundos,
+    ficando com o clock mais recente de cada item. Só é usado para itens sem
+    lastvalue (sem coleta nas últimas 24 h, como os diários), então a janela
+    traz poucas linhas por item. Retorna {itemid: (valor, clock)} dos itens
+    encontrados.
     """
-    try:
-        # Obtém o tipo de valor do item
-        item_details = zapi.item.get(itemids=itemid, output=["value_type"])
-        if not item_details:
+    time_till = int(time.time())
+    encontrados = {}
+    for value_type, ids in ids_por_tipo.items():
+        with cronometrar("zabbix_history", value_type):
+            historico = zapi.history.get(
+                itemids=ids,
+                history=value_type,
+                time_from=time_till - HISTORY_WINDOW,
+                time_till=time_till,
+                output=["itemid", "clock", "value"],
+                sortfield="clock",
+                sortorder="DESC"
+            )
+        encontrados.update(_mais_recentes(historico))
+    return encontrados
+
+def obter_valores_itens(zapi, itemids):
+    """
+    Obtém a última informação de vários itens de uma vez.
+    Um único item.get traz lastvalue e lastclock de todos os itens; os
+    metadados (value_type, chave, host...) só são pedidos junto quando algum
+    item ainda não está no cache local (cache_itens). Os itens sem lastvalue
+    recente vão ao histórico, um history.get por value_type.
+    Retorna {itemid: valor}, com a exceção no lugar do valor para os itens
+    que não puderam ser lidos.
+    """
+    itemids = sorted(set(itemids))
+    if not itemids:
+        return {}
+    conhecidos = cache_itens.obter(itemids)
+    saida = ["itemid", "lastvalue", "lastclock"]
+    if len(conhecidos) < len(itemids):
+        saida += ["value_type", "key_", "hostid", "name", "units"]
+
+    with cronometrar("zabbix_itens", len(itemids)):
+        itens = zapi.item.get(itemids=itemids, output=saida)
+    if "value_type" in saida:
+        cache_itens.gravar(itens)
+    por_id = {item["itemid"]: item for item in itens}
+
+    valores = {}
+    sem_valor = {}
+    nao_encontrados = []
+    for itemid in itemids:
+        item = por_id.get(itemid)
+        if item is None:
             logging.error(f"Item {itemid} não encontrado.")
-            raise Exception(f"Item {itemid} não encontrado.")
-        value_type = int(item_details[0]['value_type'])
-
-        # Obtém o histórico (última entrada)
-        history = zapi.history.get(
-            itemids=itemid,
-            history=value_type,
-            sortfield="clock",
-            sortorder="DESC",
-            limit=1
-        )
-        if not history:
-            logging.error(f"Nenhum dado histórico encontrado para o item {itemid}.")
-            raise Exception(f"Nenhum dado histórico encontrado para o item {itemid}.")
-        return history[0]['value']
+            valores[itemid] = Exception(f"Item {itemid} não encontrado.")
+            nao_encontrados.append(itemid)
+        elif int(item.get("lastclock") or 0) > 0:
+            valores[itemid] = item["lastvalue"]
+        else:
+            value_type = item.get("value_type", conhecidos.get(itemid, {}).get("value_type"))
+            sem_valor.setdefault(int(value_type), []).append(itemid)
+    cache_itens.invalidar(nao_encontrados)
 
-    except Exception as e:
-        logging.error(f"Erro ao obter o valor do item {itemid}: {str(e)}")
-        raise
+    encontrados = _ultimos_do_historico(zapi, sem_valor)
+    for ids in sem_valor.values():
+        for itemid in ids:
+            if itemid in encontrados:
+                valores[itemid] = encontrados[itemid][0]
+            else:
+                logging.error(f"Nenhum dado histórico encontrado para o item {itemid}.")
+                valores[itemid] = Exception(f"Nenhum dado histórico encontrado para o item {itemid}.")
+    return valores
+
+def precarregar_frota(infos):
+    """
+    Coleta de uma vez, com o cliente assíncrono (zabbix_async), os itens de
+    vários client_info/serv_info e guarda os valores por ZABBIX_PREFETCH_TTL
+    segundos; main() usa esses valores e só consulta o que faltar.
+    """
+    from src.apps import zabbix_async
+
+    itemids = {i for info in infos for i in map(_itemid, info.values()) if i}
+    if not itemids:
+        return
+    with cronometrar("zabbix_prefetch", len(itemids)):
+        valores = asyncio.run(zabbix_async.coletar_valores(itemids))
+    agora = time.monotonic()
+    with _precarregados_lock:
+        for itemid, valor in valores.items():
+            # Itens com erro ficam de fora e são consultados de novo pelo relatório
+            if not isinstance(valor, Exception):
+                _precarregados[itemid] = (valor, agora)
+    logging.info(f"{len(valores)} itens do Zabbix coletados antecipadamente para o lote.")
+
+def _valores_precarregados(itemids):
+    limite = time.monotonic() - ZABBIX_PREFETCH_TTL
+    with _precarregados_lock:
+        return {itemid: _precarregados[itemid][0] for itemid in itemids
+                if itemid in _precarregados and _precarregados[itemid][1] >= limite}
 
-def obter_consultas(zapi, info_dict):
+def obter_consultas(zapi, info_dict, valores=None):
     """
     Para cada chave do dicionário, tenta converter seu valor para inteiro.
-    Se conseguir, realiza a consulta na API do Zabbix; caso contrário,
-    utiliza o valor original.
+    Se conseguir, usa o último valor do item no Zabbix (de valores, ou
+    buscado agora em lote); caso contrário, utiliza o valor original.
     Retorna um dicionário com os resultados.
     """
+    if valores is None:
+        valores = obter_valores_itens(zapi, [i for i in map(_itemid, info_dict.values()) if i])
     consultas = {}
     for key, value in info_dict.items():
-        try:
-            # Tenta converter para inteiro
-            item_id = int(value)
-            try:
-                valor = obter_valor_item(zapi, str(item_id))
-                consultas[key] = valor
-                logging.info(f"Consulta obtida para '{key}' (ID: {item_id}).")
-            except Exception as e:
-                logging.error(f"Erro ao obter consulta para '{key}' (ID: {item_id}): {str(e)}")
-                consultas[key] = f"Erro: {str(e)}"
-        except (ValueError, TypeError):
+        item_id = _itemid(value)
+        if item_id is None:
             # Se não for conversível para inteiro, utiliza o valor original
             consultas[key] = value
             logging.info(f"Campo '{key}' não é numérico, valor mantido: {value}")
+            continue
+        valor = valores.get(item_id, Exception(f"Item {item_id} não consultado."))
+        if isinstance(valor, Exception):
+            logging.error(f"Erro ao obter consulta para '{key}' (ID: {item_id}): {str(valor)}")
+            consultas[key] = f"Erro: {str(valor)}"
+        else:
+            consultas[key] = valor
+            logging.info(f"Consulta obtida para '{key}' (ID: {item_id}).")
     return consultas
 
-def salvar_consulta_em_arquivo(chave, valor):
+# -- Estatísticas de CPU e memória ---------------------------------------------
+
+def _bin_logaritmico(valor):
+    """Índice do bin de largura relativa P95_PRECISAO; valores <= 0 vão para o bin do zero."""
+    indices = np.full(valor.shape, _BIN_ZERO, dtype=np.int64)
+    positivos = valor > 0
+    indices[positivos] = np.floor(np.log(valor[positivos]) / np.log1p(P95_PRECISAO)).astype(np.int64)
+    return indices
+
+def _valor_do_bin(indice):
+    return 0.0 if indice == _BIN_ZERO else float((1 + P95_PRECISAO) ** (indice + 0.5))
+
+@dataclass
+class EstatisticasItem:
+    """
+    Resumo de um item no período dos gráficos (valores na unidade do item).
+    fonte indica de onde vieram os valores: "tendencias" (médias horárias) ou
+    "historico" (amostras brutas, para itens sem tendência).
+    """
+    media: float
+    p95: float
+    maximo: float
+    limite: float
+    segundos_acima: float
+    segundos_total: float
+    unidade: str = "%"
+    fonte: str = "tendencias"
+
+    @property
+    def percentual_acima(self):
+        return 100 * self.segundos_acima / self.segundos_total if self.segundos_total else 0.0
+
+    @property
+    def tempo_acima(self):
+        horas, resto = divmod(int(round(self.segundos_acima)), 3600)
+        return f"{horas} h {resto // 60:02d} min"
+
+class _AcumuladorEstatisticas:
+    """
+    Média, máximo, tempo acima do limite e um histograma logarítmico (para o
+    p95), atualizados página a página: a série inteira nunca fica em memória.
+    Cada valor pesa o tempo (segundos) que ele representa.
+    """
+    def __init__(self, limite):
+        self.limite = limite
+        self.soma = 0.0
+        self.segundos = 0.0
+        self.maximo = -np.inf
+        self.segundos_acima = 0.0
+        self.histograma = {}
+
+    def adicionar(self, valor, maximo, duracao):
+        self.soma += float(np.dot(valor, duracao))
+        self.segundos += float(duracao.sum())
+        self.maximo = max(self.maximo, float(maximo.max()))
+        self.segundos_acima += float(duracao[valor > self.limite].sum())
+        bins, inverso = np.unique(_bin_logaritmico(valor), return_inverse=True)
+        for indice, segundos in zip(bins.tolist(), np.bincount(inverso, weights=duracao).tolist()):
+            self.histograma[indice] = self.histograma.get(indice, 0.0) + segundos
+
+    def percentil(self, q):
+        indices = sorted(self.histograma)
+        acumulado = np.cumsum([self.histograma[indice] for indice in indices])
+        posicao = int(np.searchsorted(acumulado, q / 100 * acumulado[-1]))
+        return _valor_do_bin(indices[min(posicao, len(indices) - 1)])
+
+    def resultado(self, unidade, fonte="tendencias"):
+        if not self.segundos:
+            return None
+        return EstatisticasItem(self.soma / self.segundos, self.percentil(95), self.maximo, self.limite,
+                                self.segundos_acima, self.segundos, unidade, fonte)
+
+def _paginas_de_tendencias(zapi, itemid, time_from, time_till):
+    """
+    (média, máximo) das tendências (uma linha por hora), uma página de
+    ZABBIX_TREND_PAGE segundos por vez: do armazenamento local (serie_local),
+    sincronizado antes, ou direto do Zabbix se ele não estiver disponível.
+    """
+    if serie_local.sincronizar(zapi, [itemid], time_from, time_till):
+        for _, _, media, maximo, _ in serie_local.paginas_tendencias(itemid, time_from, time_till):
+            yield media, maximo
+        return
+    for inicio, fim in serie_local.paginas(time_from, time_till, serie_local.TREND_PAGE):
+        with cronometrar("zabbix_trend_pagina", itemid):
+            linhas = zapi.trend.get(itemids=itemid, time_from=inicio, time_till=fim - 1,
+                                    output=["clock", "value_avg", "value_max"])
+        if linhas:
+            yield (np.array([linha["value_avg"] for linha in linhas]).astype(np.float64),
+                   np.array([linha["value_max"] for linha in linhas]).astype(np.float64))
+
+def _paginas_de_historico(zapi, itemid, value_type, time_from, time_till):
+    """(clock, valor) do histórico bruto, uma página de ZABBIX_HISTORY_PAGE segundos por vez."""
+    if serie_local.sincronizar(zapi, [itemid], time_from, time_till, value_type):
+        yield from serie_local.paginas_historico(itemid, time_from, time_till)
+        return
+    for inicio, fim in serie_local.paginas(time_from, time_till, serie_local.HISTORY_PAGE):
+        with cronometrar("zabbix_history_pagina", itemid):
+            linhas = zapi.history.get(itemids=itemid, history=value_type, time_from=inicio, time_till=fim - 1,
+                                      sortfield="clock", sortorder="ASC", output=["clock", "value"])
+        if linhas:
+            yield (np.array([linha["clock"] for linha in linhas]).astype(np.int64),
+                   np.array([linha["value"] for linha in linhas]).astype(np.float64))
+
+def _acumular_tendencias(zapi, itemid, acumulador, time_from, time_till):
+    for media, maximo in _paginas_de_tendencias(zapi, itemid, time_from, time_till):
+        acumulador.adicionar(media, maximo, np.full(len(media), 3600.0))
+
+def _acumular_historico(zapi, itemid, value_type, acumulador, time_from, time_till):
+    """
+    Histórico bruto (itens sem tendência). Cada valor vale até o próximo,
+    limitado a 3 intervalos típicos para que falhas de coleta não contem
+    como tempo medido.
+    """
+    pendente = None
+    intervalo = 60.0
+    for clock, valor in _paginas_de_historico(zapi, itemid, value_type, time_from, time_till):
+        if pendente is not None:
+            # O último valor da página anterior só tem duração conhecida agora
+            clock = np.concatenate(([pendente[0]], clock))
+            valor = np.concatenate(([pendente[1]], valor))
+        if len(clock) > 1:
+            duracao = np.diff(clock).astype(np.float64)
+            intervalo = float(np.median(duracao)) or intervalo
+            duracao = np.minimum(duracao, 3 * intervalo)
+            acumulador.adicionar(valor[:-1], valor[:-1], duracao)
+        pendente = (clock[-1], valor[-1])
+    if pendente is not None:
+        acumulador.adicionar(np.array([pendente[1]]), np.array([pendente[1]]), np.array([intervalo]))
+
+def estatisticas_do_item(zapi, itemid, limite, time_from, time_till):
+    """EstatisticasItem do item entre time_from e time_till (None se não houver dados)."""
+    meta = cache_itens.obter([itemid]).get(itemid)
+    if meta is None:
+        itens = zapi.item.get(itemids=itemid, output=["itemid", "value_type", "key_", "hostid", "name", "units"])
+        if not itens:
+            raise ValueError(f"Item {itemid} não encontrado.")
+        cache_itens.gravar(itens)
+        meta = dict(itens[0], value_type=int(itens[0]["value_type"]))
+
+    acumulador = _AcumuladorEstatisticas(limite)
+    _acumular_tendencias(zapi, itemid, acumulador, time_from, time_till)
+    if acumulador.segundos:
+        return acumulador.resultado(meta.get("units") or "%", "tendencias")
+    if meta["value_type"] in (0, 3):
+        _acumular_historico(zapi, itemid, meta["value_type"], acumulador, time_from, time_till)
+    return acumulador.resultado(meta.get("units") or "%", "historico")
+
+def estatisticas_desempenho(workspace=None):
+    """
+    Média, p95, máximo e tempo acima do limite (PGR_LIMITE_CPU /
+    PGR_LIMITE_MEMORIA) dos itens de CPU e memória dos gráficos, no período
+    GRAPH_PERIOD. Retorna {"cpu": EstatisticasItem, "memoria": ...}; itens
+    sem dados ou com erro ficam de fora (o relatório sai só com o gráfico).
+    """
+    from src.apps import graficos
+
+    workspace = workspace or workspace_padrao()
+    try:
+        urls = carregar_json(workspace.urlzbx_file)
+        zapi = obter_zapi()
+    except Exception as e:
+        logging.error(f"Erro ao preparar as estatísticas de desempenho: {e}")
+        return {}
+    time_till = int(time.time())
+    time_from = time_till - graficos.segundos_do_periodo()
+
+    estatisticas = {}
+    for nome, chave, _ in graficos.GRAFICOS:
+        limite = LIMITE_CPU if nome == "cpu" else LIMITE_MEMORIA
+        try:
+            itemid = graficos.itemid_da_url(zapi, urls[chave])
+            with cronometrar("estatisticas", nome):
+                resultado = estatisticas_do_item(zapi, itemid, limite, time_from, time_till)
+        except Exception as e:
+            logging.error(f"Erro ao calcular as estatísticas de {nome}: {e}")
+            continue
+        if resultado is None:
+            logging.error(f"Sem dados no Zabbix para as estatísticas de {nome} (item {itemid}).")
+        else:
+            estatisticas[nome] = resultado
+    return estatisticas
+
+def salvar_consulta_em_arquivo(chave, valor, output_dir):
     """
     Salva o valor da consulta em um arquivo separado, cujo nome é definido
     pela chave do JSON.
     Tenta formatar o conteúdo como JSON, caso contrário salva como texto puro.
     """
     try:
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
         filename = f"{chave}_consulta.txt"
-        output_file = os.path.join(OUTPUT_DIR, filename)
+        output_file = os.path.join(output_dir, filename)
 
         try:
             formatted_value = json.dumps(valor, indent=4, ensure_ascii=False)
@@ -122,13 +445,13 @@ def salvar_consulta_em_arquivo(chave, valor):
         logging.error(f"Erro ao salvar consulta '{chave}': {str(e)}")
         raise
 
-def salvar_consultas_serv_em_unico_arquivo(resultado):
+def salvar_consultas_serv_em_unico_arquivo(resultado, output_dir):
     """
     Salva todas as consultas do serv_info.json em um único arquivo Info_serv_prod.txt.
     """
     try:
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        output_file = os.path.join(OUTPUT_DIR, "Info_serv_prod.txt")
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, "Info_serv_prod.txt")
 
         with open(output_file, 'w', encoding='utf-8') as file:
             for chave, valor in resultado.items():
@@ -144,32 +467,73 @@ def salvar_consultas_serv_em_unico_arquivo(resultado):
         logging.error(f"Erro ao salvar consultas de serv_info: {str(e)}")
         raise
 
-def main():
-    """Função principal para executar o script."""
+def salvar_snapshot(resultado, output_dir):
+    """Grava o ResultadoZabbix em disco no formato antigo (um arquivo por consulta)."""
+    for chave, valor in resultado.cliente.items():
+        salvar_consulta_em_arquivo(chave, valor, output_dir)
+    salvar_consultas_serv_em_unico_arquivo(resultado.servidor, output_dir)
+
+def _ler_valor(texto):
     try:
-        # Carrega informações do cliente e do servidor
-        client_info = carregar_json(CLIENT_INFO_FILE)
-        serv_info = carregar_json(SERV_INFO_FILE)
+        return json.loads(texto)
+    except ValueError:
+        return texto.strip()
 
-        # Autenticação na API do Zabbix
-        zapi = ZabbixAPI(validar_url_zabbix())
-        zapi.login(ZABBIX_USER, ZABBIX_PASSWORD)
-        logging.info("Autenticação API realizada com sucesso.")
+def ler_snapshot(output_dir):
+    """Reconstrói o ResultadoZabbix a partir dos arquivos gravados por salvar_snapshot."""
+    resultado = ResultadoZabbix()
+    for caminho in sorted(glob.glob(os.path.join(output_dir, "*_consulta.txt"))):
+        chave = os.path.basename(caminho)[:-len("_consulta.txt")]
+        with open(caminho, 'r', encoding='utf-8') as file:
+            resultado.cliente[chave] = _ler_valor(file.read())
+    caminho_serv = os.path.join(output_dir, "Info_serv_prod.txt")
+    if os.path.exists(caminho_serv):
+        with open(caminho_serv, 'r', encoding='utf-8') as file:
+            for linha in file:
+                if ':' in linha:
+                    chave, valor = linha.split(':', 1)
+                    resultado.servidor[chave.strip()] = _ler_valor(valor)
+    return resultado
+
+def main(workspace=None, snapshot=None):
+    """
+    Função principal para executar o script.
+    Retorna o ResultadoZabbix com as consultas do cliente e do servidor; em
+    caso de erro a exceção é registrada e propagada, para que a etapa
+    "zabbix" do pipeline falhe em vez de o relatório sair com as tabelas
+    vazias. Os arquivos em disco só são gravados com snapshot=True ou
+    PGR_SNAPSHOT_ZABBIX=1.
+    """
+    workspace = workspace or workspace_padrao()
+    try:
+        # Carrega informações do cliente e do servidor
+        client_info = carregar_json(workspace.client_info_file)
+        serv_info = carregar_json(workspace.serv_info_file)
 
-        # Obtém as consultas para os itens definidos nos JSONs
-        resultado_client = obter_consultas(zapi, client_info)
-        resultado_serv = obter_consultas(zapi, serv_info)
+        # Todos os itens do cliente e do servidor são resolvidos juntos, em lote;
+        # os já coletados para o lote inteiro (precarregar_frota) não são consultados de novo
+        itemids = [i for i in map(_itemid, [*client_info.values(), *serv_info.values()]) if i]
+        valores = _valores_precarregados(itemids)
+        zapi = None
+        faltantes = [itemid for itemid in itemids if itemid not in valores]
+        if faltantes:
+            # Autenticação na API do Zabbix (sessão reaproveitada entre relatórios)
+            zapi = obter_zapi()
+            valores.update(obter_valores_itens(zapi, faltantes))
+        resultado = ResultadoZabbix(obter_consultas(zapi, client_info, valores),
+                                    obter_consultas(zapi, serv_info, valores))
 
-        # Salva cada consulta do client_info em arquivos separados
-        for chave, valor in resultado_client.items():
-            salvar_consulta_em_arquivo(chave, valor)
+        # O formatter recebe o resultado em memória; o disco fica só para depuração
+        if SNAPSHOT_ZABBIX if snapshot is None else snapshot:
+            salvar_snapshot(resultado, workspace.output_dir)
 
-        # Salva todas as consultas do serv_info em um único arquivo
-        salvar_consultas_serv_em_unico_arquivo(resultado_serv)
+        return resultado
 
     except Exception as e:
         logging.error(f"Erro no processo: {str(e)}")
         print(f"Erro: {str(e)}")
+        raise
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    # Rodando isoladamente, grava os arquivos lidos por "python -m src.apps.formatter_sqlserver"
+    main(snapshot=True)
\ No newline at end of file
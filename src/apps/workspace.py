@@ -0,0 +1,84 @@
+# src/apps/workspace.py
+"""
+Área de trabalho isolada de uma execução de relatório.
+
+Todas as etapas leem e escrevem seus arquivos intermediários (client_info,
+serv_info, ulrzbx, consultas do Zabbix, gráficos, PDFs temporários) dentro
+da área de trabalho recebida, de modo que vários relatórios possam ser
+gerados ao mesmo tempo sem sobrescrever os arquivos uns dos outros.
+"""
+import os
+import shutil
+import logging
+import tempfile
+from dataclasses import dataclass
+
+# Raiz do projeto PGR (duas pastas acima de src/apps)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+RUNS_DIR = os.path.join(BASE_DIR, "output", "runs")
+
+# Arquivos de cada gráfico, em ordem de preferência: renderizado localmente
+# (graficos.py) e capturado do Zabbix (app_graphics.py)
+ARQUIVOS_GRAFICOS = {
+    "cpu": ("CPU___utilizacao_plotly.png", "full_page_cpu.png"),
+    "memoria": ("Uso_de_memoria_plotly.png", "full_page_memoria.png"),
+}
+
+@dataclass
+class Workspace:
+    raiz: str
+
+    @property
+    def client_info_file(self):
+        return os.path.join(self.raiz, "client_info.json")
+
+    @property
+    def serv_info_file(self):
+        return os.path.join(self.raiz, "serv_info.json")
+
+    @property
+    def urlzbx_file(self):
+        return os.path.join(self.raiz, "ulrzbx.json")
+
+    @property
+    def output_dir(self):
+        return os.path.join(self.raiz, "output")
+
+    @property
+    def graphics_dir(self):
+        return os.path.join(self.output_dir, "graphics")
+
+    @property
+    def pdf_temp_dir(self):
+        return os.path.join(self.output_dir, "pdf temp")
+
+    @property
+    def pgr_final_pdf(self):
+        return os.path.join(self.pdf_temp_dir, "pgr_final.pdf")
+
+    @property
+    def relatorio_pdf(self):
+        return os.path.join(self.output_dir, "relatorio.pdf")
+
+    def grafico(self, nome):
+        """Caminho absoluto do gráfico "cpu" ou "memoria" que existir (o renderizado tem preferência)."""
+        caminhos = [os.path.abspath(os.path.join(self.graphics_dir, arquivo)) for arquivo in ARQUIVOS_GRAFICOS[nome]]
+        return next((caminho for caminho in caminhos if os.path.exists(caminho)), caminhos[0])
+
+def workspace_padrao():
+    """Layout antigo (arquivos na raiz do projeto), usado ao rodar um script isoladamente."""
+    return Workspace(BASE_DIR)
+
+def criar_workspace(prefixo="run_"):
+    """Cria uma área de trabalho nova e exclusiva em output/runs."""
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    raiz = tempfile.mkdtemp(prefix=prefixo, dir=RUNS_DIR)
+    logging.info(f"Área de trabalho criada em {raiz}")
+    return Workspace(raiz)
+
+def remover_workspace(workspace):
+    """Apaga a área de trabalho e todos os arquivos temporários da execução."""
+    if os.path.abspath(workspace.raiz) == BASE_DIR:
+        raise ValueError("A área de trabalho padrão (raiz do projeto) não pode ser removida.")
+    shutil.rmtree(workspace.raiz, ignore_errors=True)
+    logging.info(f"Área de trabalho {workspace.raiz} apagada.")
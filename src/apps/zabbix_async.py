@@ -0,0 +1,310 @@
+# src/apps/zabbix_async.py
+"""
+Cliente assíncrono da API JSON-RPC do Zabbix, para coletas de muitos
+clientes de uma vez.
+
+Usa uma única aiohttp.ClientSession (conexões keep-alive reaproveitadas),
+limita as requisições simultâneas a ZABBIX_CONCORRENCIA e agrupa chamadas
+em requisições JSON-RPC em lote. O token de autenticação fica gravado em
+PGR_CACHE_DIR/zabbix_token.json e é reaproveitado entre execuções até o
+Zabbix recusá-lo; com ZABBIX_API_TOKEN o login nem é feito.
+
+coletar_valores() segue a mesma estratégia de ultima_consulta.obter_valores_itens
+(item.get com lastvalue, metadados só para os itens fora do cache, um
+history.get por value_type para os itens sem lastvalue), mas para os itens
+de todos os clientes ao mesmo tempo.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from itertools import count
+
+import aiohttp
+from dotenv import load_dotenv
+
+from src.apps import cache_itens
+from src.apps.metricas import cronometrar
+
+load_dotenv()
+
+ZABBIX_URL = os.getenv("URL_ZBX")
+ZABBIX_USER = os.getenv("USER_ZBX")
+ZABBIX_PASSWORD = os.getenv("PASS_ZBX")
+ZABBIX_API_TOKEN = os.getenv("ZABBIX_API_TOKEN")
+
+# Requisições HTTP simultâneas ao Zabbix
+CONCORRENCIA = int(os.getenv("ZABBIX_CONCORRENCIA", "8"))
+# Chamadas por requisição JSON-RPC em lote e itens por chamada
+TAMANHO_LOTE = int(os.getenv("ZABBIX_TAMANHO_LOTE", "20"))
+ITENS_POR_CHAMADA = int(os.getenv("ZABBIX_ITENS_POR_CHAMADA", "200"))
+TIMEOUT = float(os.getenv("ZABBIX_TIMEOUT", "60"))
+HISTORY_WINDOW = int(os.getenv("ZABBIX_HISTORY_WINDOW", str(7 * 86400)))
+TOKEN_FILE = os.path.join(cache_itens.CACHE_DIR, "zabbix_token.json")
+
+# Métodos que não aceitam autenticação
+SEM_AUTH = {"apiinfo.version", "user.login"}
+
+class ErroZabbix(Exception):
+    """Erro devolvido pela API do Zabbix para uma chamada."""
+    def __init__(self, erro):
+        super().__init__(f"{erro.get('message', '')} {erro.get('data', '')}".strip())
+        self.erro = erro
+
+    @property
+    def sessao_invalida(self):
+        texto = str(self).lower()
+        return "session terminated" in texto or "not authorised" in texto or "not authorized" in texto
+
+def _endpoint(url):
+    url = (url or "").rstrip("/")
+    return url if url.endswith("api_jsonrpc.php") else f"{url}/api_jsonrpc.php"
+
+def _pedacos(lista, tamanho):
+    return [lista[i:i + tamanho] for i in range(0, len(lista), tamanho)]
+
+def _sem_cancelamento(resultados):
+    """Resultados de um gather(return_exceptions=True); cancelamentos continuam sendo propagados."""
+    for resultado in resultados:
+        if isinstance(resultado, BaseException) and not isinstance(resultado, Exception):
+            raise resultado
+    return resultados
+
+def _mais_recentes(linhas):
+    """{itemid: (valor, clock)} com a linha de clock mais recente de cada item."""
+    recentes = {}
+    for linha in linhas:
+        clock = int(linha["clock"])
+        if clock > recentes.get(linha["itemid"], (None, -1))[1]:
+            recentes[linha["itemid"]] = (linha["value"], clock)
+    return recentes
+
+class ClienteZabbixAsync:
+    def __init__(self, url=ZABBIX_URL, usuario=ZABBIX_USER, senha=ZABBIX_PASSWORD,
+                 api_token=ZABBIX_API_TOKEN, concorrencia=CONCORRENCIA):
+        self.endpoint = _endpoint(url)
+        self.usuario = usuario
+        self.senha = senha
+        self.api_token = api_token
+        self.concorrencia = max(1, concorrencia)
+        self._sessao = None
+        self._semaforo = None
+        self._login_lock = None
+        self._ids = count(1)
+        self._token = api_token
+        self._auth_no_corpo = True
+
+    async def __aenter__(self):
+        conector = aiohttp.TCPConnector(limit=self.concorrencia, keepalive_timeout=60)
+        self._sessao = aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=TIMEOUT))
+        self._semaforo = asyncio.Semaphore(self.concorrencia)
+        self._login_lock = asyncio.Lock()
+        try:
+            versao = await self._enviar({"jsonrpc": "2.0", "method": "apiinfo.version", "params": {}, "id": 0})
+            # A partir do 6.4 a autenticação vai no cabeçalho Authorization (o campo "auth" foi removido no 7.2)
+            principal, secundaria = (int(parte) for parte in versao["result"].split(".")[:2])
+        except BaseException:
+            # O __aexit__ não é chamado se a entrada falhar: a sessão é fechada aqui
+            await self._sessao.close()
+            raise
+        self._auth_no_corpo = (principal, secundaria) < (6, 4)
+        if not self._token:
+            self._token = self._carregar_token()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._sessao.close()
+
+    # -- token ---------------------------------------------------------------
+    def _carregar_token(self):
+        try:
+            with open(TOKEN_FILE, 'r') as f:
+                dados = json.load(f)
+            if dados.get("endpoint") == self.endpoint and dados.get("usuario") == self.usuario:
+                return dados.get("token")
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _salvar_token(self):
+        try:
+            os.makedirs(os.path.dirname(TOKEN_FILE), exist_ok=True)
+            descritor = os.open(TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descritor, 'w') as f:
+                json.dump({"endpoint": self.endpoint, "usuario": self.usuario, "token": self._token}, f)
+        except OSError as e:
+            logging.error(f"Não foi possível gravar o token do Zabbix: {e}")
+
+    async def _login(self, token_recusado):
+        async with self._login_lock:
+            # Outra tarefa pode ter renovado o token enquanto esperávamos
+            if self._token and self._token != token_recusado:
+                return
+            if self.api_token:
+                raise PermissionError("O ZABBIX_API_TOKEN foi recusado pelo Zabbix.")
+            with cronometrar("zabbix_login_async"):
+                resposta = await self._enviar(self._requisicao(
+                    "user.login", {"username": self.usuario, "password": self.senha}))
+                if "error" in resposta and "username" in str(resposta["error"].get("data", "")):
+                    # Zabbix anterior ao 5.4 usa o parâmetro "user"
+                    resposta = await self._enviar(self._requisicao(
+                        "user.login", {"user": self.usuario, "password": self.senha}))
+            if "error" in resposta:
+                raise ErroZabbix(resposta["error"])
+            self._token = resposta["result"]
+            self._salvar_token()
+            logging.info("Login assíncrono na API do Zabbix realizado com sucesso.")
+
+    # -- requisições ---------------------------------------------------------
+    def _requisicao(self, metodo, params):
+        requisicao = {"jsonrpc": "2.0", "method": metodo, "params": params, "id": next(self._ids)}
+        if metodo not in SEM_AUTH and self._token and self._auth_no_corpo:
+            requisicao["auth"] = self._token
+        return requisicao
+
+    async def _enviar(self, corpo):
+        cabecalhos = {"Content-Type": "application/json-rpc"}
+        if self._token and not self._auth_no_corpo:
+            corpo_lista = corpo if isinstance(corpo, list) else [corpo]
+            if any(r["method"] not in SEM_AUTH for r in corpo_lista):
+                cabecalhos["Authorization"] = f"Bearer {self._token}"
+        async with self._semaforo:
+            async with self._sessao.post(self.endpoint, json=corpo, headers=cabecalhos) as resposta:
+                resposta.raise_for_status()
+                return await resposta.json(content_type=None)
+
+    async def lote(self, chamadas):
+        """
+        Envia [(método, params), ...] em uma requisição JSON-RPC em lote e
+        retorna os resultados na mesma ordem (ErroZabbix no lugar dos que
+        falharam). Refaz o login uma vez se a sessão tiver expirado.
+        """
+        if not chamadas:
+            return []
+        for tentativa in range(2):
+            if self._token is None:
+                await self._login(None)
+            token = self._token
+            requisicoes = [self._requisicao(metodo, params) for metodo, params in chamadas]
+            respostas = await self._enviar(requisicoes)
+            falhas = {}
+            if isinstance(respostas, dict):
+                # Erro no lote inteiro (ex.: servidor sem suporte a lote): envia uma a uma;
+                # a falha HTTP de uma delas fica só no resultado dela
+                individuais = _sem_cancelamento(await asyncio.gather(
+                    *(self._enviar(r) for r in requisicoes), return_exceptions=True))
+                falhas = {r["id"]: resposta for r, resposta in zip(requisicoes, individuais)
+                          if isinstance(resposta, Exception)}
+                respostas = [resposta for resposta in individuais if not isinstance(resposta, Exception)]
+            por_id = {resposta.get("id"): resposta for resposta in respostas}
+            resultados = []
+            for requisicao in requisicoes:
+                if requisicao["id"] in falhas:
+                    resultados.append(falhas[requisicao["id"]])
+                    continue
+                resposta = por_id.get(requisicao["id"], {"error": {"message": "Sem resposta no lote."}})
+                resultados.append(ErroZabbix(resposta["error"]) if "error" in resposta else resposta["result"])
+            if tentativa == 0 and any(isinstance(r, ErroZabbix) and r.sessao_invalida for r in resultados):
+                logging.info("Token do Zabbix expirado; refazendo o login.")
+                await self._login(token)
+                continue
+            return resultados
+        return resultados
+
+    async def chamar(self, metodo, params):
+        resultado = (await self.lote([(metodo, params)]))[0]
+        if isinstance(resultado, ErroZabbix):
+            raise resultado
+        return resultado
+
+    async def chamar_em_lotes(self, chamadas):
+        """
+        Divide as chamadas em lotes de TAMANHO_LOTE, enviados em paralelo. Se
+        um lote inteiro falhar (erro HTTP, timeout), a exceção fica no lugar
+        do resultado de cada chamada dele; os outros lotes não são perdidos.
+        """
+        lotes = _pedacos(chamadas, TAMANHO_LOTE)
+        partes = _sem_cancelamento(await asyncio.gather(*(self.lote(parte) for parte in lotes),
+                                                        return_exceptions=True))
+        resultados = []
+        for parte, resultado in zip(lotes, partes):
+            if isinstance(resultado, Exception):
+                logging.error(f"Erro no lote de {len(parte)} chamadas ao Zabbix: {resultado}")
+                resultados += [resultado] * len(parte)
+            else:
+                resultados += resultado
+        return resultados
+
+async def coletar_valores(itemids, cliente=None):
+    """
+    Último valor de muitos itens (de vários clientes) com chamadas em lote e
+    paralelas. Retorna {itemid: valor}, com a exceção no lugar do valor para
+    os itens que não puderam ser lidos.
+    """
+    itemids = sorted({str(itemid) for itemid in itemids})
+    if not itemids:
+        return {}
+    if cliente is None:
+        async with ClienteZabbixAsync() as cliente:
+            return await coletar_valores(itemids, cliente)
+
+    valores = {}
+    time_till = int(time.time())
+
+    # 1) item.get com lastvalue de todos os itens, em lotes paralelos; os metadados
+    #    só são pedidos (e gravados no cache) para os itens que o cache não tem
+    conhecidos = cache_itens.obter(itemids)
+    novos = [itemid for itemid in itemids if itemid not in conhecidos]
+    chamadas = [("item.get", {"itemids": parte, "output": ["itemid", "lastvalue", "lastclock"]})
+                for parte in _pedacos(sorted(conhecidos), ITENS_POR_CHAMADA)]
+    chamadas += [("item.get", {"itemids": parte, "output": ["itemid", "value_type", "key_", "hostid", "name",
+                                                           "units", "lastvalue", "lastclock"]})
+                 for parte in _pedacos(novos, ITENS_POR_CHAMADA)]
+    with cronometrar("zabbix_async_itens", len(itemids)):
+        resultados = await cliente.chamar_em_lotes(chamadas)
+    itens = {}
+    nao_encontrados = []
+    falhas = {}
+    for (_, params), resultado in zip(chamadas, resultados):
+        if isinstance(resultado, Exception):
+            # Falha da chamada (transitória ou não): o cache desses itens é mantido
+            logging.error(f"Erro ao consultar itens no Zabbix: {resultado}")
+            falhas.update(dict.fromkeys(params["itemids"], resultado))
+            continue
+        for item in resultado:
+            itens[item["itemid"]] = item
+        nao_encontrados += [itemid for itemid in params["itemids"] if itemid not in itens]
+    cache_itens.gravar([itens[itemid] for itemid in novos if itemid in itens])
+    cache_itens.invalidar(nao_encontrados)
+
+    # 2) Itens sem lastvalue: um history.get por value_type com todos os itens
+    #    daquele tipo, ficando com o clock mais recente de cada um
+    sem_valor = {}
+    for itemid, item in itens.items():
+        if int(item.get("lastclock") or 0) > 0:
+            valores[itemid] = item["lastvalue"]
+        else:
+            value_type = item.get("value_type", conhecidos.get(itemid, {}).get("value_type"))
+            sem_valor.setdefault(int(value_type), []).append(itemid)
+    chamadas = [("history.get", {
+        "itemids": parte, "history": value_type, "sortfield": "clock", "sortorder": "DESC",
+        "time_from": time_till - HISTORY_WINDOW, "time_till": time_till, "output": ["itemid", "clock", "value"],
+    }) for value_type, ids in sorted(sem_valor.items()) for parte in _pedacos(ids, ITENS_POR_CHAMADA)]
+    with cronometrar("zabbix_async_history", sum(map(len, sem_valor.values()))):
+        resultados = await cliente.chamar_em_lotes(chamadas)
+    for (_, params), resultado in zip(chamadas, resultados):
+        if isinstance(resultado, Exception):
+            logging.error(f"Erro ao consultar o histórico no Zabbix: {resultado}")
+            falhas.update(dict.fromkeys(params["itemids"], resultado))
+            continue
+        for itemid, (valor, _) in _mais_recentes(resultado).items():
+            valores[itemid] = valor
+
+    for itemid in itemids:
+        if itemid in falhas:
+            valores.setdefault(itemid, falhas[itemid])
+        elif itemid not in valores:
+            motivo = "não encontrado" if itemid not in itens else "sem dados"
+            valores[itemid] = Exception(f"Item {itemid} {motivo}.")
+    return valores
@@ -0,0 +1,48 @@
+-- Tempos das etapas de geração do relatório (PostgreSQL de metadados do PGR)
+
+-- Identificador de cada execução registrada na auditoria
+ALTER TABLE tb_autentificacao ADD COLUMN IF NOT EXISTS idexecucao BIGSERIAL;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_autentificacao_idexecucao ON tb_autentificacao (idexecucao);
+
+-- Uma linha por etapa medida (etapa = tipo, detalhe = item/consulta/gráfico específico)
+CREATE TABLE IF NOT EXISTS tb_tempo_etapa (
+  idexecucao BIGINT NOT NULL REFERENCES tb_autentificacao (idexecucao) ON DELETE CASCADE,
+  cliente    TEXT,
+  etapa      TEXT NOT NULL,
+  detalhe    TEXT,
+  inicio     TIMESTAMP NOT NULL,
+  duracao_ms DOUBLE PRECISION NOT NULL,
+  sucesso    BOOLEAN NOT NULL DEFAULT TRUE
+);
+CREATE INDEX IF NOT EXISTS ix_tempo_etapa_etapa_inicio ON tb_tempo_etapa (etapa, inicio);
+CREATE INDEX IF NOT EXISTS ix_tempo_etapa_cliente_inicio ON tb_tempo_etapa (cliente, inicio);
+
+-- p50/p95 por etapa e mês
+CREATE OR REPLACE VIEW vw_tempo_etapa_percentis AS
+SELECT
+  date_trunc('month', inicio) AS mes,
+  etapa,
+  count(*) AS medicoes,
+  percentile_cont(0.5) WITHIN GROUP (ORDER BY duracao_ms) AS p50_ms,
+  percentile_cont(0.95) WITHIN GROUP (ORDER BY duracao_ms) AS p95_ms,
+  max(duracao_ms) AS max_ms
+FROM tb_tempo_etapa
+GROUP BY 1, 2;
+
+-- p50/p95 por cliente, etapa e mês
+CREATE OR REPLACE VIEW vw_tempo_etapa_cliente_percentis AS
+SELECT
+  date_trunc('month', inicio) AS mes,
+  cliente,
+  etapa,
+  count(*) AS medicoes,
+  percentile_cont(0.5) WITHIN GROUP (ORDER BY duracao_ms) AS p50_ms,
+  percentile_cont(0.95) WITHIN GROUP (ORDER BY duracao_ms) AS p95_ms,
+  max(duracao_ms) AS max_ms
+FROM tb_tempo_etapa
+GROUP BY 1, 2, 3;
+
+-- Exemplo: etapas mais lentas do mês corrente
+-- SELECT * FROM vw_tempo_etapa_percentis
+-- WHERE mes = date_trunc('month', now())
+-- ORDER BY p95_ms DESC;
@@ -0,0 +1,139 @@
+import shutil
+import subprocess
+
+import pytest
+
+pytest.importorskip("paramiko")
+pytest.importorskip("dotenv")
+
+from src.apps import coleta_ssh
+from src.apps.coleta_ssh import Alvo
+
+class _Transporte:
+    def __init__(self, ssh):
+        self.ssh = ssh
+
+    def is_active(self):
+        return not self.ssh.fechada
+
+class SSHFalso:
+    """Cliente SSH sem rede (executar_comandos é substituído nos testes)."""
+    def __init__(self):
+        self.fechada = False
+
+    def get_transport(self):
+        return _Transporte(self)
+
+    def close(self):
+        self.fechada = True
+
+@pytest.fixture
+def conexoes_falsas(monkeypatch):
+    abertas = []
+
+    def conectar(alvo):
+        ssh = SSHFalso()
+        abertas.append(ssh)
+        return ssh
+
+    monkeypatch.setattr(coleta_ssh, "_conectar", conectar)
+    monkeypatch.setattr(coleta_ssh, "executar_comandos",
+                        lambda ssh, comandos: [coleta_ssh.ResultadoComando(c, "ok", "", 0) for c in comandos])
+    monkeypatch.setattr(coleta_ssh, "_conexoes", {})
+    monkeypatch.setattr(coleta_ssh, "_precarregados", {})
+    return abertas
+
+def test_frota_fecha_as_conexoes_que_abriu(conexoes_falsas):
+    alvos = [Alvo(f"10.0.0.{i}", 22, "pgr", "x") for i in range(5)]
+    resultados = coleta_ssh.coletar_frota(alvos, ("uptime",), max_workers=3)
+    assert all(resultado.sucesso for resultado in resultados)
+    assert len(conexoes_falsas) == 5
+    assert all(ssh.fechada for ssh in conexoes_falsas)
+    assert coleta_ssh._conexoes == {}
+    # O relatório usa o resultado guardado, sem conectar de novo
+    assert coleta_ssh.coletar_servidor(alvos[0], ("uptime",)).comandos[0].saida == "ok"
+    assert len(conexoes_falsas) == 5
+
+def test_frota_mantem_conexoes_que_ja_existiam(conexoes_falsas):
+    alvo = Alvo("10.0.0.1", 22, "pgr", "x")
+    existente = coleta_ssh.obter_conexao(alvo)
+    coleta_ssh.coletar_frota([alvo, Alvo("10.0.0.2", 22, "pgr", "x")], ("uptime",))
+    assert not existente.fechada
+    assert list(coleta_ssh._conexoes) == [alvo.chave]
+
+def test_varredura_fecha_conexoes_ociosas(conexoes_falsas, monkeypatch):
+    alvo = Alvo("10.0.0.1", 22, "pgr", "x")
+    ssh = coleta_ssh.obter_conexao(alvo)
+    monkeypatch.setattr(coleta_ssh, "SSH_CACHE_TTL", -1)
+    monkeypatch.setattr(coleta_ssh, "SSH_COMMAND_TIMEOUT", -1)
+    coleta_ssh.fechar_expiradas()
+    assert ssh.fechada
+    assert coleta_ssh._conexoes == {}
+
+# -- Separação da saída do script único ----------------------------------------
+
+MARCADOR = "PGR-0123456789abcdef"
+
+def _bloco(indice, saida, erro, status):
+    return (f"<<<{MARCADOR} {indice} SAIDA>>>\n{saida}\n<<<{MARCADOR} {indice} ERRO>>>\n"
+            f"{erro}\n<<<{MARCADOR} {indice} FIM {status}>>>\n")
+
+def test_separar_saida_um_resultado_por_comando():
+    texto = _bloco(0, "Linux pgr 6.1", "", 0) + _bloco(1, "", "df: /x: Permission denied", 1)
+    primeiro, segundo = coleta_ssh.separar_saida(texto, ("uname -a", "df -h"), MARCADOR)
+    assert (primeiro.comando, primeiro.saida, primeiro.erro, primeiro.status) == ("uname -a", "Linux pgr 6.1", "", 0)
+    assert (segundo.saida, segundo.erro, segundo.status) == ("", "df: /x: Permission denied", 1)
+
+def test_separar_saida_preserva_linhas_e_quebras_internas():
+    saida = "Filesystem  Size\n/dev/sda1   50G\n\nlinha após vazia"
+    (resultado,) = coleta_ssh.separar_saida(_bloco(0, saida, "", 0), ("df -h",), MARCADOR)
+    assert resultado.saida == saida
+
+def test_separar_saida_ignora_marcadores_de_outra_execucao():
+    # Um comando que imprime algo parecido com o marcador (outro token) não quebra a separação
+    falso = "<<<PGR-ffffffffffffffff 0 FIM 0>>>"
+    (resultado,) = coleta_ssh.separar_saida(_bloco(0, falso, "", 0), ("cat log",), MARCADOR)
+    assert resultado.saida == falso
+    assert resultado.status == 0
+
+def test_separar_saida_script_interrompido():
+    texto = _bloco(0, "ok", "", 0) + f"<<<{MARCADOR} 1 SAIDA>>>\nparcial"
+    primeiro, segundo = coleta_ssh.separar_saida(texto, ("uptime", "free -m"), MARCADOR)
+    assert primeiro.status == 0
+    # Sem o marcador FIM o comando fica sem status (executar_comandos o marca como erro)
+    assert segundo.status is None
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="sem sh local")
+def test_montar_script_e_separar_saida_no_sh_local():
+    comandos = ("echo um; echo dois", "echo falhou >&2; exit 3", "printf 'sem quebra'", "true")
+    script = coleta_ssh.montar_script(comandos, MARCADOR)
+    texto = subprocess.run(["sh", "-c", script], capture_output=True, text=True, timeout=10).stdout
+    resultados = coleta_ssh.separar_saida(texto, comandos, MARCADOR)
+    # A saída é exatamente o stdout do comando (com a quebra final, como no exec_command por
+    # comando); o stderr vem de $( ), que remove as quebras finais
+    assert [(r.saida, r.erro, r.status) for r in resultados] == [
+        ("um\ndois\n", "", 0),
+        ("", "falhou", 3),
+        ("sem quebra", "", 0),
+        ("", "", 0),
+    ]
+
+# -- Comandos da seção "Informações do Servidor Produtivo" ----------------------
+
+def test_comandos_da_secao_do_relatorio():
+    # Os mesmos comandos, na mesma ordem, que o relatório sempre mostrou
+    assert coleta_ssh.COMANDOS == (
+        "hostname",
+        "ifconfig | grep inet | awk '{ print $2 }'",
+        "cat /etc/*release",
+        "df -h",
+        "free -h",
+    )
+
+def test_formatar_html_um_bloco_por_comando():
+    resultado = coleta_ssh.ResultadoServidor(Alvo("10.0.0.1"), [
+        coleta_ssh.ResultadoComando(comando, f"saida de {comando}", "", 0) for comando in coleta_ssh.COMANDOS
+    ])
+    linhas = coleta_ssh.formatar_html(resultado).split("<br>")
+    assert [linha for linha in linhas if linha.endswith(":")] == [f"{comando}:" for comando in coleta_ssh.COMANDOS]
+    assert sum(linha.startswith("free") for linha in linhas) == 1
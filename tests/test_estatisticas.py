@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pyzabbix")
+pytest.importorskip("dotenv")
+
+from src.apps.ultima_consulta import P95_PRECISAO, EstatisticasItem, _AcumuladorEstatisticas
+
+def _acumular(valores, duracoes, limite=80.0, paginas=1):
+    acumulador = _AcumuladorEstatisticas(limite)
+    valores = np.asarray(valores, dtype=np.float64)
+    duracoes = np.asarray(duracoes, dtype=np.float64)
+    for valor, duracao in zip(np.array_split(valores, paginas), np.array_split(duracoes, paginas)):
+        acumulador.adicionar(valor, valor, duracao)
+    return acumulador
+
+def test_rampa_uniforme():
+    acumulador = _acumular(np.arange(1, 101), np.full(100, 3600.0))
+    resultado = acumulador.resultado("%")
+    assert resultado.media == pytest.approx(50.5)
+    assert resultado.maximo == 100
+    # O p95 vem do histograma: erro relativo limitado à largura do bin
+    assert resultado.p95 == pytest.approx(95, rel=P95_PRECISAO)
+    assert acumulador.percentil(50) == pytest.approx(50, rel=P95_PRECISAO)
+
+def test_p95_nao_depende_da_paginacao():
+    valores = np.linspace(0.5, 99.5, 1000)
+    duracoes = np.full(1000, 60.0)
+    uma = _acumular(valores, duracoes).resultado("%")
+    varias = _acumular(valores, duracoes, paginas=7).resultado("%")
+    assert varias.p95 == uma.p95
+    assert varias.media == pytest.approx(uma.media)
+    assert varias.segundos_acima == uma.segundos_acima
+
+def test_p95_pondera_pela_duracao():
+    # 90% do tempo em 10 e 10% em 90: o p95 fica no valor que ocupa os últimos 10% do tempo
+    resultado = _acumular([10.0, 90.0], [9 * 3600.0, 3600.0]).resultado("%")
+    assert resultado.p95 == pytest.approx(90, rel=P95_PRECISAO)
+    assert resultado.media == pytest.approx(18)
+
+def test_degrau_tempo_acima_do_limite():
+    # 10 h em 50% e 2 h em 95%, limite de 80%
+    valores = [50.0] * 10 + [95.0] * 2
+    resultado = _acumular(valores, [3600.0] * 12, limite=80.0).resultado("%")
+    assert resultado.segundos_acima == 2 * 3600
+    assert resultado.segundos_total == 12 * 3600
+    assert resultado.percentual_acima == pytest.approx(100 * 2 / 12)
+    assert resultado.tempo_acima == "2 h 00 min"
+
+def test_valor_igual_ao_limite_nao_conta_como_acima():
+    resultado = _acumular([80.0, 80.0], [3600.0, 3600.0], limite=80.0).resultado("%")
+    assert resultado.segundos_acima == 0
+
+def test_zeros_vao_para_o_bin_do_zero():
+    resultado = _acumular([0.0] * 10, [60.0] * 10).resultado("%")
+    assert resultado.p95 == 0.0
+    assert resultado.media == 0.0
+
+def test_sem_dados():
+    assert _AcumuladorEstatisticas(80.0).resultado("%") is None
+
+def test_estatisticas_item_sem_periodo():
+    item = EstatisticasItem(media=0, p95=0, maximo=0, limite=80, segundos_acima=0, segundos_total=0)
+    assert item.percentual_acima == 0.0
+    assert item.fonte == "tendencias"
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pyzabbix")
+pytest.importorskip("dotenv")
+
+from src.apps import graficos
+
+@pytest.mark.parametrize("unidade, maximo, esperado", [
+    ("%", 97.0, (1, "%")),
+    ("B", 512.0, (1, "B")),
+    ("B", 8.5 * 1024 ** 3, (1024 ** 3, "GB")),
+    ("Bps", 3 * 1024 ** 2, (1024 ** 2, "MBps")),
+    ("B", float("nan"), (1, "B")),
+    ("", 10.0, (1, "")),
+])
+def test_escala_da_unidade(unidade, maximo, esperado):
+    assert graficos.escala_da_unidade(unidade, maximo) == esperado
+
+def test_unidades_do_cache_e_do_zabbix(monkeypatch):
+    gravados = []
+    monkeypatch.setattr(graficos.cache_itens, "obter", lambda itemids: {"1": {"units": "%"}})
+    monkeypatch.setattr(graficos.cache_itens, "gravar", gravados.extend)
+    pedidos = []
+
+    def item_get(itemids, output):
+        pedidos.append(itemids)
+        return [{"itemid": "2", "value_type": "3", "units": "B"}]
+
+    zapi = SimpleNamespace(item=SimpleNamespace(get=item_get))
+    assert graficos.unidades_dos_itens(zapi, ["1", "2"]) == {"1": "%", "2": "B"}
+    assert pedidos == [["2"]]
+    assert [item["itemid"] for item in gravados] == ["2"]
@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("dotenv")
+
+from src.apps import metadata
+
+class CursorFalso:
+    """Cursor que responde ao information_schema com as colunas dadas e registra os SELECTs."""
+    def __init__(self, colunas, consultas):
+        self.colunas, self.consultas = colunas, consultas
+        self._linhas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.consultas.append(sql)
+        if "information_schema" in sql:
+            self._linhas = [(coluna,) for coluna in self.colunas]
+        else:
+            self._linhas = [(1, "Cliente", "Oracle")]
+
+    def fetchall(self):
+        return self._linhas
+
+@pytest.fixture
+def banco(monkeypatch):
+    consultas = []
+
+    def configurar(colunas):
+        @contextmanager
+        def connection():
+            yield type("ConexaoFalsa", (), {"cursor": lambda self: CursorFalso(colunas, consultas)})()
+        monkeypatch.setattr(metadata.db_pool, "connection", connection)
+        monkeypatch.setattr(metadata, "_expressao_tipo", None)
+        metadata.invalidar_cache()
+        return consultas
+
+    yield configurar
+    metadata.invalidar_cache()
+
+@pytest.mark.parametrize("colunas, expressao", [
+    (["tpbanco"], "tpbanco"),
+    (["db_type"], "db_type"),
+    (["tpbanco", "db_type"], "COALESCE(NULLIF(tpbanco, ''), db_type)"),
+    ([], "NULL"),
+])
+def test_tipo_do_banco_pela_coluna_existente(banco, colunas, expressao):
+    consultas = banco(colunas)
+    assert metadata.fetch_clients(com_tipo=True) == [(1, "Cliente", "Oracle")]
+    select = consultas[-1]
+    assert f"idcliente, nome, {expressao} FROM" in select
+    for coluna in {"tpbanco", "db_type"} - set(colunas):
+        assert coluna not in select
+
+def test_colunas_consultadas_uma_vez(banco):
+    consultas = banco(["db_type"])
+    metadata.fetch_clients(com_tipo=True)
+    metadata.invalidar_cache()
+    metadata.fetch_clients(com_tipo=True)
+    assert sum("information_schema" in sql for sql in consultas) == 1
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from src.apps import metricas
+from src.apps.scheduler import Etapa, ErroEtapa, executar_etapas
+
+def test_etapa_recebe_resultados_das_dependencias():
+    resultados = executar_etapas([
+        Etapa("a", lambda: 1),
+        Etapa("b", lambda: 2),
+        Etapa("soma", lambda a, b: a + b, ("a", "b")),
+        Etapa("dobro", lambda soma: soma * 2, ("soma",)),
+    ])
+    assert resultados == {"a": 1, "b": 2, "soma": 3, "dobro": 6}
+
+def test_etapa_so_comeca_depois_das_dependencias():
+    ordem = []
+    lock = threading.Lock()
+
+    def registrar(nome):
+        def funcao(**_):
+            with lock:
+                ordem.append(nome)
+        return funcao
+
+    executar_etapas([
+        Etapa("render", registrar("render"), ("graficos", "banco")),
+        Etapa("graficos", registrar("graficos")),
+        Etapa("banco", registrar("banco")),
+        Etapa("merge", registrar("merge"), ("render",)),
+    ])
+    assert ordem.index("render") > ordem.index("graficos")
+    assert ordem.index("render") > ordem.index("banco")
+    assert ordem[-1] == "merge"
+
+def test_etapas_independentes_rodam_ao_mesmo_tempo():
+    # As duas etapas só terminam se estiverem rodando juntas
+    barreira = threading.Barrier(2, timeout=5)
+    resultados = executar_etapas([
+        Etapa("a", lambda: barreira.wait() is not None),
+        Etapa("b", lambda: barreira.wait() is not None),
+    ])
+    assert resultados == {"a": True, "b": True}
+
+def test_falha_nao_inicia_as_dependentes():
+    executadas = []
+
+    def falhar():
+        raise RuntimeError("sem conexão")
+
+    with pytest.raises(ErroEtapa) as erro:
+        executar_etapas([
+            Etapa("banco", falhar),
+            Etapa("render", lambda banco: executadas.append("render"), ("banco",)),
+            Etapa("merge", lambda render: executadas.append("merge"), ("render",)),
+        ])
+    assert erro.value.etapa == "banco"
+    assert isinstance(erro.value.erro, RuntimeError)
+    assert executadas == []
+
+def test_dependencia_inexistente():
+    with pytest.raises(ValueError, match="não existe"):
+        executar_etapas([Etapa("render", lambda graficos: None, ("graficos",))])
+
+def test_dependencia_circular():
+    with pytest.raises(ValueError, match="circular"):
+        executar_etapas([
+            Etapa("a", lambda c: None, ("c",)),
+            Etapa("b", lambda a: None, ("a",)),
+            Etapa("c", lambda b: None, ("b",)),
+            Etapa("livre", lambda: None),
+        ])
+
+def test_nomes_repetidos():
+    with pytest.raises(ValueError, match="repetidos"):
+        executar_etapas([Etapa("a", lambda: 1), Etapa("a", lambda: 2)])
+
+def test_etapas_herdam_a_execucao_da_cronometragem():
+    with metricas.iniciar_execucao("teste") as execucao:
+        executar_etapas([Etapa("a", lambda: None), Etapa("b", lambda a: None, ("a",))])
+    etapas = {medicao.etapa for medicao in execucao.medicoes}
+    assert {"pipeline.a", "pipeline.b"} <= etapas
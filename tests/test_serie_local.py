@@ -0,0 +1,71 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("dotenv")
+
+from src.apps import serie_local
+
+HORA = 3600
+DIA = 86400
+
+class ZabbixFalso:
+    """trend.get com uma tendência por hora (valor = clock) e registro das janelas pedidas."""
+    def __init__(self):
+        self.pedidos = []
+        self.trend = SimpleNamespace(get=self._trend_get)
+
+    def _trend_get(self, itemids, time_from, time_till, output):
+        self.pedidos.append((time_from, time_till))
+        primeira = -(-time_from // HORA) * HORA
+        return [{"itemid": itemid, "clock": clock, "num": 60, "value_min": clock,
+                 "value_avg": clock, "value_max": clock}
+                for itemid in itemids for clock in range(primeira, time_till, HORA)]
+
+@pytest.fixture(autouse=True)
+def armazenamento(tmp_path, monkeypatch):
+    monkeypatch.setattr(serie_local, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(serie_local, "SERIE_FILE", str(tmp_path / "series.sqlite3"))
+    monkeypatch.setattr(serie_local, "_criado", False)
+    monkeypatch.setattr(serie_local, "ATIVO", True)
+
+def _inicio():
+    return (int(time.time()) - 30 * DIA) // HORA * HORA
+
+def _cobertura(itemid="1"):
+    with serie_local.closing(serie_local._conectar()) as conexao:
+        return conexao.execute("SELECT desde, ate FROM sincronizacao WHERE itemid = ?", (itemid,)).fetchone()
+
+def test_janela_seguinte_busca_so_o_trecho_novo():
+    zapi, inicio = ZabbixFalso(), _inicio()
+    assert serie_local.sincronizar(zapi, ["1"], inicio, inicio + 2 * DIA)
+    zapi.pedidos.clear()
+    assert serie_local.sincronizar(zapi, ["1"], inicio, inicio + 3 * DIA)
+    # Só a partir do último clock gravado
+    assert min(de for de, _ in zapi.pedidos) >= inicio + 2 * DIA - HORA
+    assert _cobertura() == (inicio, inicio + 3 * DIA)
+
+def test_janela_depois_de_um_buraco_nao_marca_o_buraco_como_sincronizado():
+    zapi, inicio = ZabbixFalso(), _inicio()
+    serie_local.sincronizar(zapi, ["1"], inicio, inicio + 2 * DIA)
+    serie_local.sincronizar(zapi, ["1"], inicio + 5 * DIA, inicio + 6 * DIA)
+    assert _cobertura() == (inicio + 5 * DIA, inicio + 6 * DIA)
+
+    # Uma janela que inclui o buraco o busca no Zabbix
+    zapi.pedidos.clear()
+    serie_local.sincronizar(zapi, ["1"], inicio, inicio + 6 * DIA)
+    assert any(de < inicio + 5 * DIA and ate > inicio + 2 * DIA for de, ate in zapi.pedidos)
+    clock = serie_local.ler_tendencias(["1"], inicio, inicio + 6 * DIA - 1)["1"][0]
+    assert np.array_equal(clock, np.arange(inicio, inicio + 6 * DIA, HORA))
+
+def test_retencao_nunca_deixa_trecho_invertido(monkeypatch):
+    zapi, inicio = ZabbixFalso(), _inicio()
+    serie_local.sincronizar(zapi, ["1"], inicio, inicio + 2 * DIA)
+    # Tudo o que foi gravado passa a estar fora da retenção
+    monkeypatch.setattr(serie_local, "RETENCAO", 10 * DIA)
+    serie_local.sincronizar(zapi, ["2"], inicio + 25 * DIA, inicio + 26 * DIA)
+    assert _cobertura("1") is None
+    desde, ate = _cobertura("2")
+    assert desde <= ate
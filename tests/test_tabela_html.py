@@ -0,0 +1,81 @@
+import math
+from decimal import Decimal
+from html.parser import HTMLParser
+
+import pytest
+
+from src.apps.tabela_html import tabela_html
+
+COLUNAS = ["OWNER", "TABLE_NAME", "SIZE (GB)", "LINHAS", "OBS"]
+LINHAS = [
+    ("SYS", "AUD$", 12.5, Decimal("1200"), None),
+    ("APP", "PEDIDOS<2024>", 3.0, Decimal("45.75"), "particionada & comprimida"),
+    ("APP", "ITENS", float("nan"), Decimal("0.000001"), "sem estatísticas"),
+    ("HR", "EMPREGADOS", 0.333333333, None, "ok"),
+]
+
+class _Tabela(HTMLParser):
+    """Classes da <table>, cabeçalhos e células de uma tabela HTML."""
+    def __init__(self, texto):
+        super().__init__()
+        self.classes, self.cabecalho, self.linhas = None, [], []
+        self._celula = None
+        self.feed(texto)
+
+    def handle_starttag(self, tag, atributos):
+        if tag == "table":
+            self.classes = dict(atributos)["class"].split()
+        elif tag == "tr":
+            self.linhas.append([])
+        elif tag in ("th", "td"):
+            self._celula = ""
+
+    def handle_data(self, dado):
+        if self._celula is not None:
+            self._celula += dado
+
+    def handle_endtag(self, tag):
+        if tag in ("th", "td"):
+            (self.cabecalho if tag == "th" else self.linhas[-1]).append(self._celula)
+            self._celula = None
+
+def _mesmo_valor(nosso, deles):
+    ausentes = ("NaN", "None", "")
+    if nosso in ausentes or deles in ausentes:
+        return nosso in ausentes and deles in ausentes
+    try:
+        return math.isclose(float(nosso), float(deles), rel_tol=1e-6)
+    except ValueError:
+        return nosso == deles
+
+def test_mesma_tabela_que_o_pandas():
+    pd = pytest.importorskip("pandas")
+    nosso = _Tabela(tabela_html(iter(LINHAS), COLUNAS))
+    deles = _Tabela(pd.DataFrame(LINHAS, columns=COLUNAS).to_html(
+        classes="tabela_cinza", index=False, border=0, justify="center"))
+
+    assert nosso.classes == deles.classes == ["dataframe", "tabela_cinza"]
+    assert nosso.cabecalho == deles.cabecalho == COLUNAS
+    linhas_nossas = [linha for linha in nosso.linhas if linha]
+    linhas_deles = [linha for linha in deles.linhas if linha]
+    assert len(linhas_nossas) == len(linhas_deles) == len(LINHAS)
+    for nossa, dela in zip(linhas_nossas, linhas_deles):
+        assert len(nossa) == len(dela)
+        for celula_nossa, celula_dela in zip(nossa, dela):
+            assert _mesmo_valor(celula_nossa, celula_dela), (celula_nossa, celula_dela)
+
+def test_formatacao_das_celulas():
+    tabela = _Tabela(tabela_html(iter(LINHAS), COLUNAS))
+    primeira, segunda, terceira, quarta = (linha for linha in tabela.linhas if linha)
+    assert primeira == ["SYS", "AUD$", "12.5", "1200", "NaN"]
+    assert segunda[1:4] == ["PEDIDOS<2024>", "3.0", "45.75"]
+    assert terceira[2:4] == ["NaN", "0.000001"]
+    assert quarta[2:4] == ["0.333333", "NaN"]
+
+def test_html_escapado():
+    html = tabela_html(iter([("<script>", "a & b")]), ["<col>", "B"])
+    assert "<script>" not in html and "&lt;script&gt;" in html
+    assert "&lt;col&gt;" in html and "a &amp; b" in html
+
+def test_sem_linhas():
+    assert tabela_html(iter([]), COLUNAS) is None
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pyzabbix")
+pytest.importorskip("dotenv")
+
+from src.apps import ultima_consulta
+
+class ZabbixFalso:
+    """item.get sem lastvalue para os itens diários e history.get com várias linhas por item."""
+    def __init__(self, itens, historico):
+        self.itens, self.historico = itens, historico
+        self.pedidos_historico = []
+        self.item = SimpleNamespace(get=self._item_get)
+        self.history = SimpleNamespace(get=self._history_get)
+
+    def _item_get(self, itemids, output):
+        return [dict(self.itens[i], itemid=i) for i in itemids if i in self.itens]
+
+    def _history_get(self, itemids, history, time_from, time_till, output, sortfield, sortorder):
+        self.pedidos_historico.append((history, sorted(itemids)))
+        return [linha for linha in self.historico if linha["itemid"] in itemids and time_from <= linha["clock"]]
+
+@pytest.fixture(autouse=True)
+def sem_cache(monkeypatch):
+    monkeypatch.setattr(ultima_consulta.cache_itens, "obter", lambda itemids: {})
+    monkeypatch.setattr(ultima_consulta.cache_itens, "gravar", lambda itens: None)
+    monkeypatch.setattr(ultima_consulta.cache_itens, "invalidar", lambda itemids=None: None)
+
+def test_historico_em_uma_chamada_por_value_type():
+    agora = int(ultima_consulta.time.time())
+    itens = {
+        "1": {"value_type": "3", "lastvalue": "0", "lastclock": "0"},
+        "2": {"value_type": "3", "lastvalue": "0", "lastclock": "0"},
+        "3": {"value_type": "4", "lastvalue": "", "lastclock": "0"},
+        "4": {"value_type": "0", "lastvalue": "12.5", "lastclock": str(agora)},
+        "5": {"value_type": "4", "lastvalue": "", "lastclock": "0"},
+    }
+    historico = [
+        {"itemid": "1", "clock": agora - 2 * 86400, "value": "10"},
+        {"itemid": "1", "clock": agora - 86400, "value": "11"},
+        {"itemid": "2", "clock": agora - 3 * 86400, "value": "20"},
+        {"itemid": "3", "clock": agora - 86400, "value": "backup ok"},
+        {"itemid": "3", "clock": agora - 5 * 86400, "value": "backup antigo"},
+    ]
+    zapi = ZabbixFalso(itens, historico)
+    valores = ultima_consulta.obter_valores_itens(zapi, ["1", "2", "3", "4", "5", "9"])
+
+    assert sorted(zapi.pedidos_historico) == [(3, ["1", "2"]), (4, ["3", "5"])]
+    assert valores["1"] == "11"
+    assert valores["2"] == "20"
+    assert valores["3"] == "backup ok"
+    assert valores["4"] == "12.5"
+    assert isinstance(valores["5"], Exception)
+    assert isinstance(valores["9"], Exception)
+
+def test_main_propaga_o_erro_da_coleta(tmp_path, monkeypatch):
+    # Sem o client_info.json a etapa "zabbix" falha, em vez de o render seguir com tabelas vazias
+    workspace = SimpleNamespace(client_info_file=str(tmp_path / "client_info.json"),
+                                serv_info_file=str(tmp_path / "serv_info.json"))
+    with pytest.raises(FileNotFoundError):
+        ultima_consulta.main(workspace)
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+pytest.importorskip("dotenv")
+
+from src.apps import zabbix_async
+
+def _cliente(enviar):
+    """Cliente já autenticado cujo _enviar é substituído (sem rede)."""
+    cliente = zabbix_async.ClienteZabbixAsync(url="http://zabbix.local", api_token="token")
+    cliente._enviar = enviar
+    return cliente
+
+def test_lote_com_erro_http_nao_descarta_os_outros(monkeypatch):
+    monkeypatch.setattr(zabbix_async, "TAMANHO_LOTE", 2)
+
+    async def enviar(corpo):
+        if any(r["params"].get("falhar") for r in corpo):
+            raise aiohttp.ClientError("502 Bad Gateway")
+        return [{"id": r["id"], "result": r["params"]["n"]} for r in corpo]
+
+    chamadas = [("item.get", {"n": n, "falhar": n == 2}) for n in range(5)]
+    resultados = asyncio.run(_cliente(enviar).chamar_em_lotes(chamadas))
+    assert resultados[:2] == [0, 1]
+    # Só as chamadas do lote que falhou (2 e 3) ficam com a exceção
+    assert all(isinstance(r, aiohttp.ClientError) for r in resultados[2:4])
+    assert resultados[4] == 4
+
+def test_envio_uma_a_uma_isola_a_requisicao_que_falhou():
+    async def enviar(corpo):
+        if isinstance(corpo, list):
+            # Servidor sem suporte a lote
+            return {"error": {"message": "Invalid request."}}
+        if corpo["params"]["n"] == 1:
+            raise asyncio.TimeoutError()
+        return {"id": corpo["id"], "result": corpo["params"]["n"]}
+
+    resultados = asyncio.run(_cliente(enviar).lote([("item.get", {"n": n}) for n in range(3)]))
+    assert resultados[0] == 0 and resultados[2] == 2
+    assert isinstance(resultados[1], asyncio.TimeoutError)